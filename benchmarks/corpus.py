@@ -0,0 +1,160 @@
+"""Deterministic synthetic Dockerfile corpus generator for benchmarks.
+
+Run as a script to write a corpus to disk, e.g.
+
+    python benchmarks/corpus.py /tmp/corpus --files 100 --instructions 200
+
+"""
+import argparse
+import os
+import random
+
+
+BASE_IMAGES = ('python:3.12-slim', 'node:20-alpine', 'golang:1.22',
+               'debian:bookworm', 'ubuntu:22.04', 'alpine:3.19')
+PACKAGES = ('curl', 'git', 'make', 'gcc', 'libpq-dev', 'ca-certificates',
+            'openssl', 'tini', 'jq', 'unzip')
+WORDS = ('build', 'test', 'lint', 'fetch', 'install', 'compile', 'assets',
+         'vendor', 'docs', 'cache')
+
+
+def _run_command(rng, run_length):
+    """Helper to make a shell command chaining `run_length` steps."""
+    steps = []
+    for _ in range(run_length):
+        kind = rng.randrange(4)
+        if kind == 0:
+            steps.append('apt-get install -y --no-install-recommends %s'
+                         % ' '.join(rng.sample(PACKAGES, 3)))
+        elif kind == 1:
+            steps.append('make %s' % rng.choice(WORDS))
+        elif kind == 2:
+            steps.append('mkdir -p /opt/%s/%s' % (rng.choice(WORDS),
+                                                  rng.choice(WORDS)))
+        else:
+            steps.append('echo %s > /tmp/%s.txt' % (rng.choice(WORDS),
+                                                    rng.choice(WORDS)))
+    return ' && \\\n    '.join(steps)
+
+
+def _instruction(rng, stage_names, run_length, onbuild_density,
+                 healthcheck_density):
+    """Helper to make one random non-FROM instruction line."""
+    roll = rng.random()
+    if roll < onbuild_density:
+        return 'ONBUILD COPY --chown=app:app %s /app/%s' % (
+            rng.choice(WORDS), rng.choice(WORDS))
+    roll -= onbuild_density
+    if roll < healthcheck_density:
+        return ('HEALTHCHECK --interval=%ds --timeout=%ds --retries=%d '
+                'CMD ["curl", "-f", "http://localhost:%d/health"]' % (
+                    rng.randint(5, 60), rng.randint(1, 10),
+                    rng.randint(1, 5), rng.randint(1024, 9000)))
+    kind = rng.randrange(10)
+    if kind < 4:
+        return 'RUN %s' % _run_command(rng, run_length)
+    if kind == 4:
+        return 'ENV %s_%s=%d' % (rng.choice(WORDS).upper(),
+                                 rng.choice(WORDS).upper(),
+                                 rng.randrange(1000))
+    if kind == 5:
+        return 'LABEL org.example.%s="%s"' % (rng.choice(WORDS),
+                                              rng.choice(WORDS))
+    if kind == 6 and stage_names:
+        return 'COPY --from=%s /out/%s /opt/%s' % (
+            rng.choice(stage_names), rng.choice(WORDS), rng.choice(WORDS))
+    if kind == 7:
+        return 'WORKDIR /srv/%s' % rng.choice(WORDS)
+    if kind == 8:
+        return 'EXPOSE %d/tcp' % rng.randint(1024, 9000)
+    return 'COPY %s/ /app/%s/' % (rng.choice(WORDS), rng.choice(WORDS))
+
+
+def generate_dockerfile(seed=0, instructions=100, stages=3, run_length=3,
+                        onbuild_density=0.05, healthcheck_density=0.02):
+    """Generate the text of a synthetic multi-stage Dockerfile.
+
+    The output only depends on the arguments, so the same corpus can be
+    regenerated on any machine to compare benchmark results.
+
+    Args:
+        seed: Optional integer seeding the random generator (default 0).
+        instructions: Optional approximate number of instructions in the
+            file, including FROM lines (default 100).
+        stages: Optional number of build stages (default 3).
+        run_length: Optional number of `&&`-chained commands per RUN
+            instruction (default 3).
+        onbuild_density: Optional fraction of instructions that are ONBUILD
+            triggers (default 0.05).
+        healthcheck_density: Optional fraction of instructions that are
+            HEALTHCHECK instructions (default 0.02).
+
+    Returns:
+        A string containing the Dockerfile source.
+
+    Raises:
+        Nothing.
+
+    """
+    rng = random.Random(seed)
+    lines = ['# escape=\\', 'ARG BASE_TAG=latest']
+    per_stage = max(1, instructions // max(1, stages) - 1)
+    stage_names = []
+    for index in range(stages):
+        name = 'stage%d' % index
+        lines.append('FROM %s AS %s' % (rng.choice(BASE_IMAGES), name))
+        for _ in range(per_stage):
+            lines.append(_instruction(rng, stage_names, run_length,
+                                      onbuild_density, healthcheck_density))
+        stage_names.append(name)
+    lines.append('CMD ["/usr/bin/tini", "--", "/app/start"]')
+    return '\n'.join(lines) + '\n'
+
+
+def write_corpus(directory, files=10, seed=0, **options):
+    """Write a corpus of synthetic Dockerfiles to a directory.
+
+    Args:
+        directory: A string naming the output directory, created if needed.
+        files: Optional number of Dockerfiles to write (default 10).
+        seed: Optional integer base seed; file `k` uses `seed + k`.
+        **options: Keyword arguments passed to `generate_dockerfile`.
+
+    Returns:
+        A list of strings naming the written files, in order.
+
+    Raises:
+        OSError: raised if the files cannot be written.
+
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(files):
+        path = os.path.join(directory, 'Dockerfile.%05d' % index)
+        with open(path, 'w') as output:
+            output.write(generate_dockerfile(seed=seed + index, **options))
+        paths.append(path)
+    return paths
+
+
+def main():
+    """Generate a corpus from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directory')
+    parser.add_argument('--files', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--instructions', type=int, default=100)
+    parser.add_argument('--stages', type=int, default=3)
+    parser.add_argument('--run-length', type=int, default=3)
+    parser.add_argument('--onbuild-density', type=float, default=0.05)
+    parser.add_argument('--healthcheck-density', type=float, default=0.02)
+    args = parser.parse_args()
+    write_corpus(args.directory, files=args.files, seed=args.seed,
+                 instructions=args.instructions, stages=args.stages,
+                 run_length=args.run_length,
+                 onbuild_density=args.onbuild_density,
+                 healthcheck_density=args.healthcheck_density)
+
+
+if __name__ == '__main__':
+    main()
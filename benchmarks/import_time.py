@@ -0,0 +1,100 @@
+"""Measure and guard the startup cost of a render-only dockerphile script.
+
+Each sample runs a fresh interpreter that imports `Dockerfile`, builds a
+small Dockerfile and renders it. The script fails if the parser backend or
+other heavy modules were imported along the way, or if the fastest import
+exceeds `--max-ms`:
+
+    python benchmarks/import_time.py --repeat 20 --max-ms 50
+
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+RENDER_ONLY_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from dockerphile.dockerfile_tools import Dockerfile
+imported = time.perf_counter()
+dockerfile = Dockerfile()
+dockerfile.from_('python:3.12-slim', as_='app')
+dockerfile.workdir('/app')
+dockerfile.run(['pip', 'install', 'flask'])
+dockerfile.cmd(['python', 'app.py'])
+repr(dockerfile)
+done = time.perf_counter()
+sys.stdout.write(json.dumps({'import': imported - start,
+                             'render': done - imported,
+                             'modules': sorted(sys.modules)}))
+"""
+UNEXPECTED_MODULES = (
+    'dockerfile',
+    'concurrent.futures',
+    'multiprocessing',
+    'tempfile',
+    'dockerphile.corpus_tools',
+    'dockerphile.structures.validate',
+    'dockerphile.structures.onbuild_t',
+)
+
+
+def _sample():
+    """Helper to run the render-only script in a fresh interpreter."""
+    output = subprocess.check_output([sys.executable, '-c',
+                                      RENDER_ONLY_SCRIPT])
+    return json.loads(output.decode())
+
+
+def measure(repeat=10):
+    """Time the render-only script and list unexpectedly imported modules.
+
+    Args:
+        repeat: Optional number of fresh interpreters to sample (default
+            10).
+
+    Returns:
+        A dictionary with `min`, `median` and `mean` import seconds, the
+        `median` of the `render` seconds, and the sorted list of
+        `UNEXPECTED_MODULES` that were `unexpected` imports.
+
+    Raises:
+        subprocess.CalledProcessError: raised if the script fails.
+
+    """
+    samples = [_sample() for _ in range(repeat)]
+    imports = [sample['import'] for sample in samples]
+    loaded = set(samples[-1]['modules'])
+    return dict(min=min(imports), median=statistics.median(imports),
+                mean=statistics.mean(imports), repeat=repeat, number=1,
+                render=statistics.median(sample['render']
+                                         for sample in samples),
+                unexpected=sorted(loaded.intersection(UNEXPECTED_MODULES)))
+
+
+def main():
+    """Measure from the command line, exiting 1 if a guard fails."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--max-ms', type=float)
+    args = parser.parse_args()
+    result = measure(args.repeat)
+    sys.stdout.write("import %.2f ms (median %.2f ms), render %.2f ms\n" % (
+        result['min'] * 1e3, result['median'] * 1e3, result['render'] * 1e3
+    ))
+    failed = False
+    if result['unexpected']:
+        sys.stdout.write("unexpected imports: %s\n"
+                         % ", ".join(result['unexpected']))
+        failed = True
+    if args.max_ms is not None and result['min'] * 1e3 > args.max_ms:
+        sys.stdout.write("import slower than %.2f ms\n" % args.max_ms)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
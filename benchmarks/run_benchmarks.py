@@ -0,0 +1,191 @@
+"""Benchmark parsing and rendering Dockerfiles on a synthetic corpus.
+
+The startup cost of a render-only script is measured too (see
+`import_time.py`).
+
+Run from the repository root with `dockerphile` importable (e.g. after
+`pip install -e .`). Results are written as JSON so runs on different
+commits can be compared:
+
+    python benchmarks/run_benchmarks.py --output before.json
+    git checkout other-commit
+    python benchmarks/run_benchmarks.py --output after.json --compare \
+        before.json
+
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import import_time
+from corpus import write_corpus
+
+from dockerphile import parse_tools, render_tools
+from dockerphile.dockerfile_tools import Dockerfile
+
+
+SCALES = {
+    'small': dict(files=20, instructions=20, stages=1, run_length=2),
+    'medium': dict(files=10, instructions=200, stages=4, run_length=4),
+    'large': dict(files=2, instructions=2000, stages=10, run_length=8),
+}
+RUN_BLOCK_COMMANDS = 50
+
+
+def _git_revision():
+    """Helper to name the checked out commit, if any."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _measure(function, repeat, number):
+    """Helper to time `function` and summarise the per-call seconds."""
+    timings = [total / number for total in
+               timeit.Timer(function).repeat(repeat=repeat, number=number)]
+    return dict(min=min(timings), median=statistics.median(timings),
+                mean=statistics.mean(timings), repeat=repeat, number=number)
+
+
+def _benchmarks(paths, backend):
+    """Helper to build the benchmark callables for one corpus and backend.
+
+    Returns a list of `(name, items, function)` tuples, where `items` is the
+    number of files or instructions handled per call.
+    """
+    texts = []
+    for path in paths:
+        with open(path, 'r') as source:
+            texts.append(source.read())
+    commands = [command for text in texts
+                for command in parse_tools.parse_commands(text, backend)]
+    dockerfiles = [Dockerfile(source=path, backend=backend)
+                   for path in paths]
+    instructions = [instruction for dockerfile in dockerfiles
+                    for instruction in dockerfile.sequence]
+
+    def parse_files():
+        for path in paths:
+            Dockerfile(source=path, backend=backend)
+
+    def convert_commands():
+        for command in commands:
+            parse_tools.to_instruction(command)
+
+    def render_instructions():
+        for instruction in instructions:
+            render_tools.render_instruction(instruction)
+
+    def render_dockerfiles():
+        for dockerfile in dockerfiles:
+            fresh = Dockerfile()
+            fresh.sequence.extend(dockerfile.sequence)
+            repr(fresh)
+
+    def run_block():
+        dockerfile = Dockerfile()
+        dockerfile.from_('alpine')
+        with dockerfile.run_block() as block:
+            for index in range(RUN_BLOCK_COMMANDS):
+                block.run('echo %d' % index)
+        repr(dockerfile)
+
+    def round_trip():
+        for text in texts:
+            repr(Dockerfile.from_string(text, backend=backend))
+
+    return [
+        ('Dockerfile(source)', len(paths), parse_files),
+        ('to_instruction', len(commands), convert_commands),
+        ('render_instruction', len(instructions), render_instructions),
+        ('Dockerfile.__repr__', len(dockerfiles), render_dockerfiles),
+        ('RunBlock', RUN_BLOCK_COMMANDS, run_block),
+        ('round_trip', len(texts), round_trip),
+    ]
+
+
+def run(scales, backends, repeat, number, seed):
+    """Run every benchmark and return the JSON-serialisable report."""
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in scales:
+            options = dict(SCALES[scale])
+            paths = write_corpus(os.path.join(directory, scale), seed=seed,
+                                 **options)
+            for backend in backends:
+                for name, items, function in _benchmarks(paths, backend):
+                    timing = _measure(function, repeat, number)
+                    timing.update(name=name, scale=scale, backend=backend,
+                                  items=items,
+                                  per_item=timing['min'] / max(1, items))
+                    results.append(timing)
+                    sys.stdout.write("%-22s %-7s %-7s %12.6f s %10.2f us/item"
+                                     "\n" % (name, scale, backend,
+                                             timing['min'],
+                                             timing['per_item'] * 1e6))
+    timing = import_time.measure(repeat)
+    timing.update(name='import', scale='startup', backend='none', items=1,
+                  per_item=timing['min'])
+    results.append(timing)
+    sys.stdout.write("%-22s %-7s %-7s %12.6f s\n"
+                     % ('import', 'startup', 'none', timing['min']))
+    return {
+        'meta': {
+            'commit': _git_revision(),
+            'python': sys.version,
+            'platform': platform.platform(),
+            'timestamp': datetime.datetime.now(
+                datetime.timezone.utc).isoformat(),
+            'seed': seed,
+            'scales': {scale: SCALES[scale] for scale in scales},
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline):
+    """Write the ratio of each result to a baseline report to stdout."""
+    previous = {(result['name'], result['scale'], result['backend']): result
+                for result in baseline['results']}
+    for result in report['results']:
+        key = (result['name'], result['scale'], result['backend'])
+        if key in previous:
+            ratio = result['min'] / previous[key]['min']
+            sys.stdout.write("%-22s %-7s %-7s %6.2fx\n" % (key + (ratio,)))
+
+
+def main():
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='bench_output.json')
+    parser.add_argument('--scale', action='append', choices=sorted(SCALES))
+    parser.add_argument('--backend', action='append',
+                        choices=parse_tools.PARSER_BACKENDS)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare', metavar='BASELINE_JSON')
+    args = parser.parse_args()
+    report = run(args.scale or sorted(SCALES),
+                 args.backend or list(parse_tools.PARSER_BACKENDS),
+                 args.repeat, args.number, args.seed)
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, 'r') as source:
+            compare(report, json.load(source))
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,43 @@
-from dockerphile.dockerfile_tools import new_dockerfile  # noqa: F401
+import importlib
+
+
+__version__ = '0.0.0'
+LAZY_ATTRIBUTES = {
+    'diff': 'dockerphile.diff_tools',
+    'iter_instructions': 'dockerphile.parse_tools',
+    'load_many': 'dockerphile.corpus_tools',
+    'new_dockerfile': 'dockerphile.dockerfile_tools',
+    'scan_base_images': 'dockerphile.corpus_tools',
+}
+__all__ = sorted(LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    """Import the module providing a top-level name on first access.
+
+    `import dockerphile` itself imports nothing else, so e.g. a script that
+    only builds and renders Dockerfiles never loads the corpus tools (and
+    with them `concurrent.futures` and `multiprocessing`).
+
+    Args:
+        name: A string naming a `dockerphile` attribute, one of `__all__`.
+
+    Returns:
+        The attribute, which is also cached as a module global.
+
+    Raises:
+        AttributeError: raised if `name` is not a `dockerphile` name.
+
+    """
+    module = LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError("module %r has no attribute %r"
+                             % (__name__, name))
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """List the lazily imported names along with the loaded ones."""
+    return sorted(set(globals()) | set(__all__))
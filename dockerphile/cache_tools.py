@@ -0,0 +1,216 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+from dockerphile import __version__, serialize_tools
+from dockerphile.errors import DockerphileError
+from dockerphile.parse_tools import parse_instructions
+
+
+CACHE_FORMAT = 2
+DEFAULT_PARSE_CACHE_PATH = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+    'dockerphile', 'parse-cache.sqlite3'
+)
+DEFAULT_MAX_BYTES = 64 << 20
+ACCESS_RESOLUTION = 60.0
+SQLITE_TIMEOUT = 30.0
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, "
+    "data BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)",
+)
+
+
+def _cache_key(text, backend, validate):
+    """Helper to hash a source together with everything affecting parsing."""
+    hasher = hashlib.sha256()
+    parts = (str(CACHE_FORMAT), str(serialize_tools.FORMAT_VERSION),
+             __version__, backend, str(validate))
+    for part in parts:
+        hasher.update(part.encode('utf-8'))
+        hasher.update(b'\0')
+    hasher.update(text.encode('utf-8'))
+    return hasher.hexdigest()
+
+
+class ParseCache:
+    """Persistent cache of parsed Dockerfile instruction sequences."""
+
+    def __init__(self, path=DEFAULT_PARSE_CACHE_PATH,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        """Open (lazily) a parse cache stored in a SQLite database.
+
+        Entries are keyed by a sha256 hash of the Dockerfile source together
+        with the parser backend, the `validate` option, the dockerphile
+        version and `CACHE_FORMAT`, so upgrading dockerphile never returns
+        stale results. Entries are stored in the compact
+        `dockerphile.serialize_tools` binary format. When the stored entries
+        exceed `max_bytes`, the least recently used ones are evicted.
+        Last-use times are only refreshed when they are older than
+        `ACCESS_RESOLUTION` seconds, so most hits do not write to the
+        database.
+
+        The database uses write-ahead logging and waits up to
+        `SQLITE_TIMEOUT` seconds for locks, so many worker processes can
+        share one cache file. Each process opens its own connection (also
+        after a fork). Database errors never fail a parse: they are counted
+        in `errors`, and the source is parsed as if there was no cache.
+
+        Args:
+            path: Optional string naming the SQLite database file (default
+                `DEFAULT_PARSE_CACHE_PATH`). Its directory is created on
+                first use.
+            max_bytes: Optional positive integer bounding the total size of
+                the stored entries (default `DEFAULT_MAX_BYTES`).
+
+        Returns:
+            Nothing.
+
+        Raises:
+            DockerphileError: raised if `max_bytes` is not a positive
+                integer.
+
+        """
+        if not isinstance(max_bytes, int) or max_bytes < 1:
+            raise DockerphileError("A positive integer max_bytes is "
+                                   "required, not %s" % max_bytes)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._connection = None
+        self._pid = None
+
+    def _connect(self):
+        """Helper to open the database connection of this process."""
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def _get(self, key):
+        """Helper to look up and touch one entry."""
+        connection = self._connect()
+        row = connection.execute(
+            "SELECT data, accessed FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > ACCESS_RESOLUTION:
+            connection.execute("UPDATE entries SET accessed = ? WHERE key = ?",
+                               (now, key))
+        return serialize_tools.deserialize(row[0])
+
+    def _put(self, key, instructions):
+        """Helper to store one entry and evict old ones if needed."""
+        data = serialize_tools.serialize(instructions)
+        if len(data) > self.max_bytes:
+            return
+        connection = self._connect()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (key, data, size, accessed) "
+                "VALUES (?, ?, ?, ?)", (key, data, len(data), time.time())
+            )
+            total = connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            excess, stale = total - self.max_bytes, []
+            for stale_key, size in connection.execute(
+                    "SELECT key, size FROM entries ORDER BY accessed"):
+                if excess <= 0:
+                    break
+                stale.append((stale_key,))
+                excess -= size
+            connection.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def instructions(self, text, backend='go', validate=True, stats=None):
+        """Return the parsed instructions of a source, parsing on a miss.
+
+        On a hit the parser backend is not called at all (and `stats` is
+        not updated), otherwise the source is parsed with
+        `dockerphile.parse_tools.parse_instructions` and stored.
+
+        Args:
+            text: A string containing the contents of a Dockerfile.
+            backend: Optional string naming the parser backend, one of
+                `dockerphile.parse_tools.PARSER_BACKENDS` (default 'go').
+            validate: Optional boolean (default True). If False, parsed
+                commands skip the instruction factory checks.
+            stats: Optional `dockerphile.parse_tools.ParseStats` updated
+                with the parsing cost of a miss.
+
+        Returns:
+            A list of `dockerphile.structures` instructions.
+
+        Raises:
+            DockerphileError: raised for an unknown backend or for invalid
+                Dockerfile syntax.
+
+        """
+        key = _cache_key(text, backend, validate)
+        try:
+            cached = self._get(key)
+        except (DockerphileError, OSError, sqlite3.Error):
+            self.errors += 1
+            cached = None
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        instructions = list(parse_instructions(text, backend=backend,
+                                               validate=validate,
+                                               stats=stats))
+        try:
+            self._put(key, instructions)
+        except (DockerphileError, OSError, sqlite3.Error):
+            self.errors += 1
+        return instructions
+
+    def clear(self):
+        """Remove every entry from the cache.
+
+        Args:
+            None.
+
+        Returns:
+            Nothing.
+
+        Raises:
+            sqlite3.Error: raised if the database cannot be written.
+
+        """
+        self._connect().execute("DELETE FROM entries")
+
+    def close(self):
+        """Close the database connection, if this process opened one.
+
+        The cache reconnects if it is used again.
+
+        Args:
+            None.
+
+        Returns:
+            Nothing.
+
+        Raises:
+            Nothing.
+
+        """
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+        self._pid = None
@@ -0,0 +1,240 @@
+import fnmatch
+import os
+from collections import namedtuple
+from concurrent.futures import as_completed, ProcessPoolExecutor
+
+from dockerphile.cache_tools import ParseCache
+from dockerphile.dockerfile_tools import Dockerfile
+from dockerphile.errors import DockerphileError
+from dockerphile.resolve_tools import substitute
+from dockerphile.tokenize_tools import logical_lines
+
+
+LoadResult = namedtuple('LoadResult', ['path', 'dockerfile', 'error'])
+ScanResult = namedtuple('ScanResult', ['path', 'base_images', 'error'])
+LOAD_ERRORS = (Exception,)
+DOCKERFILE_PATTERNS = ('Dockerfile', 'Dockerfile.*', '*.Dockerfile',
+                       '*.dockerfile')
+SCAN_CHUNKSIZE = 64
+_parse_caches = {}
+
+
+def _resolve_workers(workers):
+    """Helper to validate a worker count, defaulting to the CPU count."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if not isinstance(workers, int) or workers < 1:
+        raise DockerphileError(
+            'A positive integer number of workers is required, not %s'
+            % workers
+        )
+    return workers
+
+
+def _parse_cache(cache_path):
+    """Helper to open one parse cache per path in each worker process."""
+    if cache_path is None:
+        return None
+    cache = _parse_caches.get(cache_path)
+    if cache is None:
+        cache = _parse_caches[cache_path] = ParseCache(cache_path)
+    return cache
+
+
+def _load_one(path, backend, validate, cache_path=None):
+    """Helper to parse one source Dockerfile inside a worker process."""
+    try:
+        dockerfile = Dockerfile(source=path, backend=backend,
+                                validate=validate,
+                                cache=_parse_cache(cache_path))
+        return LoadResult(path=path, dockerfile=dockerfile, error=None)
+    except LOAD_ERRORS as error:
+        return LoadResult(path=path, dockerfile=None, error=error)
+
+
+def _share_instructions(dockerfile, pool):
+    """Helper to replace instructions with equal ones already in `pool`."""
+    shared = []
+    for instruction in dockerfile.sequence:
+        try:
+            shared.append(pool.setdefault(instruction, instruction))
+        except TypeError:
+            shared.append(instruction)
+    dockerfile.sequence[:] = shared
+
+
+def load_many(paths, workers=None, backend='go', share=True, validate=True,
+              cache_path=None):
+    """Parse many source Dockerfiles in parallel over a process pool.
+
+    Results are yielded in the order that parsing completes, not the order of
+    `paths`. A file that fails to parse does not abort the batch, whatever
+    exception it raises; instead its result carries the raised exception in
+    the `error` field and `None` in the `dockerfile` field.
+
+    Args:
+        paths: An iterable of strings naming paths to source Dockerfiles.
+        workers: Optional integer number of worker processes. Defaults to
+            the number of CPUs. With `workers=1` the files are parsed
+            serially in the calling process without starting a pool.
+        backend: Optional string naming the parser backend, one of
+            `dockerphile.parse_tools.PARSER_BACKENDS` (default 'go').
+        share: Optional boolean (default True). If set, equal instructions
+            across all loaded Dockerfiles are replaced by a single shared
+            instance, so a corpus with many repeated instructions (e.g. the
+            same FROM or RUN in every file) holds each one only once.
+        validate: Optional boolean (default True). If False, parsed
+            commands skip the instruction factory checks; see
+            `dockerphile.Dockerfile.validate`.
+        cache_path: Optional string naming the database of a
+            `dockerphile.cache_tools.ParseCache`, e.g.
+            `dockerphile.cache_tools.DEFAULT_PARSE_CACHE_PATH`. If given,
+            every worker process reuses the cached instructions of
+            unchanged files instead of parsing them.
+
+    Returns:
+        A generator of `dockerphile.corpus_tools.LoadResult` namedtuples with
+        fields `path`, `dockerfile` and `error`.
+
+    Raises:
+        DockerphileError: raised if `workers` is not a positive integer.
+
+    """
+    workers = _resolve_workers(workers)
+    pool = {}
+    if workers == 1:
+        results = (_load_one(path, backend, validate, cache_path)
+                   for path in paths)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = [executor.submit(_load_one, path, backend, validate,
+                                   cache_path)
+                   for path in paths]
+        results = (future.result() for future in as_completed(futures))
+    try:
+        for result in results:
+            if share and result.dockerfile is not None:
+                _share_instructions(result.dockerfile, pool)
+            yield result
+    finally:
+        if workers != 1:
+            executor.shutdown(cancel_futures=True)
+
+
+def find_dockerfiles(root):
+    """Recursively find Dockerfiles below a directory.
+
+    Files are matched by name against `DOCKERFILE_PATTERNS` (`Dockerfile`,
+    `Dockerfile.*`, `*.Dockerfile` and `*.dockerfile`).
+
+    Args:
+        root: A string naming the directory to walk.
+
+    Returns:
+        A sorted list of strings naming the paths of the matching files.
+
+    Raises:
+        Nothing.
+
+    """
+    found = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if any(fnmatch.fnmatchcase(filename, pattern)
+                   for pattern in DOCKERFILE_PATTERNS):
+                found.append(os.path.join(dirpath, filename))
+    return sorted(found)
+
+
+def _scan_one(path, build_args):
+    """Helper to read only the ARG and FROM lines of one Dockerfile.
+
+    `logical_lines` reads the `escape` directive like the parser does, and
+    stage names are compared in lowercase, as Docker does.
+    """
+    args, stages, base_images = {}, set(), []
+    seen_from = False
+    try:
+        with open(path, 'r', encoding='utf-8') as _file:
+            for original, _, _ in logical_lines(_file):
+                keyword = original.split(None, 1)[0].lower()
+                if keyword == 'arg' and not seen_from:
+                    for word in original.split()[1:]:
+                        key, has_default, default = word.partition('=')
+                        if key in build_args:
+                            args[key] = build_args[key]
+                        elif has_default:
+                            args[key] = substitute(default, args)
+                elif keyword == 'from':
+                    seen_from = True
+                    words = [word for word in original.split()[1:]
+                             if not word.startswith('--')]
+                    if not words:
+                        raise DockerphileError("FROM instruction requires "
+                                               "nonempty base image.")
+                    image = substitute(words[0], args)
+                    if image.lower() not in stages:
+                        base_images.append(image)
+                    if len(words) == 3 and words[1].lower() == 'as':
+                        stages.add(words[2].lower())
+    except LOAD_ERRORS as error:
+        return ScanResult(path=path, base_images=None, error=error)
+    return ScanResult(path=path, base_images=tuple(base_images), error=None)
+
+
+def _scan_chunk(paths, build_args):
+    """Helper to scan a chunk of Dockerfiles inside a worker process."""
+    return [_scan_one(path, build_args) for path in paths]
+
+
+def scan_base_images(paths, workers=None, build_args=None):
+    """Quickly list the base images used by many Dockerfiles.
+
+    Only logical lines starting with ARG or FROM are inspected, and no
+    `dockerphile.structures` instructions are built, which makes this much
+    cheaper than a full parse. ARGs declared before the first FROM are
+    substituted into base image names (overridden by `build_args`). FROM
+    instructions that refer to an earlier named build stage are not
+    reported as base images.
+
+    Args:
+        paths: An iterable of strings naming source Dockerfiles or
+            directories. Directories are searched recursively with
+            `find_dockerfiles`.
+        workers: Optional integer number of worker processes. Defaults to
+            the number of CPUs. Files are scanned in chunks of
+            `SCAN_CHUNKSIZE`, and serially in the calling process if
+            `workers=1` or there is at most one chunk of files.
+        build_args: Optional dictionary mapping ARG names to values that
+            override their defaults in the Dockerfiles.
+
+    Returns:
+        A generator of `dockerphile.corpus_tools.ScanResult` namedtuples with
+        fields `path`, `base_images` (a tuple of strings in FROM order) and
+        `error`, in the order of the discovered paths. A file that cannot
+        be scanned does not abort the batch: its result holds `None` and
+        the raised exception.
+
+    Raises:
+        DockerphileError: raised if `workers` is not a positive integer.
+
+    """
+    workers = _resolve_workers(workers)
+    build_args = dict(build_args or {})
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(find_dockerfiles(path))
+        else:
+            files.append(path)
+    chunks = [files[k:k + SCAN_CHUNKSIZE]
+              for k in range(0, len(files), SCAN_CHUNKSIZE)]
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from _scan_chunk(chunk, build_args)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_scan_chunk, chunk, build_args)
+                   for chunk in chunks]
+        for future in futures:
+            yield from future.result()
@@ -0,0 +1,296 @@
+from collections import namedtuple
+
+from dockerphile import graph_tools, structures
+from dockerphile.errors import DockerphileError
+from dockerphile.resolve_tools import Resolver, substitute
+
+
+Opcode = namedtuple('Opcode', ['tag', 'a_start', 'a_stop', 'b_start',
+                               'b_stop'])
+StageDiff = namedtuple('StageDiff', [
+    'index', 'name', 'changed', 'invalidated', 'first_invalidated',
+    'opcodes'
+])
+DockerfileDiff = namedtuple('DockerfileDiff', ['opcodes', 'stages'])
+
+
+def _instruction_ids(a, b):
+    """Helper to map equal instructions of two sequences to equal ints."""
+    ids = {}
+    results = []
+    for sequence in (a, b):
+        result = []
+        for instruction in sequence:
+            try:
+                result.append(ids.setdefault(instruction, len(ids)))
+            except TypeError:
+                result.append(ids.setdefault(id(instruction), len(ids)))
+        results.append(result)
+    return results
+
+
+def _edit_script(a, b):
+    """Helper to find a shortest edit script with Myers' O(ND) algorithm.
+
+    Returns a list of `(tag, a_index, b_index)` tuples in order, with tags
+    'equal', 'delete' and 'insert'.
+    """
+    n, m = len(a), len(b)
+    frontier, trace = {1: 0}, []
+    for edits in range(n + m + 1):
+        trace.append(dict(frontier))
+        for diagonal in range(-edits, edits + 1, 2):
+            if diagonal == -edits or (diagonal != edits and frontier[
+                    diagonal - 1] < frontier[diagonal + 1]):
+                x = frontier[diagonal + 1]
+            else:
+                x = frontier[diagonal - 1] + 1
+            y = x - diagonal
+            while x < n and y < m and a[x] == b[y]:
+                x, y = x + 1, y + 1
+            frontier[diagonal] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return []
+
+
+def _backtrack(trace, x, y):
+    """Helper to recover the edit script from the Myers search trace."""
+    script = []
+    for edits in range(len(trace) - 1, -1, -1):
+        frontier, diagonal = trace[edits], x - y
+        if diagonal == -edits or (diagonal != edits and frontier.get(
+                diagonal - 1, -1) < frontier.get(diagonal + 1, -1)):
+            previous = diagonal + 1
+        else:
+            previous = diagonal - 1
+        previous_x = frontier[previous]
+        previous_y = previous_x - previous
+        while x > previous_x and y > previous_y:
+            x, y = x - 1, y - 1
+            script.append(('equal', x, y))
+        if edits:
+            if x == previous_x:
+                script.append(('insert', x, previous_y))
+            else:
+                script.append(('delete', previous_x, y))
+        x, y = previous_x, previous_y
+    script.reverse()
+    return script
+
+
+def diff_sequences(a, b):
+    """Diff two instruction sequences.
+
+    Instructions are compared by equality of the `dockerphile.structures`
+    types, which includes their type, rather than by rendered text. The
+    common prefix and suffix are matched first, and the remainder with
+    Myers' O(ND) difference algorithm, so the cost grows with the number
+    of differences D rather than with the product of the lengths.
+
+    Args:
+        a: A sequence of instructions, e.g. `Dockerfile.sequence`.
+        b: Another sequence of instructions.
+
+    Returns:
+        A list of `dockerphile.diff_tools.Opcode` namedtuples covering both
+        sequences in order, with tags 'equal', 'delete' (of
+        `a[a_start:a_stop]`) and 'insert' (of `b[b_start:b_stop]`).
+
+    Raises:
+        Nothing.
+
+    """
+    a_ids, b_ids = _instruction_ids(a, b)
+    prefix = 0
+    limit = min(len(a_ids), len(b_ids))
+    while prefix < limit and a_ids[prefix] == b_ids[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and (
+            a_ids[-1 - suffix] == b_ids[-1 - suffix]):
+        suffix += 1
+    script = [('equal', k, k) for k in range(prefix)]
+    middle = _edit_script(a_ids[prefix:len(a_ids) - suffix],
+                          b_ids[prefix:len(b_ids) - suffix])
+    script.extend((tag, x + prefix, y + prefix) for tag, x, y in middle)
+    script.extend(('equal', len(a_ids) - suffix + k, len(b_ids) - suffix + k)
+                  for k in range(suffix))
+    opcodes = []
+    for tag, x, y in script:
+        step_a = 0 if tag == 'insert' else 1
+        step_b = 0 if tag == 'delete' else 1
+        if opcodes and opcodes[-1].tag == tag:
+            last = opcodes[-1]
+            opcodes[-1] = last._replace(a_stop=last.a_stop + step_a,
+                                        b_stop=last.b_stop + step_b)
+        else:
+            opcodes.append(Opcode(tag, x, x + step_a, y, y + step_b))
+    return opcodes
+
+
+def _split_opcodes(opcodes, boundaries):
+    """Helper to split opcodes at positions of the `b` sequence."""
+    pieces = []
+    for opcode in opcodes:
+        if opcode.tag == 'delete':
+            pieces.append(opcode)
+            continue
+        edges = [opcode.b_start]
+        edges.extend(boundary for boundary in boundaries
+                     if opcode.b_start < boundary < opcode.b_stop)
+        edges.append(opcode.b_stop)
+        for low, high in zip(edges, edges[1:]):
+            a_low = opcode.a_start
+            if opcode.tag == 'equal':
+                a_low += low - opcode.b_start
+            a_high = a_low + (high - low if opcode.tag == 'equal' else 0)
+            pieces.append(Opcode(opcode.tag, a_low, a_high, low, high))
+    return pieces
+
+
+def _owner(groups, opcode):
+    """Helper to find the stage group that an opcode belongs to.
+
+    Deletions sit between two instructions of `b` and are assigned to the
+    stage of the instruction before them.
+    """
+    position = opcode.b_start
+    if opcode.tag == 'delete' and position and any(
+            position == start for _, _, start, _ in groups):
+        position -= 1
+    for index, _, start, stop in groups:
+        if start <= position < stop:
+            return index
+    return groups[-1][0]
+
+
+def _global_args(dockerfile):
+    """Helper to resolve the global ARGs, or `None` if that fails."""
+    try:
+        return Resolver(dockerfile).global_args()
+    except DockerphileError:
+        return None
+
+
+def _reads_changed_args(instruction, old_args, new_args, escape):
+    """Helper to tell if a FROM expands differently with new global ARGs."""
+    for value in (instruction.base_image, instruction.platform):
+        if value is None or '$' not in value:
+            continue
+        try:
+            old = substitute(value, old_args, escape)
+            new = substitute(value, new_args, escape)
+        except DockerphileError:
+            return True
+        if old != new:
+            return True
+    return False
+
+
+def _prelude_invalidations(a, b, stages):
+    """Helper to find where changed global ARGs invalidate each stage.
+
+    Returns a dictionary mapping stage indices to the first position of `b`
+    whose layer cache a changed global ARG invalidates: the FROM when it
+    expands differently, or else the first `ARG NAME` redeclaring one.
+    """
+    old_args, new_args = _global_args(a), _global_args(b)
+    if old_args == new_args and old_args is not None:
+        return {}
+    if old_args is None or new_args is None:
+        return {stage.index: stage.start for stage in stages}
+    changed = set(name for name in set(old_args) | set(new_args)
+                  if old_args.get(name) != new_args.get(name))
+    escape = Resolver(b).escape
+    positions = {}
+    for stage in stages:
+        if _reads_changed_args(b.sequence[stage.start], old_args, new_args,
+                               escape):
+            positions[stage.index] = stage.start
+            continue
+        for position in range(stage.start + 1, stage.stop):
+            instruction = b.sequence[position]
+            if not isinstance(instruction, structures.ARG_t):
+                continue
+            if instruction.default_value is None and (
+                    instruction.key in changed):
+                positions[stage.index] = position
+                break
+    return positions
+
+
+def diff(a, b):
+    """Structurally diff two Dockerfiles, grouped by build stage.
+
+    The instruction sequences are diffed with `diff_sequences` and the
+    result is grouped by the build stages of `b`, the newer version. A
+    stage is `changed` if any of its instructions were inserted or deleted.
+    A stage is `invalidated` if it changed, if it reads a changed global
+    ARG (see below) or if a stage it depends on (see
+    `dockerphile.graph_tools.stage_graph`) is invalidated, and its
+    `first_invalidated` position is the first instruction of `b` whose
+    layer cache is invalidated: the first inserted instruction, the
+    instruction following a deletion, or the FROM or COPY --from that
+    reads an invalidated stage, whichever comes first. A stage whose FROM
+    expands differently under changed global ARGs (those declared before
+    the first FROM) is invalidated from its FROM, and one that redeclares a
+    changed global ARG with a bare `ARG NAME` from that ARG; if the global
+    ARGs of either version cannot be resolved, every stage is invalidated
+    from its FROM. When only trailing instructions of a stage were deleted,
+    its output still changes and `first_invalidated` is the stage `stop`,
+    one past its last instruction.
+
+    Args:
+        a: The old `dockerphile.Dockerfile`.
+        b: The new `dockerphile.Dockerfile`.
+
+    Returns:
+        A `dockerphile.diff_tools.DockerfileDiff` namedtuple holding the
+        flat list of `opcodes` and a list of `stages`, one
+        `dockerphile.diff_tools.StageDiff` per stage of `b` preceded by one
+        with `index` `None` for instructions before the first FROM, if
+        there are any. Each holds the stage `index` and `name`, the
+        `changed`, `invalidated` and `first_invalidated` markers described
+        above (`first_invalidated` is `None` exactly when the stage is not
+        invalidated) and the stage `opcodes`, split at stage boundaries.
+
+    Raises:
+        Nothing.
+
+    """
+    opcodes = diff_sequences(a.sequence, b.sequence)
+    graph = graph_tools.stage_graph(b)
+    groups = [(stage.index, stage.name, stage.start, stage.stop)
+              for stage in graph.stages]
+    first_start = groups[0][2] if groups else len(b.sequence)
+    if first_start or not groups:
+        groups.insert(0, (None, None, 0, first_start))
+    boundaries = [start for _, _, start, _ in groups[1:]]
+    grouped = {index: [] for index, _, _, _ in groups}
+    for opcode in _split_opcodes(opcodes, boundaries):
+        grouped[_owner(groups, opcode)].append(opcode)
+    prelude = _prelude_invalidations(a, b, graph.stages)
+    stages, invalidated = [], {}
+    for index, name, start, stop in groups:
+        first = None
+        for opcode in grouped[index]:
+            if opcode.tag != 'equal':
+                first = min(opcode.b_start, stop)
+                break
+        changed = first is not None
+        if index is not None:
+            if index in prelude and (first is None or prelude[index] < first):
+                first = prelude[index]
+            for position, dependency in graph.references[index]:
+                if invalidated[dependency]:
+                    if first is None or position < first:
+                        first = position
+                    break
+            invalidated[index] = first is not None
+        stages.append(StageDiff(
+            index=index, name=name, changed=changed,
+            invalidated=first is not None,
+            first_invalidated=first, opcodes=grouped[index]
+        ))
+    return DockerfileDiff(opcodes=opcodes, stages=stages)
@@ -1,13 +1,77 @@
-from dockerfile import parse_file
-
-from dockerphile import structures
-from dockerphile.errors import DockerphileError
-from dockerphile.parse_tools import parse_escape_directive, to_instruction
-from dockerphile.render_tools import render_instruction
+import hashlib
+import heapq
+import io
+import os
+from collections import namedtuple
+
+from dockerphile import (graph_tools, profile_tools, render_tools,
+                         resolve_tools, serialize_tools, structures)
+from dockerphile.errors import DockerphileError, DockerphileValidationError
+from dockerphile.parse_tools import (parse_instructions, ParseStats,
+                                     read_source)
 from dockerphile.run_block import RunBlock
 
 
-def new_dockerfile(source=None):
+RENDER_BUFFER_SIZE = 1 << 16
+Stage = namedtuple('Stage', ['index', 'name', 'start', 'stop'])
+SaveResult = namedtuple('SaveResult', ['written', 'unchanged'])
+HASH_CHUNK_SIZE = 1 << 20
+
+
+class _DigestWriter:
+    """Binary sink that hashes, counts and keeps what is written to it."""
+
+    def __init__(self):
+        """Start an empty sha256 digest."""
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.chunks = []
+
+    def write(self, data):
+        """Add bytes to the digest."""
+        self.hasher.update(data)
+        self.size += len(data)
+        self.chunks.append(data)
+
+
+def _file_digest(filename):
+    """Helper to hash a file's content in chunks."""
+    hasher = hashlib.sha256()
+    with open(filename, 'rb') as _file:
+        for chunk in iter(lambda: _file.read(HASH_CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.digest()
+
+
+def _fsync_directory(directory):
+    """Helper to flush a directory entry change (e.g. a rename) to disk."""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def _new_file_mode():
+    """Helper to get the permissions `open` would give a new file."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _copies_from_variable_index(resolver, stage):
+    """Helper to tell if a COPY --from=$VAR of a stage expands to a number."""
+    try:
+        instructions = resolver.scope(stage).instructions
+    except DockerphileError:
+        return False
+    return any(isinstance(instruction, structures.COPY_t) and (
+        instruction.from_ or '').isdigit() for instruction in instructions)
+
+
+def new_dockerfile(source=None, backend='go', validate=True, cache=None):
     """Create a blank Dockerfile object.
 
     The blank document can have Dockerfile command representation appended to
@@ -28,6 +92,14 @@ def new_dockerfile(source=None):
     Args:
         source: optional string naming a path to a source Dockerfile on disk
             used to initialize the `dockerphile.Dockerfile` commands.
+        backend: optional string naming the parser backend used for
+            `source`, one of `dockerphile.parse_tools.PARSER_BACKENDS`
+            (default 'go').
+        validate: optional boolean (default True). If False, parsed commands
+            skip the instruction factory checks; see
+            `dockerphile.Dockerfile.validate`.
+        cache: optional `dockerphile.cache_tools.ParseCache` used to reuse
+            the parsed instructions of an unchanged `source`.
 
     Returns:
         An empty `dockerphile.dockerfile_tools.Dockerfile` instance. Optionally
@@ -38,13 +110,15 @@ def new_dockerfile(source=None):
         Nothing.
 
     """
-    return Dockerfile(source=source)
+    return Dockerfile(source=source, backend=backend, validate=validate,
+                      cache=cache)
 
 
 class Dockerfile:
     """Programmatically create, modify and render Dockerfiles."""
 
-    def __init__(self, source=None):
+    def __init__(self, source=None, backend='go', validate=True,
+                 cache=None):
         """Create a new Dockerfile.
 
         Optionally parse a source Dockerfile and populate the new Dockerfile
@@ -53,35 +127,335 @@ class Dockerfile:
         Args:
             source: optional string naming a path to a source Dockerfile on
                 disk used to initialize the `dockerphile.Dockerfile` commands.
+            backend: optional string naming the parser backend used for
+                `source`, one of `dockerphile.parse_tools.PARSER_BACKENDS`
+                (default 'go').
+            validate: optional boolean (default True). If False, parsed
+                commands skip the instruction factory checks; see
+                `dockerphile.Dockerfile.validate`.
+            cache: optional `dockerphile.cache_tools.ParseCache`. If given,
+                the instructions of an unchanged `source` are loaded from
+                the cache instead of being parsed again.
 
         Returns:
-            Nothing. Instantiates `self` attributes for class instance created.
+            Nothing. Instantiates `self` attributes for class instance created,
+            including `parse_stats`, a `dockerphile.parse_tools.ParseStats`
+            recording the parsing cost of the source.
 
         Raises:
             Nothing.
 
         """
         self.sequence = []
+        self.parse_stats = ParseStats()
+        self._render_cache = {}
+        self._render_cache_version = render_tools.renderers_version
+        self._indexed_sequence = None
         if source is not None:
-            escape_directive = parse_escape_directive(source)
-            if escape_directive is not None:
-                self.sequence.append(escape_directive)
-            for command in parse_file(source):
-                instruction = to_instruction(command)
-                if instruction is None:
-                    continue
-                elif isinstance(instruction, list):
-                    self.sequence.extend(instruction)
-                else:
-                    self.sequence.append(instruction)
+            self._populate(read_source(source), backend, validate, cache)
+
+    @classmethod
+    def from_string(cls, text, backend='go', validate=True, cache=None):
+        """Create a new Dockerfile from a string of Dockerfile source.
+
+        Args:
+            text: A string containing the contents of a Dockerfile.
+            backend: Optional string naming the parser backend, one of
+                `dockerphile.parse_tools.PARSER_BACKENDS` (default 'go').
+            validate: Optional boolean (default True). If False, parsed
+                commands skip the instruction factory checks.
+            cache: Optional `dockerphile.cache_tools.ParseCache` to look up
+                and store the parsed commands in.
+
+        Returns:
+            A `dockerphile.Dockerfile` initialized with the parsed commands.
+
+        Raises:
+            DockerphileError: raised if `text` contains invalid Dockerfile
+                instructions.
+
+        """
+        dockerfile = cls()
+        dockerfile._populate(text, backend, validate, cache)
+        return dockerfile
+
+    @classmethod
+    def from_bytes(cls, data, encoding='utf-8', backend='go',
+                   validate=True, cache=None):
+        """Create a new Dockerfile from encoded source or `to_bytes` output.
+
+        Data starting with the `dockerphile.serialize_tools.MAGIC` header
+        is decoded as the binary format written by `to_bytes`, without any
+        parsing, and `encoding`, `backend` and `cache` are ignored. Unless
+        `validate` is False, each decoded instruction is then checked by its
+        factory function (see `dockerphile.structures.validate_instruction`),
+        so untrusted binary data gets the same per-instruction checks as
+        parsed source. Any other data is decoded as Dockerfile source text
+        and parsed.
+
+        Args:
+            data: A bytes-like object (e.g. `bytes`, `bytearray`, `memoryview`
+                or `mmap.mmap`) containing the contents of a Dockerfile, or
+                its binary encoding.
+            encoding: Optional string naming the text encoding of `data`
+                (default 'utf-8').
+            backend: Optional string naming the parser backend, one of
+                `dockerphile.parse_tools.PARSER_BACKENDS` (default 'go').
+            validate: Optional boolean (default True). If False, parsed
+                commands and decoded instructions skip the instruction
+                factory checks.
+            cache: Optional `dockerphile.cache_tools.ParseCache` to look up
+                and store the parsed commands in.
+
+        Returns:
+            A `dockerphile.Dockerfile` initialized with the parsed commands.
+
+        Raises:
+            DockerphileError: raised if `data` contains invalid Dockerfile
+                instructions or corrupt binary data.
+
+        """
+        if serialize_tools.is_serialized(data):
+            dockerfile = cls()
+            dockerfile.sequence.extend(serialize_tools.deserialize(data))
+            if validate:
+                for instruction in dockerfile.sequence:
+                    structures.validate_instruction(instruction)
+            return dockerfile
+        return cls.from_string(str(data, encoding), backend=backend,
+                               validate=validate, cache=cache)
+
+    @classmethod
+    def from_fileobj(cls, fileobj, encoding='utf-8', backend='go',
+                     validate=True, cache=None):
+        """Create a new Dockerfile from a readable file object.
+
+        The file object is read once, from its current position to the end.
+
+        Args:
+            fileobj: A file-like object opened in text or binary mode.
+            encoding: Optional string naming the text encoding used when
+                `fileobj` returns bytes (default 'utf-8').
+            backend: Optional string naming the parser backend, one of
+                `dockerphile.parse_tools.PARSER_BACKENDS` (default 'go').
+            validate: Optional boolean (default True). If False, parsed
+                commands skip the instruction factory checks.
+            cache: Optional `dockerphile.cache_tools.ParseCache` to look up
+                and store the parsed commands in.
+
+        Returns:
+            A `dockerphile.Dockerfile` initialized with the parsed commands.
+
+        Raises:
+            DockerphileError: raised if the file object contains invalid
+                Dockerfile instructions.
+
+        """
+        data = fileobj.read()
+        if isinstance(data, str):
+            return cls.from_string(data, backend=backend, validate=validate,
+                                   cache=cache)
+        return cls.from_bytes(data, encoding=encoding, backend=backend,
+                              validate=validate, cache=cache)
+
+    def _populate(self, text, backend, validate, cache=None):
+        """Append the parsed commands of a Dockerfile source string."""
+        profile = profile_tools.active
+        start = profile_tools.clock() if profile is not None else None
+        if cache is None:
+            instructions = parse_instructions(text, backend=backend,
+                                              validate=validate,
+                                              stats=self.parse_stats)
+        else:
+            instructions = cache.instructions(text, backend=backend,
+                                              validate=validate,
+                                              stats=self.parse_stats)
+        self.sequence.extend(instructions)
+        if profile is not None:
+            profile.record('populate', profile_tools.clock() - start)
 
     def __repr__(self):
         """Commit contents of self.sequence to string."""
-        return "\n".join(map(render_instruction, self.sequence)) + "\n"
+        result = "\n".join(map(self._render_cached, self.sequence)) + "\n"
+        self._trim_render_cache()
+        return result
+
+    def _render_cached(self, instruction):
+        """Render an instruction, reusing its rendering if unchanged.
 
-    def add(self, *uris):
+        Instructions are immutable namedtuples, so a rendered line is cached
+        under the identity of the instruction object. Editing the sequence
+        replaces instructions with new objects, so only those are rendered
+        again.
+        """
+        if self._render_cache_version != render_tools.renderers_version:
+            self._render_cache = {}
+            self._render_cache_version = render_tools.renderers_version
+        cached = self._render_cache.get(id(instruction))
+        if cached is not None and cached[0] is instruction:
+            return cached[1]
+        line = render_tools.render_instruction(instruction)
+        self._render_cache[id(instruction)] = (instruction, line)
+        return line
+
+    def _trim_render_cache(self):
+        """Drop cached renderings of instructions no longer in the sequence."""
+        if len(self._render_cache) <= 2 * len(self.sequence) + 16:
+            return
+        live = set(map(id, self.sequence))
+        self._render_cache = {
+            key: cached for key, cached in self._render_cache.items()
+            if key in live
+        }
+
+    def _index(self):
+        """Bring the type and stage indexes up to date with the sequence.
+
+        Instructions appended since the last call are indexed incrementally.
+        The indexes are rebuilt from scratch if `sequence` was replaced,
+        shrank, or was marked dirty by `insert`, `remove` or `replace`.
+        """
+        sequence = self.sequence
+        stale = self._indexed_sequence is not sequence
+        if stale or self._indexed_length > len(sequence):
+            self._indexed_sequence = sequence
+            self._indexed_length = 0
+            self._type_index = {}
+            self._stage_starts = []
+            self._stage_names = {}
+            self._stage_type_index = []
+        type_index, stage_starts = self._type_index, self._stage_starts
+        stage_index = self._stage_type_index[-1] if stage_starts else None
+        for position in range(self._indexed_length, len(sequence)):
+            instruction = sequence[position]
+            kind = type(instruction)
+            if isinstance(instruction, structures.FROM_t):
+                if instruction.as_ is not None:
+                    self._stage_names.setdefault(instruction.as_.lower(),
+                                                 len(stage_starts))
+                stage_starts.append(position)
+                stage_index = {}
+                self._stage_type_index.append(stage_index)
+            type_index.setdefault(kind, []).append(position)
+            if stage_index is not None:
+                stage_index.setdefault(kind, []).append(position)
+        self._indexed_length = len(sequence)
+
+    def _is_indexed(self, position):
+        """Helper to check whether the indexes cover a sequence position."""
+        if self._indexed_sequence is not self.sequence:
+            return False
+        return position < self._indexed_length
+
+    def _stage_number(self, stage):
+        """Helper to map a stage name or integer index to its number."""
+        if isinstance(stage, str):
+            number = self._stage_names.get(stage.lower())
+            if number is None:
+                raise DockerphileError("No build stage named %s" % stage)
+            return number
+        count = len(self._stage_starts)
+        if not isinstance(stage, int) or not -count <= stage < count:
+            raise DockerphileError("No build stage %s in a Dockerfile with "
+                                   "%d stage(s)" % (stage, count))
+        return stage % count
+
+    def _positions(self, instruction_type, stage):
+        """Helper to list the sorted positions matching a query."""
+        self._index()
+        if stage is None:
+            index, start, stop = self._type_index, 0, len(self.sequence)
+        else:
+            number = self._stage_number(stage)
+            found = self._stage(number)
+            index, start, stop = (self._stage_type_index[number],
+                                  found.start, found.stop)
+        if instruction_type is None:
+            return range(start, stop)
+        matches = [positions for kind, positions in index.items()
+                   if issubclass(kind, instruction_type)]
+        if len(matches) == 1:
+            return matches[0]
+        return list(heapq.merge(*matches))
+
+    def _stage(self, number):
+        """Helper to describe an indexed build stage by its number."""
+        start = self._stage_starts[number]
+        if number + 1 < len(self._stage_starts):
+            stop = self._stage_starts[number + 1]
+        else:
+            stop = len(self.sequence)
+        return Stage(index=number, name=self.sequence[start].as_,
+                     start=start, stop=stop)
+
+    def _check_position(self, position, allow_end=False):
+        """Helper to normalise a sequence position or raise an error."""
+        size = len(self.sequence) + (1 if allow_end else 0)
+        if not isinstance(position, int) or not -size <= position < size:
+            raise DockerphileError("Instruction position %s out of range for "
+                                   "%d instruction(s)"
+                                   % (position, len(self.sequence)))
+        return position % size
+
+    def _save(self, filename, buffer_size, encoding, if_changed, fsync):
+        """Helper to write one file for `save` and `save_many`."""
+        profile = profile_tools.active
+        if profile is None:
+            return self._write(filename, buffer_size, encoding, if_changed,
+                               fsync)
+        start = profile_tools.clock()
+        written = self._write(filename, buffer_size, encoding, if_changed,
+                              fsync)
+        profile.record('save', profile_tools.clock() - start)
+        return written
+
+    def _write(self, filename, buffer_size, encoding, if_changed, fsync):
+        """Helper to render a file, skipping unchanged ones if asked."""
+        if not if_changed:
+            with open(filename, 'w', encoding=encoding,
+                      newline='') as output:
+                self.render_to(output, buffer_size=buffer_size)
+                if fsync:
+                    output.flush()
+                    os.fsync(output.fileno())
+            return True
+        rendered = _DigestWriter()
+        self.render_to(rendered, buffer_size=buffer_size, encoding=encoding,
+                       binary=True)
+        try:
+            status = os.stat(filename)
+        except FileNotFoundError:
+            status = None
+        if status is not None and status.st_size == rendered.size and (
+                _file_digest(filename) == rendered.hasher.digest()):
+            return False
+        import tempfile
+        directory = os.path.dirname(os.path.abspath(filename))
+        descriptor, temporary = tempfile.mkstemp(
+            dir=directory, prefix='.%s.' % os.path.basename(filename),
+            suffix='.tmp'
+        )
+        try:
+            with os.fdopen(descriptor, 'wb') as output:
+                output.writelines(rendered.chunks)
+                output.flush()
+                if fsync:
+                    os.fsync(output.fileno())
+            if status is not None:
+                os.chmod(temporary, status.st_mode & 0o7777)
+            else:
+                os.chmod(temporary, _new_file_mode())
+            os.replace(temporary, filename)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return True
+
+    def add(self, *uris, chown=None, chmod=None, link=None):
         """add_t"""
-        self.sequence.append(structures.ADD(uris))
+        self.sequence.append(
+            structures.ADD(uris, chown=chown, chmod=chmod, link=link)
+        )
 
     def arg(self, key, value=None):
         """arg_t."""
@@ -101,9 +475,12 @@ class Dockerfile:
         """comment_t"""
         self.sequence.append(structures.COMMENT(comment))
 
-    def copy(self, *paths, from_=None):
+    def copy(self, *paths, from_=None, chown=None, chmod=None, link=None):
         """copy_t"""
-        self.sequence.append(structures.COPY(paths, from_=from_))
+        self.sequence.append(
+            structures.COPY(paths, from_=from_, chown=chown, chmod=chmod,
+                            link=link)
+        )
 
     def entrypoint(self, entrypoint, form='exec'):
         """entrypoint_t"""
@@ -127,12 +504,15 @@ class Dockerfile:
         """expose_t"""
         self.sequence.append(structures.EXPOSE(port_specs))
 
-    def from_(self, image, as_=None):
+    def from_(self, image, as_=None, platform=None):
         """from_t"""
-        self.sequence.append(structures.FROM(image, as_=as_))
+        self.sequence.append(
+            structures.FROM(image, as_=as_, platform=platform)
+        )
 
     def healthcheck(self, interval=None, timeout=None,
-                    start_period=None, retries=None, cmd=None):
+                    start_period=None, retries=None, cmd=None,
+                    start_interval=None):
         """healthcheck_t"""
         self.sequence.append(
             structures.HEALTHCHECK(
@@ -140,18 +520,270 @@ class Dockerfile:
                 timeout=timeout,
                 start_period=start_period,
                 retries=retries,
-                cmd=cmd
+                cmd=cmd,
+                start_interval=start_interval
             )
         )
 
+    def insert(self, position, instruction):
+        """Insert an instruction before the given sequence position.
+
+        Args:
+            position: Integer position in `sequence`; negative positions
+                count from the end and `len(sequence)` appends.
+            instruction: A `dockerphile.structures` instruction.
+
+        Returns:
+            Nothing.
+
+        Raises:
+            DockerphileError: raised if `position` is out of range.
+
+        """
+        position = self._check_position(position, allow_end=True)
+        if self._is_indexed(position):
+            self._indexed_sequence = None
+        self.sequence.insert(position, instruction)
+
+    def instructions(self, instruction_type=None, stage=None):
+        """Return the instructions of a type, optionally within one stage.
+
+        Queries are answered from indexes by instruction type and by build
+        stage, which are maintained incrementally as instructions are
+        appended and rebuilt lazily after `insert`, `remove` or `replace`.
+
+        Args:
+            instruction_type: Optional `dockerphile.structures` type (or a
+                tuple of types), e.g. `dockerphile.structures.ENV_t`.
+                Instances of subclasses match as well. By default all
+                instructions match.
+            stage: Optional build stage, either its `as_` name (matched case
+                insensitively) or an integer index of the FROM instructions,
+                where -1 is the final stage. By default the whole sequence is
+                searched, including global ARGs before the first FROM.
+
+        Returns:
+            A list of matching instructions in sequence order.
+
+        Raises:
+            DockerphileError: raised if `stage` names no build stage.
+
+        """
+        sequence = self.sequence
+        return [sequence[position]
+                for position in self._positions(instruction_type, stage)]
+
     def label(self, key, value):
         """label_t"""
         self.sequence.append(structures.LABEL(key, value))
 
+    def last(self, instruction_type=None, stage=None):
+        """Return the last instruction of a type, optionally within a stage.
+
+        For example `last(structures.CMD_t, stage=-1)` is the CMD in effect
+        for the final image.
+
+        Args:
+            instruction_type: Optional `dockerphile.structures` type, as for
+                `instructions`.
+            stage: Optional build stage name or index, as for `instructions`.
+
+        Returns:
+            The last matching instruction, or `None` if nothing matches.
+
+        Raises:
+            DockerphileError: raised if `stage` names no build stage.
+
+        """
+        positions = self._positions(instruction_type, stage)
+        if not positions:
+            return None
+        return self.sequence[positions[-1]]
+
     def onbuild(self, instruction):
         """onbuild_t"""
         self.sequence.append(structures.ONBUILD(instruction))
 
+    def prune(self, target=-1, build_args=None):
+        """Return a copy of this Dockerfile without unneeded build stages.
+
+        Stages that `target` does not depend on, directly or transitively
+        (see `dockerphile.graph_tools.stage_graph`), are dropped along with
+        every stage after `target`. Instructions before the first FROM are
+        kept, and COPY `--from` references by integer stage index are
+        renumbered to match the remaining stages. A kept COPY `--from`
+        holding a `$` that expands to an integer index cannot be renumbered,
+        so then every stage before `target` is kept.
+
+        Args:
+            target: Optional stage name or integer index to build (default
+                -1, the final stage).
+            build_args: Optional dictionary of `--build-arg` values used to
+                expand FROM and COPY `--from` references.
+
+        Returns:
+            A new `dockerphile.Dockerfile` sharing the kept instructions.
+
+        Raises:
+            DockerphileError: raised if `target` names no build stage.
+
+        """
+        graph = graph_tools.stage_graph(self, build_args)
+        kept = graph_tools.reachable_stages(graph, target)
+        resolver = resolve_tools.Resolver(self, build_args)
+        for index in kept:
+            stage = graph.stages[index]
+            sources = [instruction.from_ or '' for instruction
+                       in self.sequence[stage.start:stage.stop]
+                       if isinstance(instruction, structures.COPY_t)]
+            if any('$' in source for source in sources) and (
+                    _copies_from_variable_index(resolver, index)):
+                kept = tuple(range(kept[-1] + 1))
+                break
+        renumbered = {str(old): str(new) for new, old in enumerate(kept)}
+        pruned = type(self)()
+        pruned.sequence.extend(self.sequence[:graph.stages[0].start])
+        for index in kept:
+            stage = graph.stages[index]
+            for instruction in self.sequence[stage.start:stage.stop]:
+                if isinstance(instruction, structures.COPY_t) and (
+                        instruction.from_ in renumbered):
+                    instruction = instruction._replace(
+                        from_=renumbered[instruction.from_]
+                    )
+                pruned.sequence.append(instruction)
+        return pruned
+
+    def reindex(self):
+        """Rebuild the query indexes on the next query.
+
+        Only needed after assigning to items of `sequence` directly; appends
+        and the `insert`, `remove` and `replace` methods keep the indexes
+        correct on their own.
+
+        Args:
+            None.
+
+        Returns:
+            Nothing.
+
+        Raises:
+            Nothing.
+
+        """
+        self._indexed_sequence = None
+
+    def remove(self, position):
+        """Remove and return the instruction at a sequence position.
+
+        Args:
+            position: Integer position in `sequence`; negative positions
+                count from the end.
+
+        Returns:
+            The removed instruction.
+
+        Raises:
+            DockerphileError: raised if `position` is out of range.
+
+        """
+        position = self._check_position(position)
+        instruction = self.sequence[position]
+        is_tail = position + 1 == len(self.sequence) and not isinstance(
+            instruction, structures.FROM_t)
+        if self._is_indexed(position) and is_tail:
+            kind = type(instruction)
+            self._type_index[kind].pop()
+            if self._stage_type_index:
+                self._stage_type_index[-1][kind].pop()
+            self._indexed_length -= 1
+        elif self._is_indexed(position):
+            self._indexed_sequence = None
+        return self.sequence.pop(position)
+
+    def render_to(self, stream, buffer_size=RENDER_BUFFER_SIZE,
+                  encoding='utf-8', binary=None):
+        """Write the rendered Dockerfile to a stream one instruction at a time.
+
+        Rendered instructions are collected into chunks of roughly
+        `buffer_size` characters before each write, so the whole document is
+        never held in memory at once. The written output is identical to
+        `str(self)`.
+
+        Args:
+            stream: A writable text or binary stream, such as an open file,
+                a pipe, a `gzip.GzipFile` or `io.BytesIO`. An object without a
+                `write` method but with a `sendall` method (e.g. a connected
+                socket) is written to as a binary stream.
+            buffer_size: Optional integer number of characters to buffer
+                between writes (default `RENDER_BUFFER_SIZE`). Use 0 to write
+                each instruction as soon as it is rendered.
+            encoding: Optional string naming the encoding used for binary
+                streams (default 'utf-8').
+            binary: Optional boolean declaring whether `stream` accepts
+                bytes. By default this is detected from the stream type.
+
+        Returns:
+            An integer count of the characters written.
+
+        Raises:
+            DockerphileError: raised if an instruction cannot be rendered.
+
+        """
+        write = getattr(stream, 'write', None)
+        if write is None:
+            write = stream.sendall
+            binary = True
+        elif binary is None and isinstance(stream, io.TextIOBase):
+            binary = False
+        elif binary is None:
+            binary = isinstance(stream, (io.RawIOBase, io.BufferedIOBase))
+            binary = binary or 'b' in getattr(stream, 'mode', '')
+        if binary:
+            def emit(chunk):
+                write(chunk.encode(encoding))
+        else:
+            emit = write
+        written, pending, pending_size = 0, [], 0
+        for instruction in self.sequence or [None]:
+            line = ('' if instruction is None
+                    else self._render_cached(instruction)) + "\n"
+            pending.append(line)
+            pending_size += len(line)
+            if pending_size >= buffer_size:
+                emit(''.join(pending))
+                written += pending_size
+                pending, pending_size = [], 0
+        if pending:
+            emit(''.join(pending))
+            written += pending_size
+        self._trim_render_cache()
+        return written
+
+    def replace(self, position, instruction):
+        """Replace the instruction at a sequence position.
+
+        Args:
+            position: Integer position in `sequence`; negative positions
+                count from the end.
+            instruction: A `dockerphile.structures` instruction.
+
+        Returns:
+            The replaced instruction.
+
+        Raises:
+            DockerphileError: raised if `position` is out of range.
+
+        """
+        position = self._check_position(position)
+        previous = self.sequence[position]
+        same_kind = type(previous) is type(instruction) and not isinstance(
+            instruction, structures.FROM_t)
+        if self._is_indexed(position) and not same_kind:
+            self._indexed_sequence = None
+        self.sequence[position] = instruction
+        return previous
+
     def run(self, command, form='shell'):
         """run_t"""
         if form not in {'exec', 'shell'}:
@@ -170,23 +802,161 @@ class Dockerfile:
             )
         return RunBlock(self, form=form)
 
-    def save(self, filename):
-        """Commit contents of Dockerfile to a file on disk."""
-        with open(filename, 'w') as output:
-            output.write(str(self))
+    def save(self, filename, buffer_size=RENDER_BUFFER_SIZE,
+             encoding='utf-8', if_changed=False, fsync=False):
+        """Commit contents of Dockerfile to a file on disk.
+
+        Lines always end in a line feed, whatever the platform. By default
+        the file is truncated and rewritten in place. With `if_changed=True`
+        the content is rendered once and hashed, and the write is skipped
+        when the file already has that content, so its mtime is left alone.
+        Otherwise the rendered bytes are written to a temporary file in the
+        same directory which then atomically replaces `filename` (keeping
+        the permissions of the file it replaces), so readers never see a
+        partially written Dockerfile.
+
+        Args:
+            filename: A string naming the file to write.
+            buffer_size: Optional integer number of characters to buffer
+                between writes (default `RENDER_BUFFER_SIZE`).
+            encoding: Optional string naming the file encoding (default
+                'utf-8').
+            if_changed: Optional boolean (default False) selecting the
+                compare-then-atomic-replace mode described above.
+            fsync: Optional boolean (default False). If set, the file (and,
+                when it is replaced, its directory) is flushed to disk
+                before returning.
+
+        Returns:
+            True if the file was written, False if it was left unchanged.
+
+        Raises:
+            DockerphileError: raised if an instruction cannot be rendered.
+            OSError: raised if the file cannot be read or written.
+
+        """
+        written = self._save(filename, buffer_size, encoding, if_changed,
+                             fsync)
+        if written and if_changed and fsync:
+            _fsync_directory(os.path.dirname(os.path.abspath(filename)))
+        return written
 
     def shell(self, shell_spec):
         """shell_t"""
         self.sequence.append(structures.SHELL(shell_spec))
 
+    def stage(self, stage):
+        """Look up one build stage by name or index.
+
+        Args:
+            stage: The `as_` name of a stage (matched case insensitively) or
+                an integer index of the FROM instructions, where -1 is the
+                final stage.
+
+        Returns:
+            A `dockerphile.dockerfile_tools.Stage` namedtuple with fields
+            `index`, `name`, `start` (the position of its FROM) and `stop`
+            (the position after its last instruction).
+
+        Raises:
+            DockerphileError: raised if `stage` names no build stage.
+
+        """
+        self._index()
+        return self._stage(self._stage_number(stage))
+
+    def stages(self):
+        """List the build stages delimited by FROM instructions.
+
+        Args:
+            None.
+
+        Returns:
+            A list of `dockerphile.dockerfile_tools.Stage` namedtuples in
+            sequence order.
+
+        Raises:
+            Nothing.
+
+        """
+        self._index()
+        return [self._stage(number)
+                for number in range(len(self._stage_starts))]
+
     def stopsignal(self, signal):
         """stopsignal_t"""
         self.sequence.append(structures.STOPSIGNAL(signal))
 
+    def to_bytes(self):
+        """Encode the instructions in the compact dockerphile binary format.
+
+        The result is much smaller than the rendered Dockerfile and is
+        decoded by `from_bytes` (or `from_fileobj` of a binary file) without
+        parsing, so it suits passing parsed Dockerfiles between processes
+        and services. See `dockerphile.serialize_tools.serialize`.
+
+        Args:
+            None.
+
+        Returns:
+            A bytes object starting with `dockerphile.serialize_tools.MAGIC`.
+
+        Raises:
+            DockerphileError: raised if the sequence holds instructions that
+                are not `dockerphile.structures` types.
+
+        """
+        return serialize_tools.serialize(self.sequence)
+
     def user(self, user, group=None):
         """user_t"""
         self.sequence.append(structures.USER(user, group=group))
 
+    def validate(self):
+        """Check every instruction in one sweep and report all problems.
+
+        Each instruction is re-checked by its factory function (see
+        `dockerphile.structures.validate_instruction`), which catches
+        invalid instructions built with `validate=False` or assembled by
+        hand. The sequence is also checked for an `escape` directive that is
+        not the first entry and for instructions other than ARG preceding
+        the first FROM.
+
+        Args:
+            None.
+
+        Returns:
+            Nothing.
+
+        Raises:
+            DockerphileValidationError: raised if any problem is found. Its
+                `problems` attribute lists a description of each of them.
+
+        """
+        problems = []
+        seen_from = False
+        for index, instruction in enumerate(self.sequence):
+            try:
+                structures.validate_instruction(instruction)
+            except DockerphileError as error:
+                problems.append("instruction %d %s: %s" % (
+                    index, type(instruction).__name__, error
+                ))
+                continue
+            if isinstance(instruction, structures.ESCAPE_t) and index:
+                problems.append("instruction %d ESCAPE: escape directive "
+                                "must be the first line." % index)
+            elif isinstance(instruction, structures.FROM_t):
+                seen_from = True
+            elif not seen_from and not isinstance(
+                    instruction, (structures.ARG_t, structures.COMMENT_t,
+                                  structures.ESCAPE_t)):
+                problems.append("instruction %d %s: only ARG may precede "
+                                "the first FROM." % (
+                                    index, type(instruction).__name__))
+        if problems:
+            raise DockerphileValidationError(problems)
+
     def volume(self, *volume_specs):
         """volume_t"""
         self.sequence.append(structures.VOLUME(volume_specs))
@@ -194,3 +964,48 @@ class Dockerfile:
     def workdir(self, workdir):
         """workdir_t"""
         self.sequence.append(structures.WORKDIR(workdir))
+
+
+def save_many(items, buffer_size=RENDER_BUFFER_SIZE, encoding='utf-8',
+              if_changed=True, fsync=False):
+    """Save many Dockerfiles, writing only those whose content changed.
+
+    Each file is handled as by `dockerphile.Dockerfile.save`. With `fsync`,
+    each written file is flushed and every affected directory is flushed
+    once at the end rather than once per file.
+
+    Args:
+        items: A mapping from file names to `dockerphile.Dockerfile`
+            instances, or an iterable of `(filename, dockerfile)` pairs.
+        buffer_size: Optional integer number of characters to buffer
+            between writes (default `RENDER_BUFFER_SIZE`).
+        encoding: Optional string naming the file encoding (default
+            'utf-8').
+        if_changed: Optional boolean (default True). If False every file
+            is rewritten in place.
+        fsync: Optional boolean (default False) to flush written files and
+            their directories to disk.
+
+    Returns:
+        A `dockerphile.dockerfile_tools.SaveResult` namedtuple with lists of
+        the `written` and `unchanged` file names, in input order.
+
+    Raises:
+        DockerphileError: raised if an instruction cannot be rendered.
+        OSError: raised if a file cannot be read or written.
+
+    """
+    if hasattr(items, 'items'):
+        items = items.items()
+    written, unchanged, directories = [], [], set()
+    for filename, dockerfile in items:
+        if dockerfile._save(filename, buffer_size, encoding, if_changed,
+                            fsync):
+            written.append(filename)
+            directories.add(os.path.dirname(os.path.abspath(filename)))
+        else:
+            unchanged.append(filename)
+    if if_changed and fsync:
+        for directory in sorted(directories):
+            _fsync_directory(directory)
+    return SaveResult(written=written, unchanged=unchanged)
@@ -2,3 +2,17 @@ class DockerphileError(Exception):
     """Exception class to give `dockerphile` errors a custom exception name."""
 
     pass
+
+
+class DockerphileValidationError(DockerphileError):
+    """Exception listing every problem found when validating a Dockerfile."""
+
+    def __init__(self, problems):
+        """Store the list of problem descriptions on the exception."""
+        self.problems = list(problems)
+        super().__init__(
+            "Dockerfile has %d invalid instruction(s):\n%s" % (
+                len(self.problems),
+                "\n".join(self.problems)
+            )
+        )
@@ -0,0 +1,222 @@
+import glob
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+from dockerphile import render_tools, structures
+from dockerphile.errors import DockerphileError
+from dockerphile.resolve_tools import Resolver
+
+
+StageFingerprint = namedtuple('StageFingerprint', [
+    'index', 'name', 'digest', 'instruction_digests'
+])
+HASH_CHUNK_SIZE = 1 << 20
+DEFAULT_CACHE_PATH = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+    'dockerphile', 'file-hashes.json'
+)
+REMOTE_PREFIXES = ('http://', 'https://', 'git@', 'git://')
+
+
+class FileHashCache:
+    """On-disk memo of file content hashes keyed by file metadata."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        """Load a file hash cache.
+
+        Each entry maps an absolute file path to its size, modification time
+        (in nanoseconds), inode number and sha256 digest. A file is hashed
+        again only if any of those metadata values changed. A missing or
+        unreadable cache file starts an empty cache.
+
+        Args:
+            path: Optional string naming the JSON cache file (default
+                `DEFAULT_CACHE_PATH`). If `None`, hashes are only memoised
+                in memory.
+
+        Returns:
+            Nothing.
+
+        Raises:
+            Nothing.
+
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._dirty = False
+        if path is not None:
+            try:
+                with open(path, 'r') as _file:
+                    self._entries = json.load(_file)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def digest(self, filename):
+        """Return the sha256 hex digest of a file's content.
+
+        Args:
+            filename: A string naming a regular file.
+
+        Returns:
+            A string containing the hex digest.
+
+        Raises:
+            OSError: raised if the file cannot be read.
+
+        """
+        key = os.path.abspath(filename)
+        status = os.stat(key)
+        signature = [status.st_size, status.st_mtime_ns, status.st_ino]
+        entry = self._entries.get(key)
+        if entry is not None and entry[:3] == signature:
+            self.hits += 1
+            return entry[3]
+        self.misses += 1
+        hasher = hashlib.sha256()
+        with open(key, 'rb') as _file:
+            for chunk in iter(lambda: _file.read(HASH_CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        self._entries[key] = signature + [hasher.hexdigest()]
+        self._dirty = True
+        return hasher.hexdigest()
+
+    def save(self):
+        """Write the cache file if any entry changed.
+
+        The file is replaced atomically, so concurrent readers never see a
+        partially written cache.
+
+        Args:
+            None.
+
+        Returns:
+            Nothing.
+
+        Raises:
+            OSError: raised if the cache file cannot be written.
+
+        """
+        if self.path is None or not self._dirty:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temporary = "%s.%d.tmp" % (self.path, os.getpid())
+        with open(temporary, 'w') as _file:
+            json.dump(self._entries, _file)
+        os.replace(temporary, self.path)
+        self._dirty = False
+
+
+def _hash(*parts):
+    """Helper to hash a sequence of strings into a hex digest."""
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part.encode('utf-8'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+def _context_files(context, source):
+    """Helper to list the files matched by one COPY or ADD source."""
+    pattern = os.path.join(context, source.lstrip('/'))
+    matches = sorted(glob.glob(pattern))
+    if not matches:
+        raise DockerphileError("COPY or ADD source %s not found in build "
+                               "context %s" % (source, context))
+    for match in matches:
+        if not os.path.isdir(match):
+            yield match
+            continue
+        for dirpath, dirnames, filenames in os.walk(match):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                yield os.path.join(dirpath, filename)
+
+
+def _sources_digest(instruction, context, hash_cache):
+    """Helper to hash the build context content used by a COPY or ADD."""
+    parts = []
+    for source in instruction.resources[:-1]:
+        if source.startswith(REMOTE_PREFIXES):
+            parts.append(source)
+            continue
+        for filename in _context_files(context, source):
+            parts.append(os.path.relpath(filename, context))
+            parts.append(hash_cache.digest(filename))
+    return _hash(*parts)
+
+
+def fingerprint(dockerfile, context, build_args=None,
+                cache_path=DEFAULT_CACHE_PATH):
+    """Compute chained content-addressed cache keys for each instruction.
+
+    Like the layer cache, the key of every instruction hashes the key of
+    the instruction before it together with the instruction itself, so a
+    change invalidates every later key in the stage. Instructions are
+    hashed after ARG and ENV resolution (see
+    `dockerphile.resolve_tools.Resolver`), so build args are accounted for.
+    A COPY or ADD also hashes the relative paths and content of every
+    context file it reads (remote ADD sources are hashed by URL only), and
+    a COPY `--from` or FROM of an earlier stage hashes that stage's digest.
+    External base images are hashed by reference, so pin them by digest to
+    notice upstream changes. `.dockerignore` is not applied, which can only
+    make keys change more often, never less.
+
+    Args:
+        dockerfile: A `dockerphile.Dockerfile` instance.
+        context: A string naming the build context directory.
+        build_args: Optional dictionary of `--build-arg` values.
+        cache_path: Optional string naming the on-disk file hash cache (see
+            `dockerphile.fingerprint_tools.FileHashCache`), or `None` to
+            keep file hashes in memory only.
+
+    Returns:
+        A list of `dockerphile.fingerprint_tools.StageFingerprint`
+        namedtuples, one per stage, holding the stage `index` and `name`,
+        the stage `digest` (the key of its last instruction) and the tuple
+        of `instruction_digests`.
+
+    Raises:
+        DockerphileError: raised for invalid variable references or if a
+            COPY or ADD source is missing from `context`.
+        OSError: raised if a context file cannot be read.
+
+    """
+    resolver = Resolver(dockerfile, build_args=build_args)
+    hash_cache = FileHashCache(cache_path)
+    digests, names, result = [], {}, []
+    for stage in dockerfile.stages():
+        scope = resolver.scope(stage.index)
+        key = ''
+        instruction_digests = []
+        for instruction in scope.instructions:
+            parts = [key, render_tools.render_instruction(instruction)]
+            if isinstance(instruction, structures.FROM_t):
+                if scope.parent is not None:
+                    parts.append(digests[scope.parent])
+            elif isinstance(instruction, structures.COPY_t) and (
+                    instruction.from_ is not None):
+                parent = names.get(instruction.from_.lower())
+                if parent is None and instruction.from_.isdigit():
+                    parent = int(instruction.from_)
+                if parent is not None and parent < stage.index:
+                    parts.append(digests[parent])
+            elif isinstance(instruction, (structures.ADD_t,
+                                          structures.COPY_t)):
+                parts.append(_sources_digest(instruction, context,
+                                             hash_cache))
+            key = _hash(*parts)
+            instruction_digests.append(key)
+        digests.append(key)
+        if stage.name is not None:
+            names.setdefault(stage.name.lower(), stage.index)
+        result.append(StageFingerprint(
+            index=stage.index, name=stage.name, digest=key,
+            instruction_digests=tuple(instruction_digests)
+        ))
+    hash_cache.save()
+    return result
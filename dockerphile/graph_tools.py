@@ -0,0 +1,213 @@
+from collections import namedtuple
+
+from dockerphile import resolve_tools, structures
+from dockerphile.errors import DockerphileError
+
+
+StageGraph = namedtuple('StageGraph', ['stages', 'dependencies',
+                                       'references'])
+
+
+def _stage_reference(reference, names, current, allow_index):
+    """Helper to resolve a FROM or COPY --from reference to a stage index."""
+    index = names.get(reference.lower())
+    if index is not None:
+        return index
+    if allow_index and reference.isdigit() and int(reference) < current:
+        return int(reference)
+    return None
+
+
+def _expanded_reference(resolver, stage, position):
+    """Helper to expand the variables of a FROM or COPY --from reference.
+
+    Returns `None` when the reference cannot be expanded or expands to
+    nothing, in which case it may name any earlier stage.
+    """
+    try:
+        instruction = resolver.scope(stage.index).instructions[
+            position - stage.start]
+    except DockerphileError:
+        return None
+    if isinstance(instruction, structures.FROM_t):
+        return instruction.base_image or None
+    return instruction.from_ or None
+
+
+def _target_index(graph, target):
+    """Helper to map a target stage name or index to its stage index."""
+    count = len(graph.stages)
+    if isinstance(target, str):
+        for stage in graph.stages:
+            if stage.name is not None and stage.name.lower() == target.lower():
+                return stage.index
+        raise DockerphileError("No build stage named %s" % target)
+    if not isinstance(target, int) or not -count <= target < count:
+        raise DockerphileError("No build stage %s in a Dockerfile with %d "
+                               "stage(s)" % (target, count))
+    return target % count
+
+
+def stage_graph(dockerfile, build_args=None):
+    """Build the dependency graph between the stages of a Dockerfile.
+
+    A stage depends on an earlier stage when its FROM names that stage (by
+    its `as_` name) or when one of its COPY instructions copies `--from` it
+    (by name or by integer index). References to anything else are external
+    images and add no edge. References holding a `$` are expanded first
+    with `dockerphile.resolve_tools.Resolver`, as `docker build` would; one
+    that cannot be expanded, or expands to nothing, conservatively depends
+    on every earlier stage. Only earlier stages can be referenced, so the
+    graph is acyclic and stage order is a topological order.
+
+    Args:
+        dockerfile: A `dockerphile.Dockerfile` instance.
+        build_args: Optional dictionary of `--build-arg` values used to
+            expand references.
+
+    Returns:
+        A `dockerphile.graph_tools.StageGraph` namedtuple. Its `stages`
+        field is a tuple of `dockerphile.dockerfile_tools.Stage` namedtuples,
+        its `dependencies` field holds, for each stage, a sorted tuple of
+        the indexes of the stages it depends on, and its `references` field
+        holds, for each stage, a tuple of `(position, index)` pairs giving
+        the sequence position of each FROM or COPY referencing an earlier
+        stage and the index of that stage, in order.
+
+    Raises:
+        Nothing.
+
+    """
+    stages = tuple(dockerfile.stages())
+    sequence = dockerfile.sequence
+    names, dependencies, references = {}, [], []
+    resolver = None
+    for stage in stages:
+        found = []
+        for position in range(stage.start, stage.stop):
+            instruction = sequence[position]
+            if isinstance(instruction, structures.FROM_t):
+                text, allow_index = instruction.base_image, False
+            elif isinstance(instruction, structures.COPY_t) and (
+                    instruction.from_ is not None):
+                text, allow_index = instruction.from_, True
+            else:
+                continue
+            if '$' in text:
+                if resolver is None:
+                    resolver = resolve_tools.Resolver(dockerfile, build_args)
+                text = _expanded_reference(resolver, stage, position)
+                if text is None:
+                    found.extend((position, index)
+                                 for index in range(stage.index))
+                    continue
+            reference = _stage_reference(text, names, stage.index,
+                                         allow_index)
+            if reference is not None:
+                found.append((position, reference))
+        dependencies.append(tuple(sorted({index for _, index in found})))
+        references.append(tuple(found))
+        if stage.name is not None:
+            names.setdefault(stage.name.lower(), stage.index)
+    return StageGraph(stages=stages, dependencies=tuple(dependencies),
+                      references=tuple(references))
+
+
+def reachable_stages(graph, target=-1):
+    """List the stages needed to build a target stage.
+
+    Args:
+        graph: A `dockerphile.graph_tools.StageGraph`.
+        target: Optional stage name or integer index to build (default -1,
+            the final stage).
+
+    Returns:
+        A sorted tuple of the indexes of `target` and every stage it
+        depends on, directly or transitively.
+
+    Raises:
+        DockerphileError: raised if `target` names no build stage.
+
+    """
+    pending = [_target_index(graph, target)]
+    found = set(pending)
+    while pending:
+        for dependency in graph.dependencies[pending.pop()]:
+            if dependency not in found:
+                found.add(dependency)
+                pending.append(dependency)
+    return tuple(sorted(found))
+
+
+def waves(graph, target=-1):
+    """Group the stages needed for a target into parallel build waves.
+
+    Every stage in a wave depends only on stages in earlier waves, so the
+    stages of one wave can be built concurrently once the previous waves
+    are done.
+
+    Args:
+        graph: A `dockerphile.graph_tools.StageGraph`.
+        target: Optional stage name or integer index to build (default -1,
+            the final stage).
+
+    Returns:
+        A list of sorted tuples of stage indexes, one per wave, with the
+        wave containing `target` last.
+
+    Raises:
+        DockerphileError: raised if `target` names no build stage.
+
+    """
+    levels = {}
+    for index in reachable_stages(graph, target):
+        levels[index] = 1 + max(
+            (levels[dependency] for dependency in graph.dependencies[index]),
+            default=-1
+        )
+    result = [[] for _ in range(max(levels.values()) + 1)]
+    for index, level in levels.items():
+        result[level].append(index)
+    return [tuple(wave) for wave in result]
+
+
+def critical_path(graph, target=-1, weights=None):
+    """Find the most expensive chain of stage dependencies for a target.
+
+    The critical path bounds the build time of `target` however many stages
+    are built in parallel.
+
+    Args:
+        graph: A `dockerphile.graph_tools.StageGraph`.
+        target: Optional stage name or integer index to build (default -1,
+            the final stage).
+        weights: Optional mapping from stage index to its build cost. By
+            default the cost of a stage is its number of instructions.
+
+    Returns:
+        A tuple `(path, cost)` of a tuple of stage indexes from a stage
+        without dependencies to `target`, and the summed cost along it.
+
+    Raises:
+        DockerphileError: raised if `target` names no build stage.
+
+    """
+    costs, previous = {}, {}
+    for index in reachable_stages(graph, target):
+        stage = graph.stages[index]
+        if weights is None:
+            weight = stage.stop - stage.start
+        else:
+            weight = weights[index]
+        best = None
+        for dependency in graph.dependencies[index]:
+            if best is None or costs[dependency] > costs[best]:
+                best = dependency
+        previous[index] = best
+        costs[index] = weight + (0 if best is None else costs[best])
+    index = _target_index(graph, target)
+    cost, path = costs[index], []
+    while index is not None:
+        path.append(index)
+        index = previous[index]
+    return tuple(reversed(path)), cost
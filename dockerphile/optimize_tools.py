@@ -0,0 +1,523 @@
+import fnmatch
+import posixpath
+import re
+from collections import namedtuple
+
+from dockerphile import structures
+from dockerphile.run_block import RUN_CHAIN_PREFIX, RUN_CHAIN_SEPARATOR
+from dockerphile.tokenize_tools import DEFAULT_ESCAPE
+
+
+Ecosystem = namedtuple('Ecosystem', ['name', 'install', 'manifests',
+                                     'default_manifests'])
+CacheFinding = namedtuple('CacheFinding', [
+    'ecosystem', 'stage', 'broad_copy', 'install', 'manifest_copy',
+    'movable', 'reason'
+])
+CacheReport = namedtuple('CacheReport', [
+    'dockerfile', 'findings', 'cached_layers_before', 'cached_layers_after'
+])
+CoalesceReport = namedtuple('CoalesceReport', [
+    'dockerfile', 'merged', 'layers_saved'
+])
+ECOSYSTEMS = (
+    Ecosystem(
+        name='pip',
+        install=re.compile(r"\b(?:pip3?|python3? -m pip) install\b"),
+        manifests=('*requirements*.txt', 'constraints*.txt'),
+        default_manifests=()
+    ),
+    Ecosystem(
+        name='npm',
+        install=re.compile(r"\b(?:npm (?:ci|install|i)|pnpm install|"
+                           r"yarn(?: install)?(?![ \t]+[a-z]))\b"),
+        manifests=('package*.json', 'yarn.lock', 'pnpm-lock.yaml',
+                   'pnpm-workspace.yaml', 'npm-shrinkwrap.json', '.npmrc',
+                   '.yarnrc*'),
+        default_manifests=('package*.json', '.npmr[c]')
+    ),
+    Ecosystem(
+        name='go',
+        install=re.compile(r"\bgo mod download\b"),
+        manifests=('go.mod', 'go.sum'),
+        default_manifests=('go.mod', 'go.su[m]')
+    ),
+    Ecosystem(
+        name='maven',
+        install=re.compile(r"\bmvn\b.*\bdependency:(?:go-offline|resolve)"),
+        manifests=('pom.xml',),
+        default_manifests=('pom.xml',)
+    ),
+    Ecosystem(
+        name='apt',
+        install=re.compile(r"\bapt(?:-get)? (?:-\S+ )*install\b"),
+        manifests=(),
+        default_manifests=()
+    ),
+)
+NODE_MANIFESTS = (
+    (re.compile(r"\bpnpm\b"), ('package.json', 'pnpm-lock.yam[l]',
+                               'pnpm-workspace.yam[l]', '.npmr[c]')),
+    (re.compile(r"\byarn\b"), ('package.json', 'yarn.loc[k]', '.yarnrc*',
+                               '.npmr[c]')),
+)
+BROAD_SOURCES = ('.', './', '*', './*')
+command_separator = re.compile(r"\s*(?:&&|\|\||;)\s*")
+housekeeping = re.compile(
+    r"^(?:apt(?:-get)? (?:-\S+ )*(?:update|clean)|rm -rf? |"
+    r"pip3? install (?:-\S+ )*--upgrade pip\b|npm cache clean|true$)"
+)
+pip_requirement = re.compile(
+    r"(?<!\S)(?:-[rc]\s*=?|--(?:requirement|constraint)(?:\s+|=))(\S+)"
+)
+pip_local_install = re.compile(r"(?:^|\s)(?:-e\s+)?\.(?:\[[^\]]*\])?(?:\s|$)")
+CARRIED_TYPES = (structures.ARG_t, structures.ENV_t)
+INERT_TYPES = (structures.CMD_t, structures.COMMENT_t, structures.ENTRYPOINT_t,
+               structures.EXPOSE_t, structures.HEALTHCHECK_t,
+               structures.LABEL_t, structures.ONBUILD_t,
+               structures.STOPSIGNAL_t)
+LAYER_TYPES = (structures.ADD_t, structures.COPY_t, structures.RUN_t)
+local_path = re.compile(
+    r"^(?:[/~.]|file:)|\.(?:deb|rpm|whl|zip|tgz|tar\.\w+)$"
+)
+DEFAULT_SHELL = ('/bin/sh', '-c')
+POSIX_SHELLS = ('ash', 'bash', 'dash', 'ksh', 'sh', 'zsh')
+unchainable_command = re.compile(r"#|<<|\n|(?<!&)&(?!&)")
+unchainable_tail = re.compile(r";|\|\|")
+shell_state_command = re.compile(
+    r"^(?:[({!]\s*|(?:if|then|else|elif|do|while|until)\s+)*"
+    r"(?:(?:cd|pushd|popd|export|unset|set|source|\.|alias|unalias|umask|"
+    r"ulimit|shopt|trap|exec|exit|return|declare|typeset|readonly)(?:\s|$)|"
+    r"(?:[A-Za-z_][A-Za-z0-9_]*=(?:\"[^\"]*\"|'[^']*'|[^\s\"'])*\s*)+$)"
+)
+
+
+def _unquote(resource):
+    """Helper to strip the quotes that the Go parser keeps on resources."""
+    if len(resource) > 1 and resource[0] == resource[-1] == '"':
+        return resource[1:-1]
+    return resource
+
+
+def _sources(instruction):
+    """Helper to list the local source paths of an ADD or COPY."""
+    if not isinstance(instruction, (structures.ADD_t, structures.COPY_t)):
+        return None
+    if getattr(instruction, 'from_', None) is not None:
+        return None
+    return [_unquote(resource) for resource in instruction.resources[:-1]]
+
+
+def _source_directory(source):
+    """Helper to get the context directory a broad COPY source copies."""
+    if source in BROAD_SOURCES:
+        return ''
+    return source[:-len('/.')]
+
+
+def _is_broad_copy(instruction):
+    """Helper to check for a COPY or ADD of the whole build context."""
+    sources = _sources(instruction)
+    return bool(sources) and any(
+        source in BROAD_SOURCES or source.endswith('/.')
+        for source in sources
+    )
+
+
+def _is_manifest_copy(instruction, ecosystem):
+    """Helper to check for a COPY of only dependency manifests."""
+    sources = _sources(instruction)
+    return bool(sources) and bool(ecosystem.manifests) and all(
+        any(fnmatch.fnmatchcase(posixpath.basename(source), pattern)
+            for pattern in ecosystem.manifests)
+        for source in sources
+    )
+
+
+def _run_text(instruction):
+    """Helper to get the command text of a RUN instruction."""
+    form = instruction.shell_form
+    if form is None:
+        form = instruction.exec_form
+    return ' '.join(form)
+
+
+def _is_local_path(argument, ecosystem, destination):
+    """Helper to check whether an install argument names a local path."""
+    argument = _unquote(argument.strip("'"))
+    if local_path.search(argument):
+        return True
+    if ecosystem.name == 'pip' and '/' in argument and (
+            '://' not in argument):
+        return True
+    destination = posixpath.normpath(destination)
+    return destination != '.' and (
+        posixpath.normpath(argument) + '/').startswith(destination + '/')
+
+
+def _install_problem(text, ecosystem, destination):
+    """Helper to explain why an install RUN needs the full build context."""
+    for part in command_separator.split(text.replace('\\\n', ' ')):
+        part = ' '.join(part.split())
+        if not part or housekeeping.match(part):
+            continue
+        match = ecosystem.install.search(part)
+        if match is None:
+            return "install RUN also runs %r" % part
+        if ecosystem.name == 'pip' and pip_local_install.search(part):
+            return "install RUN installs the copied sources"
+        arguments = part[match.end():]
+        if ecosystem.name == 'pip':
+            arguments = pip_requirement.sub(' ', arguments)
+        for argument in arguments.split():
+            if not argument.startswith('-') and _is_local_path(
+                    argument, ecosystem, destination):
+                return "install RUN reads %s from the build context" % (
+                    argument)
+    return None
+
+
+def _manifest_sources(text, ecosystem):
+    """Helper to name the manifest files that an install RUN reads."""
+    if ecosystem.name == 'pip':
+        return [_unquote(source.strip("'"))
+                for source in pip_requirement.findall(text)]
+    if ecosystem.name == 'npm':
+        for tool, manifests in NODE_MANIFESTS:
+            if tool.search(text):
+                return list(manifests)
+    return list(ecosystem.default_manifests)
+
+
+def _manifest_problem(sequence, manifest_copy, text, ecosystem):
+    """Helper to explain why the manifests of an install cannot move."""
+    sources = _manifest_sources(text, ecosystem)
+    for source in sources:
+        if source.startswith('/') or '..' in source.split('/') or (
+                '$' in source):
+            return "install RUN reads %s, which cannot be copied ahead" % (
+                source)
+    if manifest_copy is None or ecosystem.name != 'pip':
+        return None
+    copied = {posixpath.basename(source)
+              for source in _sources(sequence[manifest_copy])}
+    for source in sources:
+        if posixpath.basename(source) not in copied:
+            return ("install RUN reads %s, which the manifest COPY at "
+                    "instruction %d does not copy" % (source, manifest_copy))
+    return None
+
+
+def _stage_findings(sequence, stage):
+    """Helper to find install RUNs following a broad COPY in one stage."""
+    findings = []
+    broad_copy = None
+    for position in range(stage.start, stage.stop):
+        instruction = sequence[position]
+        if _is_broad_copy(instruction):
+            broad_copy = position
+        if broad_copy is None or not isinstance(instruction,
+                                                structures.RUN_t):
+            continue
+        text = _run_text(instruction)
+        for ecosystem in ECOSYSTEMS:
+            if not ecosystem.install.search(text):
+                continue
+            manifest_copy = None
+            for earlier in range(stage.start, position):
+                if _is_manifest_copy(sequence[earlier], ecosystem):
+                    manifest_copy = earlier
+            reason = _move_problem(sequence, broad_copy, position,
+                                   manifest_copy, text, ecosystem)
+            findings.append(CacheFinding(
+                ecosystem=ecosystem.name, stage=stage.index,
+                broad_copy=broad_copy, install=position,
+                manifest_copy=manifest_copy, movable=reason is None,
+                reason=reason
+            ))
+            break
+    return findings
+
+
+def _move_problem(sequence, broad_copy, install, manifest_copy, text,
+                  ecosystem):
+    """Helper to explain why an install RUN cannot move, or return None."""
+    if len(_sources(sequence[broad_copy])) > 1:
+        return "broad COPY copies several sources"
+    destination = _unquote(sequence[broad_copy].resources[-1])
+    problem = _install_problem(text, ecosystem, destination)
+    if problem is None:
+        problem = _manifest_problem(sequence, manifest_copy, text, ecosystem)
+    if problem is not None:
+        return problem
+    carried = False
+    for position in range(broad_copy + 1, install):
+        instruction = sequence[position]
+        if position == manifest_copy:
+            continue
+        if isinstance(instruction, CARRIED_TYPES):
+            carried = True
+        elif not isinstance(instruction, INERT_TYPES):
+            return ("%s at instruction %d must stay between the COPY and "
+                    "the install RUN" % (type(instruction).__name__,
+                                         position))
+    if carried and '$' in str(sequence[broad_copy]):
+        return "broad COPY uses variables set by a moved ARG or ENV"
+    return None
+
+
+def _cached_layers(dockerfile):
+    """Helper to count layers kept cached when only sources change."""
+    sequence, cached = dockerfile.sequence, 0
+    for stage in dockerfile.stages():
+        for position in range(stage.start, stage.stop):
+            if _is_broad_copy(sequence[position]):
+                break
+            if isinstance(sequence[position], LAYER_TYPES):
+                cached += 1
+    return cached
+
+
+def find_cache_busters(dockerfile):
+    """Find dependency installs that re-run whenever any source changes.
+
+    A finding is an install RUN (pip, npm/yarn/pnpm, go mod, maven or apt)
+    placed after a COPY or ADD of the whole build context (e.g.
+    `COPY . .`) in the same stage. Any change to the context invalidates
+    the layer cache from that COPY on, so the install is repeated even
+    though its dependency manifests did not change.
+
+    Args:
+        dockerfile: A `dockerphile.Dockerfile` instance.
+
+    Returns:
+        A list of `dockerphile.optimize_tools.CacheFinding` namedtuples
+        holding the ecosystem name, stage index, the sequence positions of
+        the broad COPY, the install RUN and the latest manifest COPY before
+        it (or `None`), and whether `reorder_for_cache` can move the
+        install. If it cannot, `reason` explains why.
+
+    Raises:
+        Nothing.
+
+    """
+    findings = []
+    for stage in dockerfile.stages():
+        findings.extend(_stage_findings(dockerfile.sequence, stage))
+    return findings
+
+
+def _manifest_copies(broad_copy, text, ecosystem):
+    """Helper to build COPYs placing manifests where `broad_copy` would."""
+    sources = _manifest_sources(text, ecosystem)
+    if not sources:
+        return []
+    directory = _source_directory(_sources(broad_copy)[0])
+    destination = _unquote(broad_copy.resources[-1])
+    options = dict(chown=broad_copy.chown, chmod=broad_copy.chmod)
+    if ecosystem.name == 'pip':
+        return [structures.COPY([posixpath.join(directory, source),
+                                 posixpath.join(destination, source)],
+                                **options)
+                for source in sources]
+    resources = [posixpath.join(directory, source) for source in sources]
+    resources.append(posixpath.join(destination, ''))
+    return [structures.COPY(resources, **options)]
+
+
+def _apply(sequence, finding):
+    """Helper to move one install RUN ahead of its broad COPY."""
+    ecosystem = next(ecosystem for ecosystem in ECOSYSTEMS
+                     if ecosystem.name == finding.ecosystem)
+    broad_copy, install = finding.broad_copy, finding.install
+    moved = [position for position in range(broad_copy + 1, install)
+             if isinstance(sequence[position], CARRIED_TYPES)]
+    if finding.manifest_copy is not None and (
+            finding.manifest_copy > broad_copy):
+        moved = sorted(moved + [finding.manifest_copy])
+    moved_block = [sequence[position] for position in moved]
+    if finding.manifest_copy is None:
+        moved_block.extend(_manifest_copies(
+            sequence[broad_copy], _run_text(sequence[install]), ecosystem
+        ))
+    moved_block.append(sequence[install])
+    staying = [sequence[position] for position in range(broad_copy, install)
+               if position not in moved]
+    sequence[broad_copy:install + 1] = moved_block + staying
+
+
+def reorder_for_cache(dockerfile):
+    """Move dependency installs ahead of broad COPYs to keep them cached.
+
+    Each movable finding of `find_cache_busters` is rewritten so that the
+    manifest COPY and install RUN come before the broad COPY. ARG and ENV
+    instructions between the two move along with the install, in their
+    original order, so it sees the same variables. If no manifest COPY
+    exists one is added, copying the requirements and constraints files
+    named by `pip -r` and `pip -c`, the package manifest, lockfile and
+    configuration of npm, yarn or pnpm (whichever the install runs),
+    `go.mod go.sum` or `pom.xml` from the directory the broad COPY copies
+    (e.g. `src` for `COPY src/. /app`) to the same place the broad COPY
+    would have put them. Optional files are copied with a one-character
+    wildcard (e.g. `go.su[m]`), so the COPY still succeeds when they do not
+    exist. Files that the manifests include in turn (e.g. `-r base.txt`
+    inside requirements.txt) are not known and not copied. Installs that need
+    other instructions between them and the broad COPY (WORKDIR, USER,
+    other RUNs, ...) are left in place, as are installs that read files
+    the pass does not copy: local packages or directories from the build
+    context (any relative or absolute path argument, or one under the
+    broad COPY destination), and requirements files that an existing
+    manifest COPY does not copy.
+
+    Args:
+        dockerfile: A `dockerphile.Dockerfile` instance. It is not modified.
+
+    Returns:
+        A `dockerphile.optimize_tools.CacheReport` namedtuple holding the
+        rewritten `dockerfile` (a new `dockerphile.Dockerfile`), the
+        `findings` of the original Dockerfile, and the number of layer
+        instructions (RUN, COPY and ADD) that stay cached after a change
+        to source files only, before and after the rewrite.
+
+    Raises:
+        Nothing.
+
+    """
+    findings = find_cache_busters(dockerfile)
+    rewritten = type(dockerfile)()
+    rewritten.sequence.extend(dockerfile.sequence)
+    for _ in range(len(findings)):
+        pending = [finding for finding in find_cache_busters(rewritten)
+                   if finding.movable]
+        if not pending:
+            break
+        _apply(rewritten.sequence, pending[0])
+        rewritten.reindex()
+    return CacheReport(
+        dockerfile=rewritten, findings=findings,
+        cached_layers_before=_cached_layers(dockerfile),
+        cached_layers_after=_cached_layers(rewritten)
+    )
+
+
+def _chain_layout(escape):
+    """Helper to build the RUN chain prefix and separator for an escape."""
+    return (RUN_CHAIN_PREFIX.replace(DEFAULT_ESCAPE, escape),
+            RUN_CHAIN_SEPARATOR.replace(DEFAULT_ESCAPE, escape))
+
+
+def _is_posix_shell(shell_spec):
+    """Helper to check whether a SHELL runs commands with a POSIX `-c`."""
+    return posixpath.basename(shell_spec[0]) in POSIX_SHELLS and (
+        shell_spec[-1] == '-c')
+
+
+def _chain_command(instruction, prefix, separator):
+    """Helper to get the command of a shell form RUN, or `None`."""
+    if not isinstance(instruction, structures.RUN_t):
+        return None
+    if instruction.shell_form is None:
+        return None
+    command = ' '.join(instruction.shell_form)
+    if command.startswith(prefix):
+        command = command[len(prefix):]
+    command = command.strip()
+    if not command or unchainable_command.search(
+            command.replace(separator, ' && ')):
+        return None
+    return command
+
+
+def _changes_shell_state(command):
+    """Helper to check whether a command affects later commands in a shell."""
+    return any(shell_state_command.match(part) for part in
+               command_separator.split(command.replace('\\\n', ' ')))
+
+
+def coalesce_runs(dockerfile):
+    """Merge consecutive shell form RUN instructions into single layers.
+
+    Adjacent shell form RUNs are chained with `&&` in the layout written by
+    `dockerphile.run_block.RunBlock`, so the first failing command still
+    fails the build. Any other instruction between two RUNs (ENV, ARG,
+    USER, WORKDIR, SHELL, COPY, FROM, ...) ends the merged group, since the
+    commands after it may depend on it. Exec form RUNs, and commands using
+    comments, heredocs or background jobs, are never merged. Commands that
+    contain `;` or `||` can only start a merged group, where chaining with
+    `&&` cannot change which failures stop the build.
+
+    Each RUN starts in a fresh shell, so a command that changes the state of
+    its shell ends the merged group after it: changing directory (`cd`,
+    `pushd`, `popd`), setting variables, options or aliases (`export`,
+    `unset`, `set`, `NAME=value`, `alias`, `shopt`, `declare`, ...),
+    sourcing scripts (`source`, `.`), `umask`, `ulimit`, `trap`, and
+    leaving the shell (`exec`, `exit`, `return`). Every `&&`, `||` or `;`
+    separated part of a command is checked, so e.g. `RUN cd /tmp` followed
+    by `RUN touch f` stays two RUNs, as does `RUN make && cd build` followed
+    by `RUN ls`.
+
+    Line continuations use the escape character of the `escape` directive,
+    if there is one, so the result parses to the same commands. RUNs are
+    only merged while the stage's SHELL is a POSIX shell (`sh`, `bash`,
+    ...) taking the command after `-c`; stages using e.g. PowerShell or
+    `cmd`, directly or inherited from a parent stage, are left alone.
+
+    Args:
+        dockerfile: A `dockerphile.Dockerfile` instance. It is not modified.
+
+    Returns:
+        A `dockerphile.optimize_tools.CoalesceReport` namedtuple holding
+        the rewritten `dockerfile` (a new `dockerphile.Dockerfile`), the
+        `merged` groups as tuples of the original sequence positions of the
+        RUNs combined into each new RUN, and the number of `layers_saved`.
+
+    Raises:
+        Nothing.
+
+    """
+    sequence = dockerfile.sequence
+    escape = DEFAULT_ESCAPE
+    if sequence and isinstance(sequence[0], structures.ESCAPE_t):
+        escape = sequence[0].character
+    prefix, separator = _chain_layout(escape)
+    groups, group = [], []
+    shell, shells, stage_name = DEFAULT_SHELL, {}, None
+    for position, instruction in enumerate(sequence):
+        if isinstance(instruction, structures.FROM_t):
+            shell = shells.get(instruction.base_image.lower(), DEFAULT_SHELL)
+            stage_name = instruction.as_ and instruction.as_.lower()
+        elif isinstance(instruction, structures.SHELL_t):
+            shell = instruction.shell_spec
+        if stage_name:
+            shells[stage_name] = shell
+        command = None
+        if _is_posix_shell(shell):
+            command = _chain_command(instruction, prefix, separator)
+        if command is None:
+            group = []
+            continue
+        if group and not unchainable_tail.search(command):
+            group.append((position, command))
+        else:
+            group = [(position, command)]
+            groups.append(group)
+        if _changes_shell_state(command):
+            group = []
+    groups = [group for group in groups if len(group) > 1]
+    merged_at = {group[0][0]: group for group in groups}
+    skipped = {position for group in groups for position, _ in group[1:]}
+    rewritten = type(dockerfile)()
+    for position, instruction in enumerate(sequence):
+        if position in merged_at:
+            commands = [command for _, command in merged_at[position]]
+            instruction = structures.RUN(shell_form=[
+                prefix + separator.join(commands)
+            ])
+        elif position in skipped:
+            continue
+        rewritten.sequence.append(instruction)
+    return CoalesceReport(
+        dockerfile=rewritten,
+        merged=[tuple(position for position, _ in group) for group in groups],
+        layers_saved=len(skipped)
+    )
@@ -1,52 +1,419 @@
+import io
+import itertools
+import mmap
+import os
 import re
 
-from dockerfile import parse_string
-
-from dockerphile import structures
+from dockerphile import profile_tools, structures, tokenize_tools
 from dockerphile.errors import DockerphileError
+from dockerphile.tokenize_tools import (parser_directives,
+                                        split_parser_directive)
 
 
 arg_default_value = re.compile(r"(.*)=(.*)$")
-copy_from = re.compile(r"COPY\s+--from=(\S*)\s+.*$")
-escape_directive = re.compile(r"\s*#\s+[Ee][Ss][Cc][Aa][Pp][Ee]=(\S)\s*$")
-from_as = re.compile(r"FROM\s+(\S+)\s+AS\s+(\S+)\s*$")
-healthcheck_arg_str = "HEALTHCHECK\s+.*--%s=(\S+)\s+.*$"
-healthcheck_interval = re.compile(healthcheck_arg_str % "interval")
-healthcheck_timeout = re.compile(healthcheck_arg_str % "timeout")
-healthcheck_start_period = re.compile(healthcheck_arg_str % "start-period")
-healthcheck_retries = re.compile(healthcheck_arg_str % "retries")
 user_group = re.compile(r"USER\s+(\S+):(\S+)\s*$")
+MMAP_THRESHOLD = 1 << 20
+HEALTHCHECK_OPTIONS = ('interval', 'timeout', 'start_period', 'retries',
+                       'start_interval')
+PARSER_BACKENDS = ('go', 'native')
+MODELLED_FLAGS = {
+    'add': ('chmod', 'chown', 'link'),
+    'copy': ('chmod', 'chown', 'from', 'link'),
+    'from': ('platform',),
+    'healthcheck': tuple(option.replace('_', '-')
+                         for option in HEALTHCHECK_OPTIONS),
+}
+
+
+class ParseStats:
+    """Counters describing the parsing cost of one Dockerfile source."""
+
+    __slots__ = ('parser_calls', 'commands', 'instructions')
+
+    def __init__(self):
+        """Create a set of parse counters, all starting at zero.
+
+        Attributes:
+            parser_calls: Number of calls into a parser backend (the Go
+                extension or the native tokenizer). Every source costs
+                exactly one call; ONBUILD triggers reuse the parsed command.
+            commands: Number of parsed commands converted to instructions.
+            instructions: Number of `dockerphile.structures` instructions
+                produced, after multi-key ENV and LABEL commands are
+                flattened and unsupported commands are skipped.
+
+        Returns:
+            Nothing.
+
+        Raises:
+            Nothing.
+
+        """
+        self.parser_calls = 0
+        self.commands = 0
+        self.instructions = 0
+
+    def __repr__(self):
+        """Show the counter values."""
+        return "ParseStats(parser_calls=%d, commands=%d, instructions=%d)" % (
+            self.parser_calls, self.commands, self.instructions
+        )
+
+
+def read_source(source, encoding='utf-8', use_mmap=None):
+    """Read the full text of a source Dockerfile in a single pass.
+
+    Args:
+        source: A string naming a path to a source Dockerfile on disk.
+        encoding: Optional string naming the text encoding of the file
+            (default 'utf-8').
+        use_mmap: Optional boolean choosing whether to read the file through
+            a read-only memory map. By default a memory map is used for files
+            of at least `MMAP_THRESHOLD` bytes.
+
+    Returns:
+        A string containing the decoded contents of the source file.
+
+    Raises:
+        OSError: raised if the source file cannot be opened or mapped.
+        UnicodeDecodeError: raised if the file is not valid in `encoding`.
+
+    """
+    profile = profile_tools.active
+    if profile is None:
+        return _read_source(source, encoding, use_mmap)
+    start = profile_tools.clock()
+    text = _read_source(source, encoding, use_mmap)
+    profile.record('read', profile_tools.clock() - start)
+    return text
+
+
+def _read_source(source, encoding, use_mmap):
+    """Helper to read and decode a source file for `read_source`."""
+    with open(source, 'rb') as _file:
+        size = os.fstat(_file.fileno()).st_size
+        if use_mmap is None:
+            use_mmap = size >= MMAP_THRESHOLD
+        if not use_mmap or not size:
+            return _file.read().decode(encoding)
+        with mmap.mmap(_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                return str(view, encoding)
+
+
+def _parse_escape_directive_lines(lines):
+    """Helper to parse an escape directive from an iterable of lines."""
+    escape = parser_directives(lines).get('escape')
+    if escape is not None:
+        return structures.ESCAPE(escape)
+    return None
 
 
 def parse_escape_directive(source):
-    """Parse escape directive from a source Dockerfile's first non-empty line.
+    """Parse the escape directive from a source Dockerfile's directives.
+
+    Parser directives are read with Docker's rules (see
+    `dockerphile.tokenize_tools.parser_directives`), so the escape directive
+    may follow e.g. a `syntax` directive, but a blank line, comment or
+    instruction ends the directives.
 
     Args:
-        source: A source Dockerfile whose first non-empty line will be checked.
+        source: A source Dockerfile whose leading lines will be checked.
 
     Returns:
         A `dockerphile.structures.ESCAPE_t` type storing the escape directive.
-        If an escape directive cannot be parsed from the first non-empty line
-        of the source file, then `None` is returned.
+        If the leading parser directives hold no escape directive, then
+        `None` is returned.
+
+    Raises:
+        DockerphileError: raised if a parser directive is repeated or the
+            escape directive names an invalid escape character.
+
+    """
+    with open(source, 'r', encoding='utf-8') as _file:
+        return _parse_escape_directive_lines(_file)
+
+
+def parse_escape_directive_string(text):
+    """Parse the escape directive from the parser directives of a string.
+
+    Args:
+        text: A string containing the contents of a Dockerfile.
+
+    Returns:
+        A `dockerphile.structures.ESCAPE_t` type storing the escape directive,
+        or `None` if the leading parser directives hold no escape directive.
+
+    Raises:
+        DockerphileError: raised if a parser directive is repeated or the
+            escape directive names an invalid escape character.
+
+    """
+    return _parse_escape_directive_lines(io.StringIO(text))
+
+
+def _go_parse_string():
+    """Helper to import the Go parser extension on first use."""
+    from dockerfile import parse_string
+    return parse_string
+
+
+def parse_commands(text, backend='go', stats=None):
+    """Parse Dockerfile source text into parsed command objects.
+
+    Args:
+        text: A string containing the contents of a Dockerfile.
+        backend: Optional string naming the parser backend, one of
+            `PARSER_BACKENDS`. 'go' (the default) uses the `dockerfile` Go
+            extension, which is imported on first use, and 'native' uses
+            `dockerphile.tokenize_tools`.
+        stats: Optional `ParseStats` whose `parser_calls` is incremented.
+
+    Returns:
+        A tuple of parsed commands (`dockerfile.Command` or
+        `dockerphile.tokenize_tools.Command`) suitable for `to_instruction`.
+
+    Raises:
+        DockerphileError: raised for an unknown backend or if the native
+            backend encounters invalid Dockerfile syntax.
+        dockerfile.GoParseError: raised if the Go backend encounters an
+            unhandled parser error.
+
+    """
+    if backend not in PARSER_BACKENDS:
+        raise DockerphileError("Unknown parser backend %s, expected one of %s"
+                               % (backend, PARSER_BACKENDS))
+    if stats is not None:
+        stats.parser_calls += 1
+    if backend == 'go':
+        parse = _go_parse_string()
+    else:
+        parse = tokenize_tools.parse_string
+    profile = profile_tools.active
+    if profile is None:
+        return parse(text)
+    start = profile_tools.clock()
+    commands = parse(text)
+    profile.record('parse', profile_tools.clock() - start)
+    return commands
+
+
+def parse_instructions(text, backend='go', validate=True, stats=None):
+    """Parse Dockerfile source text into `dockerphile.structures` types.
+
+    Args:
+        text: A string containing the contents of a Dockerfile.
+        backend: Optional string naming the parser backend, one of
+            `PARSER_BACKENDS` (default 'go').
+        validate: Optional boolean (default True). If False, skip the
+            factory argument checks as described for `to_instruction`.
+        stats: Optional `ParseStats` updated with the parsing cost.
+
+    Returns:
+        A generator of `dockerphile.structures` instances in source order,
+        starting with the `escape` parser directive if there is one.
+        Commands that expand to several instructions (e.g. multi-key ENV)
+        are flattened, and unsupported commands (e.g. MAINTAINER) are
+        skipped.
+
+    Raises:
+        DockerphileError: raised for an unknown backend or for invalid
+            Dockerfile syntax.
+
+    """
+    escape = parse_escape_directive_string(text)
+    if escape is not None:
+        yield escape
+    commands = parse_commands(text, backend=backend, stats=stats)
+    yield from _flatten_instructions(commands, validate, stats)
+
+
+def _flatten_instructions(commands, validate, stats=None):
+    """Helper to convert parsed commands to a flat instruction stream."""
+    for command in commands:
+        instruction = to_instruction(command, validate)
+        if stats is not None:
+            stats.commands += 1
+            if isinstance(instruction, list):
+                stats.instructions += len(instruction)
+            elif instruction is not None:
+                stats.instructions += 1
+        if instruction is None:
+            continue
+        elif isinstance(instruction, list):
+            yield from instruction
+        else:
+            yield instruction
+
+
+def _iter_line_instructions(lines, backend, max_stages, validate, stats):
+    """Helper to lazily convert an iterable of source lines."""
+    lines = iter(lines)
+    head = []
+    for line in lines:
+        head.append(line)
+        if split_parser_directive(line) is None:
+            break
+    escape = _parse_escape_directive_lines(head)
+    if escape is not None:
+        yield escape
+    if backend == 'native':
+        if stats is not None:
+            stats.parser_calls += 1
+        commands = tokenize_tools.tokenize(itertools.chain(head, lines))
+    else:
+        text = ''.join(itertools.chain(head, lines))
+        commands = parse_commands(text, backend=backend, stats=stats)
+    stages = 0
+    for instruction in _flatten_instructions(commands, validate, stats):
+        if isinstance(instruction, structures.FROM_t):
+            if max_stages is not None and stages >= max_stages:
+                return
+            stages += 1
+        yield instruction
+
+
+def iter_instructions(source, backend='native', max_stages=None,
+                      validate=True, stats=None):
+    """Lazily yield the `dockerphile.structures` instructions of a Dockerfile.
+
+    With the default 'native' backend the source is tokenized line by line,
+    so memory use is bounded by the longest logical instruction rather than
+    the size of the file, and closing the generator early (e.g. breaking out
+    of a loop) stops reading the source immediately. The 'go' backend must
+    read and parse the whole file up front, and only the conversion of the
+    parsed commands to `dockerphile.structures` types is lazy.
+
+    Args:
+        source: Either a string naming a path to a source Dockerfile on disk,
+            or an iterable of source lines such as an open text file.
+        backend: Optional string naming the parser backend, one of
+            `PARSER_BACKENDS` (default 'native').
+        max_stages: Optional integer. If given, iteration stops before the
+            FROM instruction that would begin stage number `max_stages + 1`,
+            e.g. `max_stages=1` yields only the global ARGs and first stage.
+        validate: Optional boolean (default True). If False, skip the
+            factory argument checks as described for `to_instruction`.
+        stats: Optional `ParseStats` updated with the parsing cost as the
+            generator is consumed.
+
+    Returns:
+        A generator of `dockerphile.structures` instances in source order,
+        starting with the `escape` parser directive if there is one.
+
+    Raises:
+        DockerphileError: raised for an unknown backend or for invalid
+            Dockerfile syntax.
+        OSError: raised if `source` names a file that cannot be read.
+
+    """
+    if backend not in PARSER_BACKENDS:
+        raise DockerphileError("Unknown parser backend %s, expected one of %s"
+                               % (backend, PARSER_BACKENDS))
+    if isinstance(source, str):
+        with open(source, 'r') as _file:
+            yield from _iter_line_instructions(_file, backend, max_stages,
+                                               validate, stats)
+    else:
+        yield from _iter_line_instructions(source, backend, max_stages,
+                                           validate, stats)
+
+
+def scan_flags(parsed_instruction):
+    """Collect all `--name=value` flags of a parsed instruction in one pass.
+
+    Flags kept by the native tokenizer are used directly. For commands from
+    the Go backend, which discards flags, the leading flags are scanned once
+    from `original` after the instruction keyword (or after both keywords of
+    an ONBUILD trigger).
+
+    Args:
+        parsed_instruction: An instance of `dockerfile.Command` or of
+            `dockerphile.tokenize_tools.Command`.
+
+    Returns:
+        A dictionary mapping flag names (without leading dashes) to string
+        values. Flags given without a value map to the string 'true'.
 
     Raises:
         Nothing.
 
     """
-    blank = True
-    with open(source, 'r') as _file:
-        for line in _file:
-            blank = not line.strip()
-            if not blank:
-                break
-    if not blank:
-        parsed_escape = re.match(escape_directive, line)
-        if parsed_escape is not None:
-            return structures.ESCAPE(parsed_escape.groups()[0])
-    return None
+    flags = getattr(parsed_instruction, 'flags', None)
+    if flags is None:
+        keywords = 2 if parsed_instruction.cmd == 'onbuild' else 1
+        parts = parsed_instruction.original.split(None, keywords)
+        rest = parts[keywords] if len(parts) > keywords else ''
+        flags, _ = tokenize_tools.split_flags(rest)
+    return tokenize_tools.flags_to_dict(flags)
+
+
+def _modelled_flags(parsed_instruction):
+    """Helper to scan flags, rejecting those the instruction types lack."""
+    flags = scan_flags(parsed_instruction)
+    modelled = MODELLED_FLAGS.get(parsed_instruction.cmd, ())
+    for name in flags:
+        if name not in modelled:
+            raise DockerphileError("Unsupported flag --%s for %s instruction."
+                                   % (name, parsed_instruction.cmd.upper()))
+    return flags
+
 
+def _flag_bool(flags, name):
+    """Helper to read an optional boolean flag such as `--link`."""
+    value = flags.get(name)
+    if value is None:
+        return None
+    if value.lower() in ('true', '1'):
+        return True
+    if value.lower() in ('false', '0'):
+        return False
+    raise DockerphileError("Invalid boolean value %s for --%s" % (value, name))
+
+
+def onbuild_trigger(parsed_instruction):
+    """Derive the parsed trigger command of a parsed ONBUILD command.
+
+    Both parser backends already parse the trigger along with the ONBUILD
+    command, storing its keyword in `sub_cmd` and its arguments in `value`,
+    so the trigger is rebuilt from those fields rather than by parsing its
+    source text a second time. Only the leading ONBUILD keyword is removed
+    from `original`.
 
-def to_instruction(parsed_instruction):
+    Args:
+        parsed_instruction: A parsed ONBUILD command, an instance of
+            `dockerfile.Command` or of `dockerphile.tokenize_tools.Command`.
+
+    Returns:
+        A parsed command of the same type as `parsed_instruction`
+        describing the trigger instruction.
+
+    Raises:
+        DockerphileError: raised if the ONBUILD command has no trigger.
+
+    """
+    parts = parsed_instruction.original.split(None, 1)
+    if not parsed_instruction.sub_cmd or len(parts) != 2:
+        raise DockerphileError("ONBUILD requires a trigger instruction.")
+    return parsed_instruction._replace(cmd=parsed_instruction.sub_cmd.lower(),
+                                       sub_cmd=None, original=parts[1])
+
+
+def _build(instruction_type, validate, **fields):
+    """Helper to build an instruction through its factory or trusted path."""
+    if not validate:
+        return structures.trusted_instruction(instruction_type, **fields)
+    profile = profile_tools.active
+    if profile is None:
+        return structures.FACTORIES[instruction_type](**fields)
+    start = profile_tools.clock()
+    instruction = structures.FACTORIES[instruction_type](**fields)
+    profile.record('validate', profile_tools.clock() - start,
+                   instruction_type.__name__)
+    return instruction
+
+
+def to_instruction(parsed_instruction, validate=True):
     """Map a parsed `dockerfile.Command` to a `dockerphile.structures` type.
 
     `dockerfile.Command` contains the original parsed string (with line
@@ -54,12 +421,20 @@ def to_instruction(parsed_instruction):
     attribute storing the part of the Dockerfile instruction non-inclusive
     of Dockerfile keywords.
 
-    Known limitations include: (1) no parsing of comment lines; (2) no parsing
-    of the `escape` parser directive; and (2) no direct parsing of the optional
-    arguments for the HEALTHCHECK or COPY commands.
+    Known limitations include: (1) no parsing of comment lines; and (2) no
+    parsing of the `escape` parser directive. Instruction flags are read
+    once per instruction with `scan_flags`. Flags other than those in
+    `MODELLED_FLAGS`, such as `RUN --mount` or `COPY --exclude`, raise an
+    error rather than being dropped from the rendered instruction.
 
     Args:
-        parsed_instruction: An instance of `dockerfile.Command`.
+        parsed_instruction: An instance of `dockerfile.Command` or of
+            `dockerphile.tokenize_tools.Command`. Flags retained by the
+            native tokenizer are used instead of re-matching `original`.
+        validate: Optional boolean (default True). If False, instructions are
+            built through `dockerphile.structures.trusted_instruction`,
+            skipping the argument checks of the factory functions; check
+            the results later with `dockerphile.Dockerfile.validate`.
 
     Returns:
         Either an instance of a `dockerphile.structures` namedtuple
@@ -70,86 +445,103 @@ def to_instruction(parsed_instruction):
         practices to use `LABEL` for a maintainer label.
 
     Raises:
-        DockerphileError: raised if incorrect instruction type is provided or
+        DockerphileError: raised if incorrect instruction type is provided,
             if the parsed `dockerfile.Command` object contains invalid
-            Dockerfile syntax.
+            Dockerfile syntax or if it has a flag that is not modelled.
         dockerfile.GoParseError: raised if underlying `dockerfile` library
             Go parser encounters an unhandled parser error.
 
     """
+    profile = profile_tools.active
+    if profile is None:
+        return _to_instruction(parsed_instruction, validate)
+    start = profile_tools.clock()
+    instruction = _to_instruction(parsed_instruction, validate)
+    profile.record('convert', profile_tools.clock() - start,
+                   parsed_instruction.cmd.upper())
+    return instruction
+
+
+def _to_instruction(parsed_instruction, validate):
+    """Helper to convert one parsed command for `to_instruction`."""
     cmd, original = parsed_instruction.cmd, parsed_instruction.original
     uses_json, value = parsed_instruction.json, parsed_instruction.value
+    flags = {} if cmd == 'onbuild' else _modelled_flags(parsed_instruction)
     if cmd == 'add':
-        return structures.ADD(value)
+        return _build(structures.ADD_t, validate, resources=value,
+                      chown=flags.get('chown'), chmod=flags.get('chmod'),
+                      link=_flag_bool(flags, 'link'))
     if cmd == 'arg':
+        if not value:
+            raise DockerphileError("ARG instruction requires a name.")
         arg_string = value[0]
         parsed_arg = re.match(arg_default_value, arg_string)
         if parsed_arg is not None:
             key, default_value = parsed_arg.groups()
-            return structures.ARG(key, default_value=default_value)
+            return _build(structures.ARG_t, validate, key=key,
+                          default_value=default_value)
         else:
-            return structures.ARG(arg_string)
+            return _build(structures.ARG_t, validate, key=arg_string)
     if cmd == 'cmd':
-        return structures.CMD(**{
+        return _build(structures.CMD_t, validate, **{
             ('exec_form' if uses_json else 'shell_form'): value
         })
     if cmd == 'copy':
-        parsed_from = re.match(copy_from, original)
-        from_ = parsed_from.groups()[0] if parsed_from is not None else None
-        return structures.COPY(value, from_=from_)
+        return _build(structures.COPY_t, validate, resources=value,
+                      from_=flags.get('from'), chown=flags.get('chown'),
+                      chmod=flags.get('chmod'),
+                      link=_flag_bool(flags, 'link'))
     if cmd == 'entrypoint':
-        return structures.ENTRYPOINT(**{
+        return _build(structures.ENTRYPOINT_t, validate, **{
             ('exec_form' if uses_json else 'shell_form'): value
         })
     if cmd == 'env':
         if not value:
             raise DockerphileError("ENV command has no key or value.")
         if len(value) == 2:
-            return structures.ENV(value[0], value[1])
+            return _build(structures.ENV_t, validate, key=value[0],
+                          value=value[1])
         try:
-            result = [structures.ENV(value[k], value[k + 1])
+            result = [_build(structures.ENV_t, validate, key=value[k],
+                             value=value[k + 1])
                       for k in range(len(value))[::2]]
         except IndexError:
             raise DockerphileError("Unpaired index when parsing "
                                    "%s to list of ENV types." % value)
         return result
     if cmd == 'expose':
-        return structures.EXPOSE(value)
+        return _build(structures.EXPOSE_t, validate, port_specs=value)
     if cmd == 'from':
-        parsed_from = re.match(from_as, original)
-        if parsed_from is not None:
-            image, as_ = parsed_from.groups()
-            return structures.FROM(image, as_=as_)
         if not value:
             raise DockerphileError("FROM instruction requires nonempty base "
                                    "image.")
-        return structures.FROM(value[0])
+        as_ = None
+        if len(value) == 3 and value[1].lower() == 'as':
+            as_ = value[2]
+        return _build(structures.FROM_t, validate, base_image=value[0],
+                      as_=as_, platform=flags.get('platform'))
     if cmd == 'healthcheck':
         if value and value[0] != 'CMD':
             raise DockerphileError("Invalid CMD specifier for HEALTHCHECK: "
                                    "%s" % value[0])
-        options = {
-            'interval': re.match(healthcheck_interval, original),
-            'timeout': re.match(healthcheck_timeout, original),
-            'start_period': re.match(healthcheck_start_period, original),
-            'retries': re.match(healthcheck_retries, original)
-        }
         kwargs = {
-            arg_name: (None if arg_match is None else arg_match.groups()[0])
-            for arg_name, arg_match in options.items()
+            arg_name: flags.get(arg_name.replace('_', '-'))
+            for arg_name in HEALTHCHECK_OPTIONS
         }
         if len(value) == 2:
             kwargs['cmd'] = value[1]
         elif len(value) > 2:
             kwargs['cmd'] = value[1:]
-        return structures.HEALTHCHECK(**kwargs)
+        return _build(structures.HEALTHCHECK_t, validate, **kwargs)
     if cmd == 'label':
         if not value:
             raise DockerphileError("LABEL command has no key or value.")
         if len(value) == 2:
-            return structures.LABEL(value[0], value[1])
+            return _build(structures.LABEL_t, validate, key=value[0],
+                          value=value[1])
         try:
-            result = [structures.LABEL(value[k], value[k + 1])
+            result = [_build(structures.LABEL_t, validate, key=value[k],
+                             value=value[k + 1])
                       for k in range(len(value))[::2]]
         except IndexError:
             msg = "Unpaired index when parsing %s to list of LABEL types."
@@ -161,11 +553,11 @@ def to_instruction(parsed_instruction):
         if parsed_instruction.sub_cmd == 'onbuild':
             raise DockerphileError("ONBUILD is not allowed as subcommand of "
                                    "ONBUILD.")
-        sub_cmd_str = original.replace('ONBUILD', '')
-        parsed_sub_cmd = parse_string(sub_cmd_str)[0]
-        return structures.ONBUILD(to_instruction(parsed_sub_cmd))
+        parsed_sub_cmd = onbuild_trigger(parsed_instruction)
+        return _build(structures.ONBUILD_t, validate,
+                      instruction=to_instruction(parsed_sub_cmd, validate))
     if cmd == 'run':
-        return structures.RUN(**{
+        return _build(structures.RUN_t, validate, **{
             ('exec_form' if uses_json else 'shell_form'): value
         })
     if cmd == "shell":
@@ -175,12 +567,12 @@ def to_instruction(parsed_instruction):
         if not value:
             raise DockerphileError("SHELL instruction requires nonempty JSON "
                                    "array option format.")
-        return structures.SHELL(value)
+        return _build(structures.SHELL_t, validate, shell_spec=value)
     if cmd == 'stopsignal':
         if not value:
             raise DockerphileError("STOPSIGNAL instruction requires nonempty "
                                    "value.")
-        return structures.STOPSIGNAL(value[0])
+        return _build(structures.STOPSIGNAL_t, validate, signal=value[0])
     if cmd == 'user':
         if not value:
             raise DockerphileError("USER instruction requires nonempty value.")
@@ -189,13 +581,13 @@ def to_instruction(parsed_instruction):
             user, group = parsed_user_group.groups()
         else:
             user, group = value[0], None
-        return structures.USER(user, group=group)
+        return _build(structures.USER_t, validate, user=user, group=group)
     if cmd == 'volume':
-        return structures.VOLUME(value)
+        return _build(structures.VOLUME_t, validate, volume_specs=value)
     if cmd == 'workdir':
         if not value:
             raise DockerphileError("WORKDIR instruction requires nonempty "
                                    "value.")
-        return structures.WORKDIR(value[0])
+        return _build(structures.WORKDIR_t, validate, workdir=value[0])
     raise DockerphileError("Unrecognized dockerfile.Command parsed command "
                            "%s" % cmd)
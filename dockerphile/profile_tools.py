@@ -0,0 +1,198 @@
+import time
+from collections import namedtuple
+
+
+PhaseStats = namedtuple('PhaseStats', ['calls', 'seconds'])
+PHASES = ('read', 'parse', 'convert', 'validate', 'render', 'populate',
+          'save')
+clock = time.perf_counter
+active = None
+
+
+class Profile:
+    """Opt-in call counts and cumulative times of dockerphile phases."""
+
+    def __init__(self, callbacks=()):
+        """Create an empty profile.
+
+        A profile only records while it is active, i.e. inside a `with`
+        block. While no profile is active the instrumented functions only
+        test `dockerphile.profile_tools.active` for `None`, so profiling
+        costs nothing measurable when it is not used. The active profile is
+        process wide, and `with` blocks of profiles may be nested; the inner
+        profile records until its block ends.
+
+        The recorded phases (see `PHASES`) are:
+
+            read: `dockerphile.parse_tools.read_source` (file I/O and
+                decoding).
+            parse: one call into a parser backend (the Go extension or the
+                native tokenizer) by `dockerphile.parse_tools.parse_commands`.
+            convert: `dockerphile.parse_tools.to_instruction`, per command
+                keyword, including the factory validation.
+            validate: factory validation of one instruction, per type.
+            render: `dockerphile.render_tools.render_instruction`, per type.
+            populate: parsing a source into a `dockerphile.Dockerfile`,
+                including the parse, convert and validate phases.
+            save: writing one file with `dockerphile.Dockerfile.save` or
+                `dockerphile.dockerfile_tools.save_many`.
+
+        Times are inclusive, e.g. an ONBUILD conversion includes the
+        conversion of its trigger, which is also recorded on its own. Calls
+        that raise an exception are not recorded.
+
+        Args:
+            callbacks: Optional iterable of callables, each called as
+                `callback(phase, instruction_type, seconds)` for every
+                recorded call, e.g. to forward timings to a metrics system.
+                `instruction_type` is an instruction keyword such as 'RUN',
+                or `None` for phases not broken down by type.
+
+        Returns:
+            Nothing.
+
+        Raises:
+            Nothing.
+
+        """
+        self.callbacks = list(callbacks)
+        self._phases = {}
+        self._instruction_types = {}
+        self._previous = []
+
+    def __enter__(self):
+        """Make this profile the active one."""
+        global active
+        self._previous.append(active)
+        active = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Restore the profile that was active before."""
+        global active
+        active = self._previous.pop()
+        return False
+
+    def record(self, phase, seconds, instruction_type=None):
+        """Record one call of a phase.
+
+        Instrumented dockerphile functions call this while the profile is
+        active. It may also be called directly to time custom phases.
+
+        Args:
+            phase: A string naming the phase, e.g. one of `PHASES`.
+            seconds: The float duration of the call.
+            instruction_type: Optional instruction keyword string (e.g.
+                'RUN') to also record the call per instruction type.
+
+        Returns:
+            Nothing.
+
+        Raises:
+            Any exception raised by a callback.
+
+        """
+        totals = self._phases.get(phase)
+        if totals is None:
+            totals = self._phases[phase] = [0, 0.0]
+        totals[0] += 1
+        totals[1] += seconds
+        if instruction_type is not None:
+            key = (phase, instruction_type)
+            totals = self._instruction_types.get(key)
+            if totals is None:
+                totals = self._instruction_types[key] = [0, 0.0]
+            totals[0] += 1
+            totals[1] += seconds
+        for callback in self.callbacks:
+            callback(phase, instruction_type, seconds)
+
+    def phases(self):
+        """Return the totals of every recorded phase.
+
+        Args:
+            None.
+
+        Returns:
+            A dictionary mapping phase names to
+            `dockerphile.profile_tools.PhaseStats` namedtuples of the number
+            of `calls` and the cumulative `seconds`.
+
+        Raises:
+            Nothing.
+
+        """
+        return {phase: PhaseStats(*totals)
+                for phase, totals in self._phases.items()}
+
+    def instruction_types(self, phase=None):
+        """Return the totals of the recorded phases per instruction type.
+
+        Args:
+            phase: Optional string naming one phase. If given, only that
+                phase is reported and keys are instruction keywords.
+
+        Returns:
+            A dictionary mapping `(phase, instruction_type)` tuples (or
+            instruction keywords, if `phase` is given) to
+            `dockerphile.profile_tools.PhaseStats` namedtuples.
+
+        Raises:
+            Nothing.
+
+        """
+        if phase is None:
+            return {key: PhaseStats(*totals)
+                    for key, totals in self._instruction_types.items()}
+        return {key[1]: PhaseStats(*totals)
+                for key, totals in self._instruction_types.items()
+                if key[0] == phase}
+
+    def reset(self):
+        """Discard all recorded totals, keeping the callbacks.
+
+        Args:
+            None.
+
+        Returns:
+            Nothing.
+
+        Raises:
+            Nothing.
+
+        """
+        self._phases = {}
+        self._instruction_types = {}
+
+    def report(self):
+        """Format the recorded totals as a table, slowest phase first.
+
+        Args:
+            None.
+
+        Returns:
+            A string with one line per phase followed by indented lines per
+            instruction type.
+
+        Raises:
+            Nothing.
+
+        """
+        lines = []
+        by_time = sorted(self._phases.items(), key=lambda item: -item[1][1])
+        for phase, (calls, seconds) in by_time:
+            lines.append("%-24s %10d calls %12.6f s" % (phase, calls, seconds))
+            types = sorted(self.instruction_types(phase).items(),
+                           key=lambda item: -item[1].seconds)
+            for instruction_type, stats in types:
+                lines.append("  %-22s %10d calls %12.6f s" % (
+                    instruction_type, stats.calls, stats.seconds
+                ))
+        return "\n".join(lines) + "\n"
+
+    def __repr__(self):
+        """Show the phase totals."""
+        return "Profile(%s)" % ", ".join(
+            "%s=%r" % (phase, tuple(stats))
+            for phase, stats in sorted(self.phases().items())
+        )
@@ -1,15 +1,255 @@
 import json
 
-from dockerphile import structures
+from dockerphile import profile_tools
 from dockerphile.errors import DockerphileError
 
 
+def _render_words(keyword, words):
+    """Helper to render a keyword followed by space separated literals."""
+    return ' '.join((keyword,) + tuple(words))
+
+
+def _render_quoted(keyword, resources):
+    """Helper to render a keyword followed by double-quoted resources."""
+    return keyword + ''.join([' "%s"' % resource for resource in resources])
+
+
+def _render_form(keyword, shell_form, json_form):
+    """Helper to render a shell form as literals, else a JSON form."""
+    if shell_form is not None:
+        return _render_words(keyword, shell_form)
+    return keyword + " " + json.dumps(json_form)
+
+
+def _render_file_flags(keyword, instruction):
+    """Helper to render the --chown, --chmod and --link file options."""
+    parts = [keyword]
+    if instruction.chown is not None:
+        parts.append("--chown=%s" % instruction.chown)
+    if instruction.chmod is not None:
+        parts.append("--chmod=%s" % instruction.chmod)
+    if instruction.link is True:
+        parts.append("--link")
+    elif instruction.link is False:
+        parts.append("--link=false")
+    return " ".join(parts)
+
+
+def _render_add(instruction):
+    """Render an ADD_t instruction."""
+    return _render_quoted(_render_file_flags("ADD", instruction),
+                          instruction.resources)
+
+
+def _render_arg(instruction):
+    """Render an ARG_t instruction."""
+    if instruction.default_value is not None:
+        return "ARG %s=%s" % (instruction.key, instruction.default_value)
+    return "ARG %s" % instruction.key
+
+
+def _render_cmd(instruction):
+    """Render a CMD_t instruction."""
+    if instruction.shell_form is not None:
+        return _render_words("CMD", instruction.shell_form)
+    if instruction.exec_form is not None:
+        return "CMD " + json.dumps(instruction.exec_form)
+    return "CMD " + json.dumps(instruction.default_form)
+
+
+def _render_comment(instruction):
+    """Render a COMMENT_t line."""
+    return "# %s" % instruction.comment
+
+
+def _render_copy(instruction):
+    """Render a COPY_t instruction."""
+    keyword = "COPY"
+    if instruction.from_ is not None:
+        keyword = "COPY --from=%s" % instruction.from_
+    return _render_quoted(_render_file_flags(keyword, instruction),
+                          instruction.resources)
+
+
+def _render_entrypoint(instruction):
+    """Render an ENTRYPOINT_t instruction."""
+    return _render_form("ENTRYPOINT", instruction.shell_form,
+                        instruction.exec_form)
+
+
+def _render_env(instruction):
+    """Render an ENV_t instruction."""
+    return "ENV %s %s" % (instruction.key, instruction.value)
+
+
+def _render_escape(instruction):
+    """Render an ESCAPE_t parser directive."""
+    return "# escape=%s" % instruction.character
+
+
+def _render_expose(instruction):
+    """Render an EXPOSE_t instruction."""
+    return _render_words("EXPOSE", instruction.port_specs)
+
+
+def _render_from(instruction):
+    """Render a FROM_t instruction."""
+    keyword = "FROM"
+    if instruction.platform is not None:
+        keyword = "FROM --platform=%s" % instruction.platform
+    if instruction.as_ is not None:
+        return "%s %s AS %s" % (keyword, instruction.base_image,
+                                instruction.as_)
+    return "%s %s" % (keyword, instruction.base_image)
+
+
+def _render_healthcheck(instruction):
+    """Render a HEALTHCHECK_t instruction, one option per line."""
+    parts = ["HEALTHCHECK"]
+    if instruction.interval is not None:
+        parts.append("--interval=%s" % instruction.interval)
+    if instruction.timeout is not None:
+        parts.append("--timeout=%s" % instruction.timeout)
+    if instruction.start_period is not None:
+        parts.append("--start-period=%s" % instruction.start_period)
+    if instruction.start_interval is not None:
+        parts.append("--start-interval=%s" % instruction.start_interval)
+    if instruction.retries is not None:
+        parts.append("--retries=%s" % instruction.retries)
+    if instruction.cmd is None:
+        parts.append("NONE")
+    elif isinstance(instruction.cmd, str):
+        parts.append("CMD %s" % instruction.cmd)
+    else:
+        parts.append(_render_words("CMD", instruction.cmd))
+    return " \\\n  ".join(parts)
+
+
+def _render_label(instruction):
+    """Render a LABEL_t instruction."""
+    return "LABEL %s=%s" % (instruction.key, instruction.value)
+
+
+def _render_onbuild(instruction):
+    """Render an ONBUILD_t instruction and its trigger instruction."""
+    return "ONBUILD %s" % render_instruction(instruction.instruction)
+
+
+def _render_run(instruction):
+    """Render a RUN_t instruction."""
+    return _render_form("RUN", instruction.shell_form, instruction.exec_form)
+
+
+def _render_shell(instruction):
+    """Render a SHELL_t instruction."""
+    return "SHELL " + json.dumps(instruction.shell_spec)
+
+
+def _render_stopsignal(instruction):
+    """Render a STOPSIGNAL_t instruction."""
+    return "STOPSIGNAL %s" % instruction.signal
+
+
+def _render_user(instruction):
+    """Render a USER_t instruction."""
+    if instruction.group is not None:
+        return "USER %s:%s" % (instruction.user, instruction.group)
+    return "USER %s" % instruction.user
+
+
+def _render_volume(instruction):
+    """Render a VOLUME_t instruction."""
+    return "VOLUME " + json.dumps(instruction.volume_specs)
+
+
+def _render_workdir(instruction):
+    """Render a WORKDIR_t instruction."""
+    return "WORKDIR %s" % instruction.workdir
+
+
+BUILTIN_RENDERERS = {
+    'ADD': _render_add,
+    'ARG': _render_arg,
+    'CMD': _render_cmd,
+    'COMMENT': _render_comment,
+    'COPY': _render_copy,
+    'ENTRYPOINT': _render_entrypoint,
+    'ENV': _render_env,
+    'ESCAPE': _render_escape,
+    'EXPOSE': _render_expose,
+    'FROM': _render_from,
+    'HEALTHCHECK': _render_healthcheck,
+    'LABEL': _render_label,
+    'ONBUILD': _render_onbuild,
+    'RUN': _render_run,
+    'SHELL': _render_shell,
+    'STOPSIGNAL': _render_stopsignal,
+    'USER': _render_user,
+    'VOLUME': _render_volume,
+    'WORKDIR': _render_workdir,
+}
+RENDERERS = {}
+renderers_version = 0
+
+
+def _builtin_renderer(instruction_type):
+    """Helper to look up and remember the renderer of a structures type.
+
+    `BUILTIN_RENDERERS` is keyed by instruction keyword rather than by type,
+    so that rendering only imports the `dockerphile.structures` modules of
+    the instruction types actually used. A built-in renderer is copied into
+    `RENDERERS` the first time its type is rendered.
+    """
+    name = instruction_type.__name__
+    renderer = BUILTIN_RENDERERS.get(name)
+    module = 'dockerphile.structures.%s_t' % name.lower()
+    if renderer is None or instruction_type.__module__ != module:
+        return None
+    return RENDERERS.setdefault(instruction_type, renderer)
+
+
+def register_renderer(instruction_type, renderer):
+    """Register the function used to render an instruction type.
+
+    Registering a renderer for a type that already has one replaces it,
+    including the built-in renderers of `dockerphile.structures` types in
+    `BUILTIN_RENDERERS`. Subclasses of a registered type without their own
+    renderer use the renderer of their nearest registered base class.
+
+    Args:
+        instruction_type: A class, typically a namedtuple type, whose
+            instances should be rendered by `renderer`.
+        renderer: A callable accepting one instruction and returning its
+            rendered Dockerfile line(s) as a string.
+
+    Returns:
+        Nothing. Updates `dockerphile.render_tools.RENDERERS` and increments
+        `dockerphile.render_tools.renderers_version`, which invalidates
+        cached renderings held by `dockerphile.Dockerfile` instances.
+
+    Raises:
+        DockerphileError: raised when `instruction_type` is not a class or
+            `renderer` is not callable.
+
+    """
+    global renderers_version
+    if not isinstance(instruction_type, type):
+        raise DockerphileError(
+            "Renderer must be registered for a type, not %s" % instruction_type
+        )
+    if not callable(renderer):
+        raise DockerphileError("Renderer %s is not callable" % renderer)
+    RENDERERS[instruction_type] = renderer
+    renderers_version += 1
+
+
 def render_instruction(instruction):
     """Render a string format of a dockerphile instruction.
 
     Args:
         instruction: A dockerphile instruction type from
-            `dockerphile.structures`.
+            `dockerphile.structures`, or an instance of a type registered
+            with `register_renderer`.
 
     Returns:
         A string containing the rendered output of the given instruction.
@@ -19,105 +259,21 @@ def render_instruction(instruction):
             instruction type.
 
     """
-    if isinstance(instruction, structures.ADD_t):
-        result = "ADD"
-        for resource in instruction.resources:
-            result = result + ' "%s"' % resource
-        return result
-    if isinstance(instruction, structures.ARG_t):
-        result = "ARG %s" % instruction.key
-        if instruction.default_value is not None:
-            result = result + "=%s" % instruction.default_value
-        return result
-    if isinstance(instruction, structures.CMD_t):
-        result = "CMD"
-        if instruction.shell_form is not None:
-            for c in instruction.shell_form:
-                result = result + " %s" % c
-            return result
-        elif instruction.exec_form is not None:
-            commands = json.dumps(instruction.exec_form)
+    renderer = RENDERERS.get(type(instruction))
+    if renderer is None:
+        for base in type(instruction).__mro__:
+            renderer = RENDERERS.get(base) or _builtin_renderer(base)
+            if renderer is not None:
+                break
         else:
-            commands = json.dumps(instruction.default_form)
-        return result + " " + commands
-    if isinstance(instruction, structures.COMMENT_t):
-        return "# %s" % instruction.comment
-    if isinstance(instruction, structures.COPY_t):
-        result = "COPY"
-        if instruction.from_ is not None:
-            result = result + " --from=%s" % instruction.from_
-        for resource in instruction.resources:
-            result = result + ' "%s"' % resource
-        return result
-    if isinstance(instruction, structures.ENTRYPOINT_t):
-        result = "ENTRYPOINT"
-        if instruction.shell_form is not None:
-            for c in instruction.shell_form:
-                result = result + " %s" % c
-            return result
-        else:
-            commands = json.dumps(instruction.exec_form)
-            return result + " " + commands
-    if isinstance(instruction, structures.ENV_t):
-        return "ENV %s %s" % (instruction.key, instruction.value)
-    if isinstance(instruction, structures.ESCAPE_t):
-        return "# escape=%s" % instruction.character
-    if isinstance(instruction, structures.EXPOSE_t):
-        result = "EXPOSE"
-        for port_spec in instruction.port_specs:
-            result = result + " %s" % port_spec
-        return result
-    if isinstance(instruction, structures.FROM_t):
-        result = "FROM %s" % instruction.base_image
-        if instruction.as_ is not None:
-            result = result + " AS %s" % instruction.as_
-        return result
-    if isinstance(instruction, structures.HEALTHCHECK_t):
-        result = "HEALTHCHECK"
-        if instruction.interval is not None:
-            result = result + " \\\n  --interval=%s" % instruction.interval
-        if instruction.timeout is not None:
-            result = result + " \\\n  --timeout=%s" % instruction.timeout
-        if instruction.start_period is not None:
-            result = result + " \\\n  --start-period=%s" % (
-                instruction.start_period
+            raise DockerphileError(
+                "Unrecognized or invalid instruction type %s" % (instruction,)
             )
-        if instruction.retries is not None:
-            result = result + " \\\n  --retries=%s" % instruction.retries
-        if instruction.cmd is not None:
-            result = result + " \\\n  CMD"
-            if isinstance(instruction.cmd, str):
-                return result + " %s" % instruction.cmd
-            else:
-                for c in instruction.cmd:
-                    result = result + " %s" % c
-                return result
-    if isinstance(instruction, structures.LABEL_t):
-        return "LABEL %s=%s" % (instruction.key, instruction.value)
-    if isinstance(instruction, structures.ONBUILD_t):
-        return "ONBUILD %s" % render_instruction(instruction.instruction)
-    if isinstance(instruction, structures.RUN_t):
-        result = "RUN"
-        if instruction.shell_form is not None:
-            for c in instruction.shell_form:
-                result = result + " %s" % c
-            return result
-        else:
-            commands = json.dumps(instruction.exec_form)
-            return result + " " + commands
-    if isinstance(instruction, structures.SHELL_t):
-        return "SHELL " + json.dumps(instruction.shell_spec)
-    if isinstance(instruction, structures.STOPSIGNAL_t):
-        return "STOPSIGNAL %s" % instruction.signal
-    if isinstance(instruction, structures.USER_t):
-        result = "USER %s" % instruction.user
-        if instruction.group is not None:
-            result = result + ":%s" % instruction.group
-        return result
-    if isinstance(instruction, structures.VOLUME_t):
-        return "VOLUME " + json.dumps(instruction.volume_specs)
-    if isinstance(instruction, structures.WORKDIR_t):
-        return "WORKDIR %s" % instruction.workdir
-    raise DockerphileError(
-        "Unrecognized or invalid instruction type %s" % instruction
-    )
+    profile = profile_tools.active
+    if profile is None:
+        return renderer(instruction)
+    start = profile_tools.clock()
+    line = renderer(instruction)
+    profile.record('render', profile_tools.clock() - start,
+                   type(instruction).__name__)
+    return line
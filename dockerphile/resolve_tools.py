@@ -0,0 +1,345 @@
+import re
+from collections import namedtuple
+
+from dockerphile import structures
+from dockerphile.errors import DockerphileError
+
+
+StageScope = namedtuple('StageScope', [
+    'index', 'name', 'base_image', 'parent', 'args', 'env', 'instructions'
+])
+variable_name = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+SUBSTITUTED_FIELDS = {
+    structures.ADD_t: ('resources', 'chown', 'chmod'),
+    structures.COPY_t: ('resources', 'from_', 'chown', 'chmod'),
+    structures.ENV_t: ('key', 'value'),
+    structures.EXPOSE_t: ('port_specs',),
+    structures.FROM_t: ('base_image', 'platform'),
+    structures.LABEL_t: ('key', 'value'),
+    structures.STOPSIGNAL_t: ('signal',),
+    structures.VOLUME_t: ('volume_specs',),
+    structures.WORKDIR_t: ('workdir',),
+}
+
+
+def _closing_brace(word, start):
+    """Helper to find the `}` closing a `${` whose body begins at `start`."""
+    depth = 1
+    for index in range(start, len(word)):
+        if word[index] == '{' and word[index - 1] == '$':
+            depth += 1
+        elif word[index] == '}':
+            depth -= 1
+            if not depth:
+                return index
+    raise DockerphileError("Missing '}' in variable substitution %s" % word)
+
+
+def _expand_variable(word, index, variables, escape, output):
+    """Helper to expand the variable reference starting at `word[index]`."""
+    if word.startswith('${', index):
+        match = variable_name.match(word, index + 2)
+        if match is None:
+            raise DockerphileError("Bad substitution in %s" % word)
+        name, cursor = match.group(), match.end()
+        end = _closing_brace(word, cursor)
+        operator, operand = word[cursor:end], None
+        for candidate in (':-', ':+', ':?', '-', '+', '?'):
+            if operator.startswith(candidate):
+                operator, operand = candidate, operator[len(candidate):]
+                break
+        if operand is None and operator:
+            raise DockerphileError("Unsupported modifier %s in %s"
+                                   % (operator, word))
+    else:
+        match = variable_name.match(word, index + 1)
+        if match is None:
+            output.append('$')
+            return index + 1
+        name, end, operator = match.group(), match.end() - 1, ''
+    value = variables.get(name)
+    is_set = value is not None
+    if operator.startswith(':'):
+        is_set = bool(value)
+    if operator.endswith('-') and not is_set:
+        value = substitute(operand, variables, escape)
+    elif operator.endswith('+'):
+        value = substitute(operand, variables, escape) if is_set else ''
+    elif operator.endswith('?') and not is_set:
+        raise DockerphileError("%s: %s" % (
+            name, operand or "is not allowed to be unset"
+        ))
+    output.append(value or '')
+    return end + 1
+
+
+def _expand_double_quoted(word, index, variables, escape, output):
+    """Helper to expand a double-quoted span whose body begins at `index`."""
+    while index < len(word):
+        char = word[index]
+        if char == '"':
+            return index + 1
+        escaped = word[index + 1:index + 2]
+        if char == escape and escaped in ('"', '$', escape):
+            output.append(word[index + 1])
+            index += 2
+        elif char == '$':
+            index = _expand_variable(word, index, variables, escape, output)
+        else:
+            output.append(char)
+            index += 1
+    raise DockerphileError("Unexpected end of statement while looking for "
+                           "matching double-quote in %s" % word)
+
+
+def substitute(word, variables, escape='\\'):
+    r"""Expand Dockerfile variable references and quotes in a word.
+
+    Implements the environment replacement of Dockerfile instructions:
+    `$VAR`, `${VAR}`, `${VAR:-default}`, `${VAR-default}`, `${VAR:+alt}`,
+    `${VAR+alt}`, `${VAR:?message}` and `${VAR?message}`. Single quotes
+    prevent expansion, double quotes do not, and both are removed, as is
+    the escape character in front of an escaped character.
+
+    Args:
+        word: A string from a Dockerfile instruction.
+        variables: A mapping from variable names to string values. Names
+            that are missing, or mapped to `None`, are unset.
+        escape: Optional escape character (default '\').
+
+    Returns:
+        The expanded string.
+
+    Raises:
+        DockerphileError: raised for malformed references or quotes and for
+            `?` references to unset variables.
+
+    """
+    output, index = [], 0
+    while index < len(word):
+        char = word[index]
+        if char == escape and index + 1 < len(word):
+            output.append(word[index + 1])
+            index += 2
+        elif char == "'":
+            end = word.find("'", index + 1)
+            if end < 0:
+                raise DockerphileError("Unexpected end of statement while "
+                                       "looking for matching single-quote "
+                                       "in %s" % word)
+            output.append(word[index + 1:end])
+            index = end + 1
+        elif char == '"':
+            index = _expand_double_quoted(word, index + 1, variables, escape,
+                                          output)
+        elif char == '$':
+            index = _expand_variable(word, index, variables, escape, output)
+        else:
+            output.append(char)
+            index += 1
+    return ''.join(output)
+
+
+def _substitute_field(value, variables, escape):
+    """Helper to expand a string or tuple-of-strings instruction field."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return substitute(value, variables, escape)
+    return tuple(substitute(item, variables, escape) for item in value)
+
+
+class Resolver:
+    """Resolve ARG and ENV variables of a Dockerfile stage by stage."""
+
+    def __init__(self, dockerfile, build_args=None):
+        """Create a resolver for the current sequence of a Dockerfile.
+
+        Scoping follows `docker build`: ARGs before the first FROM are
+        global and only visible in FROM lines unless a stage redeclares
+        them with a bare `ARG NAME`; stage ARGs and ENVs are visible from
+        their declaration to the end of the stage, and ENV takes
+        precedence over an ARG of the same name; a stage built `FROM` an
+        earlier stage inherits its ENV (but not its ARGs). Environment of
+        external base images is unknown and treated as empty. Results are
+        memoised per stage, so create a new resolver after editing the
+        Dockerfile.
+
+        Args:
+            dockerfile: A `dockerphile.Dockerfile` instance.
+            build_args: Optional dictionary of `--build-arg` values, which
+                override the defaults of declared ARGs.
+
+        Returns:
+            Nothing.
+
+        Raises:
+            Nothing.
+
+        """
+        self.dockerfile = dockerfile
+        self.build_args = dict(build_args or {})
+        sequence = dockerfile.sequence
+        self.escape = '\\'
+        if sequence and isinstance(sequence[0], structures.ESCAPE_t):
+            self.escape = sequence[0].character
+        self._stages = dockerfile.stages()
+        self._stage_names = {}
+        for stage in self._stages:
+            if stage.name is not None:
+                self._stage_names.setdefault(stage.name.lower(), stage.index)
+        self._scopes = {}
+        self._global_args = None
+
+    def _declare(self, instruction, args, variables):
+        """Helper to compute the value of a declared ARG."""
+        if instruction.key in self.build_args:
+            return self.build_args[instruction.key]
+        if instruction.default_value is not None:
+            return substitute(instruction.default_value, variables,
+                              self.escape)
+        return args.get(instruction.key)
+
+    def global_args(self):
+        """Return the global ARGs declared before the first FROM.
+
+        Args:
+            None.
+
+        Returns:
+            A dictionary mapping global ARG names to their effective values
+            (`None` for ARGs declared without a default or build arg).
+
+        Raises:
+            DockerphileError: raised for invalid variable references.
+
+        """
+        if self._global_args is None:
+            args = {}
+            stop = self._stages[0].start if self._stages else len(
+                self.dockerfile.sequence)
+            for instruction in self.dockerfile.sequence[:stop]:
+                if isinstance(instruction, structures.ARG_t):
+                    args[instruction.key] = self._declare(instruction, args,
+                                                          args)
+            self._global_args = args
+        return dict(self._global_args)
+
+    def scope(self, stage):
+        """Resolve one build stage.
+
+        Args:
+            stage: The `as_` name of a stage or an integer index of the FROM
+                instructions, as for `dockerphile.Dockerfile.stage`.
+
+        Returns:
+            A `dockerphile.resolve_tools.StageScope` namedtuple with the
+            stage `index` and `name`, the resolved `base_image`, the index
+            of the `parent` stage it is built from (or `None`), the `args`
+            and `env` dictionaries in effect at the end of the stage, and
+            the stage `instructions` with variables substituted in the
+            fields that Docker expands (FROM, ADD, ARG, COPY, ENV, EXPOSE,
+            LABEL, STOPSIGNAL, USER, VOLUME and WORKDIR). ARG instructions
+            carry their effective value (build arg, default or global
+            value) as `default_value`. ONBUILD triggers are left as they
+            are, since they expand in the child build.
+
+        Raises:
+            DockerphileError: raised if `stage` names no build stage or for
+                invalid variable references.
+
+        """
+        index = self.dockerfile.stage(stage).index
+        scope = self._scopes.get(index)
+        if scope is None:
+            scope = self._resolve_stage(self._stages[index])
+            self._scopes[index] = scope
+        return scope
+
+    def _resolve_stage(self, stage):
+        """Helper to walk the instructions of one stage."""
+        sequence = self.dockerfile.sequence
+        global_args = self.global_args()
+        first = sequence[stage.start]
+        from_ = self._resolve(first, global_args)
+        parent = self._stage_names.get(from_.base_image.lower())
+        if parent is not None and parent >= stage.index:
+            parent = None
+        env = {} if parent is None else dict(self.scope(parent).env)
+        args, instructions = {}, [from_]
+        for instruction in sequence[stage.start + 1:stage.stop]:
+            variables = dict(args)
+            variables.update(env)
+            if isinstance(instruction, structures.ARG_t):
+                args[instruction.key] = self._declare(
+                    instruction, global_args, variables
+                )
+                instruction = instruction._replace(
+                    default_value=args[instruction.key]
+                )
+            else:
+                instruction = self._resolve(instruction, variables)
+            if isinstance(instruction, structures.ENV_t):
+                env[instruction.key] = instruction.value
+            instructions.append(instruction)
+        return StageScope(
+            index=stage.index, name=stage.name, base_image=from_.base_image,
+            parent=parent, args=args, env=env,
+            instructions=tuple(instructions)
+        )
+
+    def _resolve(self, instruction, variables):
+        """Helper to substitute variables into one instruction."""
+        if isinstance(instruction, structures.USER_t):
+            spec = instruction.user
+            if instruction.group is not None:
+                spec = "%s:%s" % (instruction.user, instruction.group)
+            user, _, group = substitute(spec, variables,
+                                        self.escape).partition(':')
+            return instruction._replace(user=user, group=group or None)
+        fields = SUBSTITUTED_FIELDS.get(type(instruction))
+        if fields is None:
+            return instruction
+        return instruction._replace(**{
+            field: _substitute_field(getattr(instruction, field), variables,
+                                     self.escape)
+            for field in fields
+        })
+
+    def base_images(self):
+        """Return the resolved base image of every stage.
+
+        Args:
+            None.
+
+        Returns:
+            A list of resolved base image strings in stage order. Stages
+            built from an earlier stage report that stage's name.
+
+        Raises:
+            DockerphileError: raised for invalid variable references.
+
+        """
+        return [self.scope(stage.index).base_image for stage in self._stages]
+
+    def environment(self, stage=-1):
+        """Return the variables visible at the end of a stage.
+
+        Args:
+            stage: Optional stage name or index (default -1, the final
+                stage).
+
+        Returns:
+            A dictionary of the stage's ARG values overlaid with its ENV
+            values, leaving out ARGs that have no value.
+
+        Raises:
+            DockerphileError: raised if `stage` names no build stage or for
+                invalid variable references.
+
+        """
+        scope = self.scope(stage)
+        variables = {key: value for key, value in scope.args.items()
+                     if value is not None}
+        variables.update(scope.env)
+        return variables
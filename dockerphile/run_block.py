@@ -1,3 +1,7 @@
+RUN_CHAIN_PREFIX = "\\\n  "
+RUN_CHAIN_SEPARATOR = " && \\\n  "
+
+
 class RunBlock:
     """Context manager for coalescing multiple RUN instructions."""
 
@@ -35,7 +39,7 @@ class RunBlock:
     def __exit__(self, *args):
         """Write the coalesced RUN instruction to the Dockerfile on exit."""
         self.dockerfile.run(
-            ["\\\n  " + " && \\\n  ".join(self.sequence)],
+            [RUN_CHAIN_PREFIX + RUN_CHAIN_SEPARATOR.join(self.sequence)],
             form=self.form
         )
 
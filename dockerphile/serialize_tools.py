@@ -0,0 +1,289 @@
+import sys
+import zlib
+
+from dockerphile import structures
+from dockerphile.errors import DockerphileError
+
+
+MAGIC = b'\x00\xdd\xf1\x1e'
+FORMAT_VERSION = 1
+OPCODES = ('ADD', 'ARG', 'CMD', 'COMMENT', 'COPY', 'ENTRYPOINT', 'ENV',
+           'ESCAPE', 'EXPOSE', 'FROM', 'HEALTHCHECK', 'LABEL', 'ONBUILD',
+           'RUN', 'SHELL', 'STOPSIGNAL', 'USER', 'VOLUME', 'WORKDIR')
+OPCODE_BY_KEYWORD = {keyword: opcode for opcode, keyword in enumerate(OPCODES)}
+TAG_NONE = 0
+TAG_STRING = 1
+TAG_STRINGS = 2
+TAG_FALSE = 3
+TAG_TRUE = 4
+TAG_INSTRUCTION = 5
+TAG_TUPLE = 6
+TAG_INT = 7
+DECODE_ERRORS = (IndexError, UnicodeDecodeError, ValueError, zlib.error)
+
+
+def _write_varint(buffer, number):
+    """Helper to append an unsigned LEB128 integer to a bytearray."""
+    while number > 0x7f:
+        buffer.append((number & 0x7f) | 0x80)
+        number >>= 7
+    buffer.append(number)
+
+
+def _read_varint(data, position):
+    """Helper to read an unsigned LEB128 integer at `data[position]`."""
+    byte = data[position]
+    if byte < 0x80:
+        return byte, position + 1
+    number, shift = 0, 0
+    while True:
+        byte = data[position]
+        position += 1
+        number |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return number, position
+        shift += 7
+
+
+def _write_string(body, strings, value):
+    """Helper to append the string table index of a string."""
+    index = strings.get(value)
+    if index is None:
+        index = strings[value] = len(strings)
+    _write_varint(body, index)
+
+
+def _write_table(header, strings):
+    """Helper to append the compressed string table."""
+    if any('\0' in string for string in strings):
+        raise DockerphileError("Cannot serialize strings containing NUL")
+    table = zlib.compress('\0'.join(strings).encode('utf-8', 'surrogatepass'))
+    _write_varint(header, len(strings))
+    _write_varint(header, len(table))
+    header += table
+
+
+def _read_table(data, position):
+    """Helper to read the string table, returning it and the next position."""
+    count, position = _read_varint(data, position)
+    length, position = _read_varint(data, position)
+    end = position + length
+    if end > len(data):
+        raise ValueError("string table exceeds data")
+    table = zlib.decompress(data[position:end]).decode('utf-8',
+                                                       'surrogatepass')
+    strings = list(map(sys.intern, table.split('\0'))) if count else []
+    if len(strings) != count:
+        raise ValueError("expected %d strings, found %d"
+                         % (count, len(strings)))
+    return strings, end
+
+
+def _encode_instruction(instruction, strings, body):
+    """Helper to append an opcode and the tagged fields of an instruction."""
+    kind = type(instruction)
+    opcode = OPCODE_BY_KEYWORD.get(kind.__name__)
+    if opcode is None or getattr(structures, kind.__name__ + '_t') is not kind:
+        raise DockerphileError("Cannot serialize instruction %s of type %s"
+                               % (instruction, kind))
+    body.append(opcode)
+    for value in instruction:
+        _encode_value(value, strings, body)
+
+
+def _encode_value(value, strings, body):
+    """Helper to append one tagged field value."""
+    if value is None:
+        body.append(TAG_NONE)
+    elif isinstance(value, str):
+        body.append(TAG_STRING)
+        _write_string(body, strings, str(value))
+    elif value is True or value is False:
+        body.append(TAG_TRUE if value else TAG_FALSE)
+    elif isinstance(value, int):
+        body.append(TAG_INT)
+        _write_varint(body, value * 2 if value >= 0 else -value * 2 - 1)
+    elif isinstance(value, tuple) and hasattr(value, '_fields'):
+        body.append(TAG_INSTRUCTION)
+        _encode_instruction(value, strings, body)
+    elif isinstance(value, tuple):
+        if all(isinstance(item, str) for item in value):
+            body.append(TAG_STRINGS)
+            _write_varint(body, len(value))
+            for item in value:
+                _write_string(body, strings, str(item))
+        else:
+            body.append(TAG_TUPLE)
+            _write_varint(body, len(value))
+            for item in value:
+                _encode_value(item, strings, body)
+    else:
+        raise DockerphileError("Cannot serialize instruction field value %r"
+                               % (value,))
+
+
+def serialize(instructions):
+    """Encode instructions in the compact dockerphile binary format.
+
+    The encoding starts with `MAGIC` and a `FORMAT_VERSION` byte, followed
+    by a table holding each distinct string once (NUL-separated UTF-8,
+    compressed with zlib) and then the instructions: one opcode byte per
+    instruction (its index in `OPCODES`) followed by its fields in order,
+    each a tag byte and, for strings, a string table index. Repeated
+    strings therefore cost one or two bytes each, and every distinct
+    string is decoded only once, in bulk. Counts and indices are written
+    as LEB128 varints.
+
+    Args:
+        instructions: An iterable of `dockerphile.structures` instructions,
+            e.g. `dockerphile.Dockerfile.sequence`.
+
+    Returns:
+        A bytes object with the encoding.
+
+    Raises:
+        DockerphileError: raised for instructions that are not
+            `dockerphile.structures` types (e.g. types only registered with
+            `dockerphile.render_tools.register_renderer`) or that hold
+            values other than strings (without NUL characters), booleans,
+            integers, tuples and instructions.
+
+    """
+    strings, body, count = {}, bytearray(), 0
+    for instruction in instructions:
+        _encode_instruction(instruction, strings, body)
+        count += 1
+    header = bytearray(MAGIC)
+    header.append(FORMAT_VERSION)
+    _write_table(header, strings)
+    _write_varint(header, count)
+    return bytes(header + body)
+
+
+def is_serialized(data):
+    """Check whether bytes start with the binary format `MAGIC` header.
+
+    The header begins with a NUL byte, which never starts Dockerfile source
+    text, so encoded instructions and encoded Dockerfile source can be told
+    apart reliably.
+
+    Args:
+        data: A bytes-like object.
+
+    Returns:
+        True if `data` starts with `MAGIC`, else False.
+
+    Raises:
+        Nothing.
+
+    """
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def _instruction_type(opcode, types):
+    """Helper to look up (and remember) the type of an opcode."""
+    instruction_type = types[opcode]
+    if instruction_type is None:
+        if opcode >= len(OPCODES):
+            raise DockerphileError("Unknown instruction opcode %d" % opcode)
+        instruction_type = getattr(structures, OPCODES[opcode] + '_t')
+        types[opcode] = instruction_type
+    return instruction_type
+
+
+def _decode_instruction(data, position, strings, types):
+    """Helper to read one instruction, returning it and the next position."""
+    instruction_type = _instruction_type(data[position], types)
+    position += 1
+    values = []
+    for _ in instruction_type._fields:
+        tag = data[position]
+        position += 1
+        if tag == TAG_STRING:
+            index, position = _read_varint(data, position)
+            values.append(strings[index])
+        elif tag == TAG_NONE:
+            values.append(None)
+        else:
+            value, position = _decode_value(tag, data, position, strings,
+                                            types)
+            values.append(value)
+    return tuple.__new__(instruction_type, values), position
+
+
+def _decode_value(tag, data, position, strings, types):
+    """Helper to read a tagged field value other than a string or None."""
+    if tag == TAG_STRINGS:
+        count, position = _read_varint(data, position)
+        items = []
+        for _ in range(count):
+            index, position = _read_varint(data, position)
+            items.append(strings[index])
+        return tuple(items), position
+    if tag == TAG_NONE:
+        return None, position
+    if tag == TAG_STRING:
+        index, position = _read_varint(data, position)
+        return strings[index], position
+    if tag == TAG_FALSE or tag == TAG_TRUE:
+        return tag == TAG_TRUE, position
+    if tag == TAG_INSTRUCTION:
+        return _decode_instruction(data, position, strings, types)
+    if tag == TAG_TUPLE:
+        count, position = _read_varint(data, position)
+        items = []
+        for _ in range(count):
+            item_tag = data[position]
+            item, position = _decode_value(item_tag, data, position + 1,
+                                           strings, types)
+            items.append(item)
+        return tuple(items), position
+    if tag == TAG_INT:
+        number, position = _read_varint(data, position)
+        return (number >> 1) ^ -(number & 1), position
+    raise DockerphileError("Unknown field tag %d" % tag)
+
+
+def deserialize(data):
+    """Decode instructions encoded with `serialize`.
+
+    Instructions are rebuilt directly from their fields, without running the
+    factory checks or any parsing, so decode only data from a trusted
+    source, or check the result with `dockerphile.Dockerfile.validate`.
+    Strings are interned, as by the factories.
+
+    Args:
+        data: A bytes-like object (e.g. `bytes`, `bytearray`, `memoryview`
+            or `mmap.mmap`) returned by `serialize`.
+
+    Returns:
+        A list of `dockerphile.structures` instructions.
+
+    Raises:
+        DockerphileError: raised if `data` is not in the binary format, has
+            an unsupported `FORMAT_VERSION` or is truncated or corrupt.
+
+    """
+    if not is_serialized(data):
+        raise DockerphileError("Data does not start with the dockerphile "
+                               "binary format header")
+    try:
+        version = data[len(MAGIC)]
+        if version != FORMAT_VERSION:
+            raise DockerphileError("Unsupported binary format version %d, "
+                                   "expected %d" % (version, FORMAT_VERSION))
+        strings, position = _read_table(data, len(MAGIC) + 1)
+        count, position = _read_varint(data, position)
+        types = [None] * 256
+        instructions = []
+        for _ in range(count):
+            instruction, position = _decode_instruction(data, position,
+                                                        strings, types)
+            instructions.append(instruction)
+    except DECODE_ERRORS as error:
+        raise DockerphileError("Truncated or corrupt binary Dockerfile "
+                               "data: %s" % error)
+    if position != len(data):
+        raise DockerphileError("Unexpected %d trailing bytes after binary "
+                               "Dockerfile data" % (len(data) - position))
+    return instructions
@@ -1,22 +1,73 @@
-from dockerphile.structures.add_t import ADD, ADD_t  # noqa: F401
-from dockerphile.structures.arg_t import ARG, ARG_t  # noqa: F401
-from dockerphile.structures.cmd_t import CMD, CMD_t  # noqa: F401
-from dockerphile.structures.comment_t import COMMENT, COMMENT_t  # noqa: F401
-from dockerphile.structures.copy_t import COPY, COPY_t  # noqa: F401
-from dockerphile.structures.entrypoint_t import (ENTRYPOINT,  # noqa: F401
-                                                 ENTRYPOINT_t)  # noqa: F401
-from dockerphile.structures.env_t import ENV, ENV_t  # noqa: F401
-from dockerphile.structures.escape_t import ESCAPE, ESCAPE_t  # noqa: F401
-from dockerphile.structures.expose_t import EXPOSE, EXPOSE_t  # noqa: F401
-from dockerphile.structures.from_t import FROM, FROM_t  # noqa: F401
-from dockerphile.structures.healthcheck_t import (HEALTHCHECK,  # noqa: F401
-                                                  HEALTHCHECK_t)  # noqa: F401
-from dockerphile.structures.label_t import LABEL, LABEL_t  # noqa: F401
-from dockerphile.structures.onbuild_t import ONBUILD, ONBUILD_t  # noqa: F401
-from dockerphile.structures.run_t import RUN, RUN_t  # noqa: F401
-from dockerphile.structures.shell_t import SHELL, SHELL_t  # noqa: F401
-from dockerphile.structures.stopsignal_t import (STOPSIGNAL,  # noqa: F401
-                                                 STOPSIGNAL_t)  # noqa: F401
-from dockerphile.structures.user_t import USER, USER_t  # noqa: F401
-from dockerphile.structures.volume_t import VOLUME, VOLUME_t  # noqa: F401
-from dockerphile.structures.workdir_t import WORKDIR, WORKDIR_t  # noqa: F401
+import importlib
+
+
+INSTRUCTION_MODULES = {
+    'ADD': 'add_t',
+    'ARG': 'arg_t',
+    'CMD': 'cmd_t',
+    'COMMENT': 'comment_t',
+    'COPY': 'copy_t',
+    'ENTRYPOINT': 'entrypoint_t',
+    'ENV': 'env_t',
+    'ESCAPE': 'escape_t',
+    'EXPOSE': 'expose_t',
+    'FROM': 'from_t',
+    'HEALTHCHECK': 'healthcheck_t',
+    'LABEL': 'label_t',
+    'ONBUILD': 'onbuild_t',
+    'RUN': 'run_t',
+    'SHELL': 'shell_t',
+    'STOPSIGNAL': 'stopsignal_t',
+    'USER': 'user_t',
+    'VOLUME': 'volume_t',
+    'WORKDIR': 'workdir_t',
+}
+VALIDATE_NAMES = ('FACTORIES', 'trusted_instruction', 'validate_instruction')
+SUBMODULES = frozenset(INSTRUCTION_MODULES.values()) | {'helpers', 'validate'}
+__all__ = sorted(
+    [name for keyword in INSTRUCTION_MODULES
+     for name in (keyword, keyword + '_t')] + list(VALIDATE_NAMES)
+)
+
+
+def __getattr__(name):
+    """Import the module defining an instruction type on first access.
+
+    The factory function `RUN` and the type `RUN_t` live in the `run_t`
+    module, and so on for every keyword in `INSTRUCTION_MODULES`, while
+    `FACTORIES`, `trusted_instruction` and `validate_instruction` live in
+    the `validate` module, which imports every instruction module. Loading
+    them on demand means that building and rendering a Dockerfile only
+    imports the modules of the instruction types it uses. Submodules, e.g.
+    `helpers`, are imported on access as well.
+
+    Args:
+        name: A string naming an attribute of `dockerphile.structures`.
+
+    Returns:
+        The attribute, which is also cached as a module global.
+
+    Raises:
+        AttributeError: raised if `name` is not a `dockerphile.structures`
+            name or submodule.
+
+    """
+    if name in SUBMODULES:
+        return importlib.import_module('%s.%s' % (__name__, name))
+    if name in VALIDATE_NAMES:
+        module = 'validate'
+    else:
+        module = INSTRUCTION_MODULES.get(name[:-2] if name.endswith('_t')
+                                         else name)
+    if module is None:
+        raise AttributeError("module %r has no attribute %r"
+                             % (__name__, name))
+    value = getattr(importlib.import_module('%s.%s' % (__name__, module)),
+                    name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """List the lazily imported names along with the loaded ones."""
+    return sorted(set(globals()) | set(__all__))
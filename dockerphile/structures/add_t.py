@@ -1,12 +1,11 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-ADD_t = namedtuple('ADD', ['resources'])
+ADD_t = _instruction_type('ADD', ['resources', 'chown', 'chmod', 'link'])
 
 
-def ADD(resources):
+def ADD(resources, chown=None, chmod=None, link=None):
     """Create a Dockerfile ADD instruction.
 
     Args:
@@ -15,13 +14,19 @@ def ADD(resources):
             treated as the destination URI in the image being built. All
             URI strings will be enclosed with double-quote characters in
             the rendered Dockerfile.
+        chown: Optional string containing a `user[:group]` specifier for the
+            ownership of the added files (the `--chown` option).
+        chmod: Optional string containing the permission bits to apply to
+            the added files (the `--chmod` option).
+        link: Optional boolean enabling (or, if False, explicitly disabling)
+            the `--link` option that adds files into an independent layer.
 
     Returns:
         An instance of the ADD namedtuple.
 
     Raises:
-        DockerphileError: raised when `resources` argument is not specified
-            in a compatible way.
+        DockerphileError: raised when `resources` or any option argument is
+            not specified in a compatible way.
 
     """
     msg = ''
@@ -31,6 +36,13 @@ def ADD(resources):
         )
     elif len(resources) < 2:
         msg = 'ADD instruction must have at least 1 src and 1 dest URI.'
+    elif not isinstance(chown, (str, type(None))):
+        msg = 'ADD --chown option must be a string, not %s' % type(chown)
+    elif not isinstance(chmod, (str, type(None))):
+        msg = 'ADD --chmod option must be a string, not %s' % type(chmod)
+    elif not isinstance(link, (bool, type(None))):
+        msg = 'ADD --link option must be a boolean, not %s' % type(link)
     if msg:
         raise DockerphileError(msg)
-    return ADD_t(resources=resources)
+    return ADD_t(resources=_canonical(resources), chown=_canonical(chown),
+                 chmod=_canonical(chmod), link=link)
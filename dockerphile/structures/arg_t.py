@@ -1,9 +1,8 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-ARG_t = namedtuple('ARG', ['key', 'default_value'])
+ARG_t = _instruction_type('ARG', ['key', 'default_value'])
 
 
 def ARG(key, default_value=None):
@@ -31,4 +30,4 @@ def ARG(key, default_value=None):
         )
     if msg:
         raise DockerphileError(msg)
-    return ARG_t(key=key, default_value=default_value)
+    return ARG_t(key=_canonical(key), default_value=_canonical(default_value))
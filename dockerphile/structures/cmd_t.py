@@ -1,10 +1,9 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
-from dockerphile.structures.helpers import _check_format
+from dockerphile.structures.helpers import (_canonical, _check_format,
+                                            _instruction_type)
 
 
-CMD_t = namedtuple('CMD', ['exec_form', 'default_form', 'shell_form'])
+CMD_t = _instruction_type('CMD', ['exec_form', 'default_form', 'shell_form'])
 
 
 def CMD(exec_form=None, default_form=None, shell_form=None):
@@ -52,4 +51,4 @@ def CMD(exec_form=None, default_form=None, shell_form=None):
     for arg_name, arg_value in kwargs.items():
         if arg_value is not None:
             _check_format("CMD", arg_value, arg_name)
-    return CMD_t(**kwargs)
+    return CMD_t(**{k: _canonical(v) for k, v in kwargs.items()})
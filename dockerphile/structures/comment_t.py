@@ -1,9 +1,8 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-COMMENT_t = namedtuple('COMMENT', ['comment'])
+COMMENT_t = _instruction_type('COMMENT', ['comment'])
 
 
 def COMMENT(comment):
@@ -30,4 +29,4 @@ def COMMENT(comment):
         )
     if msg:
         raise DockerphileError(msg)
-    return COMMENT_t(comment=comment)
+    return COMMENT_t(comment=_canonical(comment))
@@ -1,12 +1,14 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-COPY_t = namedtuple('COPY', ['resources', 'from_'])
+COPY_t = _instruction_type(
+    'COPY',
+    ['resources', 'from_', 'chown', 'chmod', 'link']
+)
 
 
-def COPY(resources, from_=None):
+def COPY(resources, from_=None, chown=None, chmod=None, link=None):
     """Create a Dockerfile COPY instruction.
 
     Args:
@@ -17,13 +19,19 @@ def COPY(resources, from_=None):
             the rendered Dockerfile.
         from_: Optional string naming a Docker image or index to specify a
             source image from which to copy when using multi-stage builds.
+        chown: Optional string containing a `user[:group]` specifier for the
+            ownership of the copied files (the `--chown` option).
+        chmod: Optional string containing the permission bits to apply to
+            the copied files (the `--chmod` option).
+        link: Optional boolean enabling (or, if False, explicitly disabling)
+            the `--link` option that copies files into an independent layer.
 
     Returns:
         An instance of the COPY namedtuple.
 
     Raises:
-        DockerphileError: raised when `resources` or `from` arguments are not
-            specified in a compatible way.
+        DockerphileError: raised when `resources` or any option argument is
+            not specified in a compatible way.
 
     """
     msg = ''
@@ -35,6 +43,14 @@ def COPY(resources, from_=None):
         msg = 'COPY instruction must have at least 1 src and 1 dest URI.'
     elif not isinstance(from_, (str, type(None))):
         msg = 'COPY --from option must be a string, not %s' % type(from_)
+    elif not isinstance(chown, (str, type(None))):
+        msg = 'COPY --chown option must be a string, not %s' % type(chown)
+    elif not isinstance(chmod, (str, type(None))):
+        msg = 'COPY --chmod option must be a string, not %s' % type(chmod)
+    elif not isinstance(link, (bool, type(None))):
+        msg = 'COPY --link option must be a boolean, not %s' % type(link)
     if msg:
         raise DockerphileError(msg)
-    return COPY_t(resources=resources, from_=from_)
+    return COPY_t(resources=_canonical(resources), from_=_canonical(from_),
+                  chown=_canonical(chown), chmod=_canonical(chmod),
+                  link=link)
@@ -1,10 +1,9 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
-from dockerphile.structures.helpers import _check_format
+from dockerphile.structures.helpers import (_canonical, _check_format,
+                                            _instruction_type)
 
 
-ENTRYPOINT_t = namedtuple('ENTRYPOINT', ['exec_form', 'shell_form'])
+ENTRYPOINT_t = _instruction_type('ENTRYPOINT', ['exec_form', 'shell_form'])
 
 
 def ENTRYPOINT(exec_form=None, shell_form=None):
@@ -48,4 +47,4 @@ def ENTRYPOINT(exec_form=None, shell_form=None):
     for arg_name, arg_value in kwargs.items():
         if arg_value is not None:
             _check_format("ENTRYPOINT", arg_value, arg_name)
-    return ENTRYPOINT_t(**kwargs)
+    return ENTRYPOINT_t(**{k: _canonical(v) for k, v in kwargs.items()})
@@ -1,9 +1,8 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-ENV_t = namedtuple('ENV', ['key', 'value'])
+ENV_t = _instruction_type('ENV', ['key', 'value'])
 
 
 def ENV(key, value):
@@ -28,4 +27,4 @@ def ENV(key, value):
         msg = 'ENV instruction value requires string, not %s' % type(value)
     if msg:
         raise DockerphileError(msg)
-    return ENV_t(key=key, value=value)
+    return ENV_t(key=_canonical(key), value=_canonical(value))
@@ -1,9 +1,8 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-ESCAPE_t = namedtuple('ESCAPE', ['character'])
+ESCAPE_t = _instruction_type('ESCAPE', ['character'])
 
 
 def ESCAPE(character):
@@ -30,4 +29,4 @@ def ESCAPE(character):
         msg = 'ESCAPE parameter must contain exactly 1 character.'
     if msg:
         raise DockerphileError(msg)
-    return ESCAPE_t(character=character)
+    return ESCAPE_t(character=_canonical(character))
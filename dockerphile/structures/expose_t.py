@@ -1,9 +1,8 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-EXPOSE_t = namedtuple('EXPOSE', ['port_specs'])
+EXPOSE_t = _instruction_type('EXPOSE', ['port_specs'])
 
 
 def EXPOSE(port_specs):
@@ -29,4 +28,4 @@ def EXPOSE(port_specs):
         msg = 'EXPOSE instruction must have at least 1 port specifier.'
     if msg:
         raise DockerphileError(msg)
-    return EXPOSE_t(port_specs=port_specs)
+    return EXPOSE_t(port_specs=_canonical(port_specs))
@@ -1,12 +1,11 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-FROM_t = namedtuple('FROM', ['base_image', 'as_'])
+FROM_t = _instruction_type('FROM', ['base_image', 'as_', 'platform'])
 
 
-def FROM(base_image, as_=None):
+def FROM(base_image, as_=None, platform=None):
     """Create a Dockerfile FROM instruction.
 
     Args:
@@ -15,13 +14,15 @@ def FROM(base_image, as_=None):
             support for ARG variables appearing in FROM instructions.
         as_: Optional string declaring a name for the image for later reference
             during a multi-stage build.
+        platform: Optional string naming the platform of the base image
+            (the `--platform` option), e.g. 'linux/amd64'.
 
     Returns:
         An instance of the FROM namedtuple.
 
     Raises:
-        DockerphileError: raised when `base_image` or `as_` arguments are
-        misspecified.
+        DockerphileError: raised when `base_image`, `as_` or `platform`
+        arguments are misspecified.
 
     """
     msg = ''
@@ -31,6 +32,11 @@ def FROM(base_image, as_=None):
         )
     elif not isinstance(as_, (str, type(None))):
         msg = 'FROM parameter `as_` requires string, not %s' % (type(as_))
+    elif not isinstance(platform, (str, type(None))):
+        msg = 'FROM parameter `platform` requires string, not %s' % (
+            type(platform)
+        )
     if msg:
         raise DockerphileError(msg)
-    return FROM_t(base_image=base_image, as_=as_)
+    return FROM_t(base_image=_canonical(base_image), as_=_canonical(as_),
+                  platform=_canonical(platform))
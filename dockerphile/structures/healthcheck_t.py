@@ -1,16 +1,16 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-HEALTHCHECK_t = namedtuple(
+HEALTHCHECK_t = _instruction_type(
     'HEALTHCHECK',
-    ['interval', 'timeout', 'start_period', 'retries', 'cmd']
+    ['interval', 'timeout', 'start_period', 'retries', 'cmd',
+     'start_interval']
 )
 
 
 def HEALTHCHECK(interval=None, timeout=None, start_period=None,
-                retries=None, cmd=None):
+                retries=None, cmd=None, start_interval=None):
     """Create a Dockerfile HEALTHCHECK instruction.
 
     Args:
@@ -29,6 +29,8 @@ def HEALTHCHECK(interval=None, timeout=None, start_period=None,
         cmd: Optional. Either a single string containing one command or else a
             list or tuple containing an executable in the first element and
             optional parameters in the remaining elements.
+        start_interval: Optional string containing the duration to wait
+            between healthchecks during the start period.
 
     Returns:
         An instance of the HEALTHCHECK namedtuple.
@@ -38,7 +40,8 @@ def HEALTHCHECK(interval=None, timeout=None, start_period=None,
 
     """
     parameters = {'interval': interval, 'timeout': timeout,
-                  'start_period': start_period, 'retries': retries}
+                  'start_period': start_period, 'retries': retries,
+                  'start_interval': start_interval}
     for param, value in parameters.items():
         if not isinstance(value, (str, type(None))):
             raise DockerphileError(
@@ -57,9 +60,10 @@ def HEALTHCHECK(interval=None, timeout=None, start_period=None,
             'HEALTHCHECK "CMD" exec format must have at least 1 executable.'
         )
     return HEALTHCHECK_t(
-        interval=interval,
-        timeout=timeout,
-        start_period=start_period,
-        retries=retries,
-        cmd=cmd
+        interval=_canonical(interval),
+        timeout=_canonical(timeout),
+        start_period=_canonical(start_period),
+        retries=_canonical(retries),
+        cmd=_canonical(cmd),
+        start_interval=_canonical(start_interval)
     )
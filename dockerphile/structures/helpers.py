@@ -1,3 +1,6 @@
+import sys
+from collections import namedtuple
+
 from dockerphile.errors import DockerphileError
 
 
@@ -17,3 +20,57 @@ def _check_format(instruction, arg, argname):
         )
     if msg:
         raise DockerphileError(msg)
+
+
+def _canonical(value):
+    """Helper to normalise a field to interned strings and tuples."""
+    value_type = type(value)
+    if value_type is str:
+        return sys.intern(value)
+    if value_type is tuple or value_type is list:
+        try:
+            return tuple(map(sys.intern, value))
+        except TypeError:
+            return tuple(map(_canonical, value))
+    if isinstance(value, str):
+        return sys.intern(str(value))
+    return value
+
+
+def _instruction_eq(self, other):
+    """Compare instructions by type as well as by field values."""
+    return type(self) is type(other) and tuple.__eq__(self, other)
+
+
+def _instruction_ne(self, other):
+    """Compare instructions by type as well as by field values."""
+    return not _instruction_eq(self, other)
+
+
+def _instruction_hash(self):
+    """Hash instructions by type name as well as by field values."""
+    return hash((type(self).__name__, tuple.__hash__(self)))
+
+
+def _instruction_type(typename, field_names):
+    """Helper to create a picklable, hashable instruction namedtuple.
+
+    The namedtuple keeps `typename` (e.g. 'RUN') for its repr, but its
+    qualified name points at the module-level `<typename>_t` alias, because
+    the bare name is taken by the instruction factory function and pickle
+    would otherwise resolve the class to the factory. Equality and hashing
+    take the instruction type into account, so e.g. `ENV('a', 'b')` and
+    `LABEL('a', 'b')` are not equal even though their fields are. Every
+    field defaults to `None`.
+    """
+    base = namedtuple(typename, field_names,
+                      defaults=(None,) * len(field_names))
+    instruction_type = type(typename, (base,), {
+        '__slots__': (),
+        '__eq__': _instruction_eq,
+        '__ne__': _instruction_ne,
+        '__hash__': _instruction_hash,
+    })
+    instruction_type.__qualname__ = '%s_t' % typename
+    instruction_type.__module__ = sys._getframe(1).f_globals['__name__']
+    return instruction_type
@@ -1,9 +1,8 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-LABEL_t = namedtuple('LABEL', ['key', 'value'])
+LABEL_t = _instruction_type('LABEL', ['key', 'value'])
 
 
 def LABEL(key, value):
@@ -28,4 +27,4 @@ def LABEL(key, value):
         msg = 'LABEL instruction value requires string, not %s' % type(value)
     if msg:
         raise DockerphileError(msg)
-    return LABEL_t(key=key, value=value)
+    return LABEL_t(key=_canonical(key), value=_canonical(value))
@@ -1,5 +1,3 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
 from dockerphile.structures.add_t import ADD_t
 from dockerphile.structures.arg_t import ARG_t
@@ -9,6 +7,7 @@ from dockerphile.structures.entrypoint_t import ENTRYPOINT_t
 from dockerphile.structures.env_t import ENV_t
 from dockerphile.structures.expose_t import EXPOSE_t
 from dockerphile.structures.healthcheck_t import HEALTHCHECK_t
+from dockerphile.structures.helpers import _instruction_type
 from dockerphile.structures.label_t import LABEL_t
 from dockerphile.structures.run_t import RUN_t
 from dockerphile.structures.shell_t import SHELL_t
@@ -18,7 +17,7 @@ from dockerphile.structures.volume_t import VOLUME_t
 from dockerphile.structures.workdir_t import WORKDIR_t
 
 
-ONBUILD_t = namedtuple('ONBUILD', ['instruction'])
+ONBUILD_t = _instruction_type('ONBUILD', ['instruction'])
 VALID_TYPES = (ADD_t, ARG_t, CMD_t, COPY_t, ENTRYPOINT_t, ENV_t, EXPOSE_t,
                HEALTHCHECK_t, LABEL_t, RUN_t, SHELL_t, STOPSIGNAL_t, USER_t,
                VOLUME_t, WORKDIR_t)
@@ -1,10 +1,9 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
-from dockerphile.structures.helpers import _check_format
+from dockerphile.structures.helpers import (_canonical, _check_format,
+                                            _instruction_type)
 
 
-RUN_t = namedtuple('RUN', ['shell_form', 'exec_form'])
+RUN_t = _instruction_type('RUN', ['shell_form', 'exec_form'])
 
 
 def RUN(shell_form=None, exec_form=None):
@@ -44,4 +43,4 @@ def RUN(shell_form=None, exec_form=None):
     for arg_name, arg_value in kwargs.items():
         if arg_value is not None:
             _check_format("RUN", arg_value, arg_name)
-    return RUN_t(**kwargs)
+    return RUN_t(**{k: _canonical(v) for k, v in kwargs.items()})
@@ -1,9 +1,8 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-SHELL_t = namedtuple('SHELL', ['shell_spec'])
+SHELL_t = _instruction_type('SHELL', ['shell_spec'])
 
 
 def SHELL(shell_spec):
@@ -30,4 +29,4 @@ def SHELL(shell_spec):
         msg = 'SHELL instruction parameter must have at least 1 entry.'
     if msg:
         raise DockerphileError(msg)
-    return SHELL_t(shell_spec=shell_spec)
+    return SHELL_t(shell_spec=_canonical(shell_spec))
@@ -1,9 +1,8 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-STOPSIGNAL_t = namedtuple('STOPSIGNAL', ['signal'])
+STOPSIGNAL_t = _instruction_type('STOPSIGNAL', ['signal'])
 
 
 def STOPSIGNAL(signal):
@@ -27,4 +26,4 @@ def STOPSIGNAL(signal):
         )
     if msg:
         raise DockerphileError(msg)
-    return STOPSIGNAL_t(signal=signal)
+    return STOPSIGNAL_t(signal=_canonical(signal))
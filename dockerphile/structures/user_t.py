@@ -1,9 +1,8 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-USER_t = namedtuple('USER', ['user', 'group'])
+USER_t = _instruction_type('USER', ['user', 'group'])
 
 
 def USER(user, group=None):
@@ -29,4 +28,4 @@ def USER(user, group=None):
         msg = 'USER parameter `group` requires string, not %s' % type(group)
     if msg:
         raise DockerphileError(msg)
-    return USER_t(user=user, group=group)
+    return USER_t(user=_canonical(user), group=_canonical(group))
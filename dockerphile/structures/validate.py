@@ -0,0 +1,97 @@
+from dockerphile.errors import DockerphileError
+from dockerphile.structures.add_t import ADD, ADD_t
+from dockerphile.structures.arg_t import ARG, ARG_t
+from dockerphile.structures.cmd_t import CMD, CMD_t
+from dockerphile.structures.comment_t import COMMENT, COMMENT_t
+from dockerphile.structures.copy_t import COPY, COPY_t
+from dockerphile.structures.entrypoint_t import ENTRYPOINT, ENTRYPOINT_t
+from dockerphile.structures.env_t import ENV, ENV_t
+from dockerphile.structures.escape_t import ESCAPE, ESCAPE_t
+from dockerphile.structures.expose_t import EXPOSE, EXPOSE_t
+from dockerphile.structures.from_t import FROM, FROM_t
+from dockerphile.structures.healthcheck_t import HEALTHCHECK, HEALTHCHECK_t
+from dockerphile.structures.helpers import _canonical
+from dockerphile.structures.label_t import LABEL, LABEL_t
+from dockerphile.structures.onbuild_t import ONBUILD, ONBUILD_t
+from dockerphile.structures.run_t import RUN, RUN_t
+from dockerphile.structures.shell_t import SHELL, SHELL_t
+from dockerphile.structures.stopsignal_t import STOPSIGNAL, STOPSIGNAL_t
+from dockerphile.structures.user_t import USER, USER_t
+from dockerphile.structures.volume_t import VOLUME, VOLUME_t
+from dockerphile.structures.workdir_t import WORKDIR, WORKDIR_t
+
+
+FACTORIES = {
+    ADD_t: ADD,
+    ARG_t: ARG,
+    CMD_t: CMD,
+    COMMENT_t: COMMENT,
+    COPY_t: COPY,
+    ENTRYPOINT_t: ENTRYPOINT,
+    ENV_t: ENV,
+    ESCAPE_t: ESCAPE,
+    EXPOSE_t: EXPOSE,
+    FROM_t: FROM,
+    HEALTHCHECK_t: HEALTHCHECK,
+    LABEL_t: LABEL,
+    ONBUILD_t: ONBUILD,
+    RUN_t: RUN,
+    SHELL_t: SHELL,
+    STOPSIGNAL_t: STOPSIGNAL,
+    USER_t: USER,
+    VOLUME_t: VOLUME,
+    WORKDIR_t: WORKDIR,
+}
+
+
+def trusted_instruction(instruction_type, **fields):
+    """Create an instruction from trusted data without validating it.
+
+    This is the fast construction path for data that is already known to be
+    well formed, such as parser output. Fields are normalised to interned
+    strings and tuples as by the factory functions, and omitted fields
+    default to `None`, but no argument checks are performed (names that are
+    not fields of `instruction_type` are ignored). Use
+    `validate_instruction` to check the result later.
+
+    Args:
+        instruction_type: A `dockerphile.structures` namedtuple type, e.g.
+            `dockerphile.structures.RUN_t`.
+        **fields: Field values of the instruction, by field name.
+
+    Returns:
+        An instance of `instruction_type`.
+
+    Raises:
+        Nothing.
+
+    """
+    return tuple.__new__(instruction_type, map(
+        _canonical, map(fields.get, instruction_type._fields)
+    ))
+
+
+def validate_instruction(instruction):
+    """Check an instruction with the validation of its factory function.
+
+    ONBUILD trigger instructions are validated as well.
+
+    Args:
+        instruction: An instance of a `dockerphile.structures` type.
+
+    Returns:
+        Nothing.
+
+    Raises:
+        DockerphileError: raised if `instruction` is not a `dockerphile`
+            instruction or if its factory function rejects its fields.
+
+    """
+    factory = FACTORIES.get(type(instruction))
+    if factory is None:
+        raise DockerphileError(
+            "Unrecognized or invalid instruction type %s" % (instruction,)
+        )
+    factory(**instruction._asdict())
+    if isinstance(instruction, ONBUILD_t):
+        validate_instruction(instruction.instruction)
@@ -1,9 +1,8 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-VOLUME_t = namedtuple('VOLUME', ['volume_specs'])
+VOLUME_t = _instruction_type('VOLUME', ['volume_specs'])
 
 
 def VOLUME(volume_specs):
@@ -31,4 +30,4 @@ def VOLUME(volume_specs):
         msg = 'VOLUME instruction must have at least 1 volume specifier.'
     if msg:
         raise DockerphileError(msg)
-    return VOLUME_t(volume_specs=volume_specs)
+    return VOLUME_t(volume_specs=_canonical(volume_specs))
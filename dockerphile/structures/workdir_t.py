@@ -1,9 +1,8 @@
-from collections import namedtuple
-
 from dockerphile.errors import DockerphileError
+from dockerphile.structures.helpers import _canonical, _instruction_type
 
 
-WORKDIR_t = namedtuple('WORKDIR', ['workdir'])
+WORKDIR_t = _instruction_type('WORKDIR', ['workdir'])
 
 
 def WORKDIR(workdir):
@@ -27,4 +26,4 @@ def WORKDIR(workdir):
         )
     if msg:
         raise DockerphileError(msg)
-    return WORKDIR_t(workdir=workdir)
+    return WORKDIR_t(workdir=_canonical(workdir))
@@ -0,0 +1,392 @@
+import io
+import json
+import re
+from collections import namedtuple
+
+from dockerphile.errors import DockerphileError
+
+
+Command = namedtuple(
+    'Command',
+    ['cmd', 'sub_cmd', 'json', 'original', 'start_line', 'value', 'flags']
+)
+parser_directive = re.compile(r"#\s*([a-zA-Z][a-zA-Z0-9]*)\s*=\s*(.+?)\s*$")
+leading_flag = re.compile(r"(--\S*)(?:\s+|$)")
+DEFAULT_ESCAPE = '\\'
+VALID_ESCAPES = ('\\', '`')
+PARSER_DIRECTIVES = ('escape', 'syntax')
+
+
+def _parse_string(rest, escape):
+    """Helper to keep an instruction's arguments as a single string."""
+    return ([rest] if rest else []), False
+
+
+def _parse_whitespace(rest, escape):
+    """Helper to split an instruction's arguments on whitespace."""
+    return rest.split(), False
+
+
+def _parse_json(rest):
+    """Helper to decode a JSON array of strings, or `None` if not JSON.
+
+    Like the Go parser, a JSON array holding anything but strings is an
+    error rather than shell form.
+    """
+    if not rest.startswith('['):
+        return None
+    try:
+        value = json.loads(rest)
+    except ValueError:
+        return None
+    if not isinstance(value, list):
+        return None
+    if not all(isinstance(item, str) for item in value):
+        raise DockerphileError("When using JSON array syntax, arrays must be "
+                               "comprised of strings only: %s" % rest)
+    return value
+
+
+def _parse_maybe_json(rest, escape):
+    """Helper to parse exec (JSON) form or else keep the shell form string."""
+    value = _parse_json(rest)
+    if value is not None:
+        return value, True
+    return _parse_string(rest, escape)
+
+
+def _parse_maybe_json_to_list(rest, escape):
+    """Helper to parse JSON form or else split arguments on whitespace."""
+    value = _parse_json(rest)
+    if value is not None:
+        return value, True
+    return _parse_whitespace(rest, escape)
+
+
+def _split_words(rest, escape):
+    """Helper to split words on whitespace, honoring quotes and escapes."""
+    words, word, quote, escaped = [], [], None, False
+    for char in rest:
+        if escaped:
+            word.append(char)
+            escaped = False
+        elif char == escape:
+            word.append(char)
+            escaped = True
+        elif quote is not None:
+            word.append(char)
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            word.append(char)
+            quote = char
+        elif char.isspace():
+            if word:
+                words.append(''.join(word))
+                word = []
+        else:
+            word.append(char)
+    if word:
+        words.append(''.join(word))
+    return words
+
+
+def _parse_name_val(rest, escape):
+    """Helper to parse ENV and LABEL `key value` or `key=value` pairs."""
+    words = _split_words(rest, escape)
+    if not words:
+        return [], False
+    if '=' not in words[0]:
+        parts = rest.split(None, 1)
+        if len(parts) != 2:
+            raise DockerphileError("Instruction requires both a key and a "
+                                   "value: %s" % rest)
+        return parts, False
+    value = []
+    for word in words:
+        if '=' not in word:
+            raise DockerphileError("Syntax error - can't find = in %s. Must "
+                                   "be of the form: name=value" % word)
+        value.extend(word.split('=', 1))
+    return value, False
+
+
+def _parse_name_or_name_val(rest, escape):
+    """Helper to parse ARG `name` or `name=value` words."""
+    return _split_words(rest, escape), False
+
+
+def _parse_healthcheck(rest, escape):
+    """Helper to parse the `CMD` or `NONE` body of a HEALTHCHECK."""
+    parts = rest.split(None, 1)
+    if not parts:
+        return [], False
+    kind = parts[0].upper()
+    if kind != 'CMD' or len(parts) == 1:
+        return [kind], False
+    value, uses_json = _parse_maybe_json(parts[1], escape)
+    return [kind] + value, uses_json
+
+
+VALUE_PARSERS = {
+    'add': _parse_maybe_json_to_list,
+    'arg': _parse_name_or_name_val,
+    'cmd': _parse_maybe_json,
+    'copy': _parse_maybe_json_to_list,
+    'entrypoint': _parse_maybe_json,
+    'env': _parse_name_val,
+    'expose': _parse_whitespace,
+    'from': _parse_whitespace,
+    'healthcheck': _parse_healthcheck,
+    'label': _parse_name_val,
+    'maintainer': _parse_string,
+    'run': _parse_maybe_json,
+    'shell': _parse_maybe_json,
+    'stopsignal': _parse_string,
+    'user': _parse_string,
+    'volume': _parse_maybe_json_to_list,
+    'workdir': _parse_string,
+}
+
+
+def _to_command(original, start_line, escape):
+    """Helper to split one logical line into a `Command`."""
+    parts = original.split(None, 1)
+    cmd = parts[0].lower()
+    rest = parts[1] if len(parts) == 2 else ''
+    if cmd == 'onbuild':
+        if not rest:
+            raise DockerphileError("ONBUILD requires a trigger instruction.")
+        sub = _to_command(rest, start_line, escape)
+        return Command(cmd=cmd, sub_cmd=sub.cmd, json=sub.json,
+                       original=original, start_line=start_line,
+                       value=sub.value, flags=sub.flags)
+    flags, rest = split_flags(rest)
+    parse_value = VALUE_PARSERS.get(cmd, _parse_string)
+    value, uses_json = parse_value(rest, escape)
+    return Command(cmd=cmd, sub_cmd=None, json=uses_json, original=original,
+                   start_line=start_line, value=tuple(value), flags=flags)
+
+
+def split_flags(rest):
+    """Split the leading `--name[=value]` flags off instruction arguments.
+
+    Flags are consumed left to right in a single pass and scanning stops at
+    the first word that is not a flag. A bare `--` also ends the flags and
+    is consumed, as by the Go parser, so it is not part of `rest`.
+
+    Args:
+        rest: A string containing the arguments of an instruction, without
+            its keyword.
+
+    Returns:
+        A tuple `(flags, rest)` of a tuple of the raw flag strings and the
+        remaining argument string.
+
+    Raises:
+        Nothing.
+
+    """
+    flags = []
+    match = leading_flag.match(rest)
+    while match is not None:
+        rest = rest[match.end():]
+        if match.group(1) == '--':
+            break
+        flags.append(match.group(1))
+        match = leading_flag.match(rest)
+    return tuple(flags), rest
+
+
+def flags_to_dict(flags):
+    """Map raw `--name=value` instruction flags to a dictionary.
+
+    Args:
+        flags: An iterable of flag strings such as `('--from=builder',
+            '--link')`, as stored on `dockerphile.tokenize_tools.Command`.
+
+    Returns:
+        A dictionary mapping flag names (without leading dashes) to string
+        values. Flags given without a value map to the string 'true'.
+
+    Raises:
+        Nothing.
+
+    """
+    result = {}
+    for flag in flags:
+        name, has_value, value = flag[2:].partition('=')
+        result[name] = value if has_value else 'true'
+    return result
+
+
+def split_parser_directive(line):
+    """Split a source line holding a parser directive into key and value.
+
+    Leading whitespace is ignored, and the key (one of `PARSER_DIRECTIVES`)
+    is matched case insensitively, with optional whitespace around `=`,
+    as by Docker.
+
+    Args:
+        line: A string holding one Dockerfile source line.
+
+    Returns:
+        A tuple `(key, value)` of the lowercased directive name and its
+        value, or `None` if the line is not a parser directive.
+
+    Raises:
+        Nothing.
+
+    """
+    match = parser_directive.match(line.strip())
+    if match is None or match.group(1).lower() not in PARSER_DIRECTIVES:
+        return None
+    return match.group(1).lower(), match.group(2)
+
+
+def _add_parser_directive(directives, key, value):
+    """Helper to record a parser directive, checking it like Docker."""
+    if key in directives:
+        raise DockerphileError("Only one %s parser directive can be used"
+                               % key)
+    if key == 'escape' and value not in VALID_ESCAPES:
+        raise DockerphileError("Invalid ESCAPE character %s" % value)
+    directives[key] = value
+
+
+def parser_directives(lines):
+    """Read the parser directives at the start of Dockerfile source lines.
+
+    Docker only reads directives from the leading lines of a Dockerfile:
+    the first line that is not a known directive (a blank line, another
+    comment, an instruction, ...) ends them, and later directive-like
+    comments are plain comments. Reading stops there, so only the leading
+    lines of `lines` are consumed.
+
+    Args:
+        lines: An iterable of source lines, e.g. an open text file.
+
+    Returns:
+        A dictionary mapping the lowercased directive names found (e.g.
+        'escape' and 'syntax') to their values.
+
+    Raises:
+        DockerphileError: raised if a directive is repeated or the escape
+            directive names an invalid escape character.
+
+    """
+    directives = {}
+    for line in lines:
+        directive = split_parser_directive(line)
+        if directive is None:
+            break
+        _add_parser_directive(directives, *directive)
+    return directives
+
+
+def logical_lines(lines):
+    """Join Dockerfile source lines into logical instruction lines.
+
+    Line continuations, comment lines, blank lines and the leading parser
+    directives (see `parser_directives`) are handled while streaming
+    through `lines`, so only the current logical instruction is held in
+    memory. No per-instruction parsing is done.
+
+    Args:
+        lines: An iterable of source lines, e.g. an open text file.
+
+    Returns:
+        A generator of `(original, start_line, escape)` tuples holding the
+        joined instruction text, the source line number where it starts and
+        the escape character in effect.
+
+    Raises:
+        DockerphileError: raised if a parser directive is repeated or the
+            escape directive names an invalid escape character.
+
+    """
+    escape = DEFAULT_ESCAPE
+    continuation = None
+    directives = {}
+    buffer, start_line = [], None
+    for line_number, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        stripped = line.strip()
+        if directives is not None:
+            directive = split_parser_directive(line)
+            if directive is None:
+                directives = None
+            else:
+                _add_parser_directive(directives, *directive)
+                escape = directives.get('escape', escape)
+        if not stripped or stripped.startswith('#'):
+            continue
+        if continuation is None:
+            continuation = re.compile(re.escape(escape) + r"[ \t]*$")
+        if not buffer:
+            start_line = line_number
+            line = line.lstrip()
+        match = continuation.search(line)
+        if match is not None:
+            buffer.append(line[:match.start()])
+            continue
+        buffer.append(line)
+        yield ''.join(buffer).strip(), start_line, escape
+        buffer = []
+    if buffer and ''.join(buffer).strip():
+        yield ''.join(buffer).strip(), start_line, escape
+
+
+def tokenize(lines):
+    """Tokenize Dockerfile source lines into parsed commands in one pass.
+
+    Args:
+        lines: An iterable of source lines, e.g. an open text file.
+
+    Returns:
+        A generator of `dockerphile.tokenize_tools.Command` namedtuples. These
+        mirror `dockerfile.Command` (lowercased `cmd`, `sub_cmd`, `json`,
+        `original`, `start_line` and `value`) and additionally retain the raw
+        instruction flags in `flags`.
+
+    Raises:
+        DockerphileError: raised if a line contains invalid Dockerfile syntax.
+
+    """
+    for original, start_line, escape in logical_lines(lines):
+        yield _to_command(original, start_line, escape)
+
+
+def parse_string(text):
+    """Parse Dockerfile source text with the native tokenizer.
+
+    Args:
+        text: A string containing the contents of a Dockerfile.
+
+    Returns:
+        A tuple of `dockerphile.tokenize_tools.Command` namedtuples.
+
+    Raises:
+        DockerphileError: raised if `text` contains invalid Dockerfile syntax.
+
+    """
+    return tuple(tokenize(io.StringIO(text)))
+
+
+def parse_file(source):
+    """Parse a source Dockerfile on disk with the native tokenizer.
+
+    Args:
+        source: A string naming a path to a source Dockerfile on disk.
+
+    Returns:
+        A tuple of `dockerphile.tokenize_tools.Command` namedtuples.
+
+    Raises:
+        DockerphileError: raised if the file contains invalid Dockerfile
+            syntax.
+        OSError: raised if the file cannot be read.
+
+    """
+    with open(source, 'r') as _file:
+        return tuple(tokenize(_file))
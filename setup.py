@@ -1,9 +1,16 @@
+import re
+
 from setuptools import find_packages, setup
 
 
+with open('dockerphile/__init__.py', 'r') as _file:
+    version = re.search(r"^__version__ = '(.*)'$", _file.read(),
+                        re.MULTILINE).group(1)
+
+
 setup(
     name='dockerphile',
-    version='0.0.0',
+    version=version,
     packages=find_packages(),
     install_requires=[
         'dockerfile==1.0.0'
@@ -0,0 +1,35 @@
+import pytest
+
+from dockerphile.diff_tools import diff
+from dockerphile.dockerfile_tools import Dockerfile
+
+
+BACKENDS = ('go', 'native')
+
+
+def _invalidations(old, new, backend):
+    """Helper to diff two sources and list the first invalidated positions."""
+    result = diff(Dockerfile.from_string(old, backend=backend),
+                  Dockerfile.from_string(new, backend=backend))
+    return [(stage.index, stage.first_invalidated) for stage in result.stages]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_diff_invalidates_stages_reading_a_changed_global_arg(backend):
+    """Check that a changed global ARG invalidates the stages using it."""
+    text = ("ARG TAG=%s\nARG OTHER=1\n"
+            "FROM alpine:$TAG AS base\nRUN echo a\n"
+            "FROM debian\nRUN echo b\n"
+            "FROM debian\nARG TAG\nRUN echo $TAG\n"
+            "FROM base\nRUN echo c\n")
+    assert _invalidations(text % '3.18', text % '3.19', backend) == [
+        (None, 0), (0, 2), (1, None), (2, 7), (3, 9)
+    ]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_diff_ignores_global_args_with_the_same_value(backend):
+    """Check that reordering global ARGs invalidates no stage."""
+    old = "ARG A=1\nARG B=2\nFROM alpine:${A}-${B}\nRUN echo a\n"
+    new = "ARG B=2\nARG A=1\nFROM alpine:${A}-${B}\nRUN echo a\n"
+    assert _invalidations(old, new, backend) == [(None, 0), (0, None)]
@@ -0,0 +1,48 @@
+import pytest
+
+from dockerphile.dockerfile_tools import Dockerfile
+from dockerphile.graph_tools import stage_graph
+
+
+BACKENDS = ('go', 'native')
+
+
+def _stage_bases(dockerfile):
+    """Helper to list the FROM base image of every stage."""
+    return [dockerfile.sequence[stage.start].base_image
+            for stage in dockerfile.stages()]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_stage_graph_expands_variable_references(backend):
+    """Check that FROM ${BASE} and COPY --from=${SRC} name their stages."""
+    text = ("ARG BASE=builder\n"
+            "FROM alpine AS builder\nFROM alpine AS assets\n"
+            "FROM alpine AS unused\n"
+            "FROM ${BASE}\nARG SRC=assets\nCOPY --from=${SRC} /a /a\n")
+    dockerfile = Dockerfile.from_string(text, backend=backend)
+    assert stage_graph(dockerfile).dependencies[3] == (0, 1)
+    assert _stage_bases(dockerfile.prune()) == ['alpine', 'alpine',
+                                                '${BASE}']
+    assert stage_graph(dockerfile, {'BASE': 'unused'}).dependencies[3] == (
+        1, 2)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_stage_graph_keeps_unknown_references_conservative(backend):
+    """Check that references expanding to nothing may name any stage."""
+    text = ("FROM alpine AS a\nFROM alpine AS b\n"
+            "FROM alpine\nARG SRC\nCOPY --from=$SRC /a /a\n")
+    dockerfile = Dockerfile.from_string(text, backend=backend)
+    assert stage_graph(dockerfile).dependencies[2] == (0, 1)
+    assert len(dockerfile.prune().stages()) == 3
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_prune_keeps_stages_under_a_variable_stage_index(backend):
+    """Check that a COPY --from=$N index is never left pointing elsewhere."""
+    text = ("FROM alpine AS a\nFROM alpine AS b\n"
+            "FROM alpine\nARG N=1\nCOPY --from=$N /a /a\n")
+    dockerfile = Dockerfile.from_string(text, backend=backend)
+    assert stage_graph(dockerfile).dependencies[2] == (1,)
+    assert len(dockerfile.prune().stages()) == 3
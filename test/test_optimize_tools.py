@@ -0,0 +1,134 @@
+import glob
+import os
+
+import pytest
+
+from dockerphile.dockerfile_tools import Dockerfile
+from dockerphile.optimize_tools import coalesce_runs, reorder_for_cache
+
+
+BACKENDS = ('go', 'native')
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__),
+                                         'fixtures', '*.Dockerfile')))
+
+
+def _run_commands(dockerfile):
+    """Helper to list RUN commands with whitespace normalized."""
+    runs = [instruction for instruction in dockerfile.sequence
+            if type(instruction).__name__ == 'RUN']
+    return [' '.join(' '.join(run.shell_form or run.exec_form).split())
+            for run in runs]
+
+
+def _coalesce_and_reparse(text, backend):
+    """Helper to coalesce a source and parse the rendered result again."""
+    report = coalesce_runs(Dockerfile.from_string(text, backend=backend))
+    reparsed = Dockerfile.from_string(repr(report.dockerfile),
+                                      backend=backend)
+    return report, reparsed
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('text', [
+    "FROM alpine\nRUN apk add curl\nRUN echo a\nRUN echo b\n",
+    "# escape=`\nFROM alpine\nRUN echo a\nRUN echo b\n",
+    "FROM alpine\nSHELL [\"/bin/bash\", \"-o\", \"pipefail\", \"-c\"]\n"
+    "RUN a | b\nRUN c\n",
+])
+def test_coalesce_runs_reparses_to_same_commands(text, backend):
+    """Check that merged RUNs parse back to the chained commands."""
+    original = Dockerfile.from_string(text, backend=backend)
+    report, reparsed = _coalesce_and_reparse(text, backend)
+    assert report.layers_saved > 0
+    assert _run_commands(reparsed) == [' && '.join(_run_commands(original))]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('path', FIXTURES, ids=os.path.basename)
+def test_coalesce_runs_round_trips_fixtures(path, backend):
+    """Check that coalescing a fixture keeps every RUN command in order."""
+    with open(path) as source:
+        text = source.read()
+    original = Dockerfile.from_string(text, backend=backend)
+    report, reparsed = _coalesce_and_reparse(text, backend)
+    saved = len(original.sequence) - len(reparsed.sequence)
+    assert saved == report.layers_saved
+    assert ' && '.join(_run_commands(reparsed)) == ' && '.join(
+        _run_commands(original))
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_coalesce_runs_skips_non_posix_shell_stages(backend):
+    """Check that PowerShell stages and their children are not merged."""
+    text = ("FROM windows AS base\n"
+            "SHELL [\"powershell\", \"-Command\"]\n"
+            "RUN write-host a\nRUN write-host b\n"
+            "FROM base\nRUN write-host c\nRUN write-host d\n"
+            "FROM alpine\nRUN echo a\nRUN echo b\n")
+    report, reparsed = _coalesce_and_reparse(text, backend)
+    assert report.merged == [(8, 9)]
+    assert _run_commands(reparsed)[:4] == ['write-host a', 'write-host b',
+                                           'write-host c', 'write-host d']
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_coalesce_runs_keeps_shell_state_boundaries(backend):
+    """Check that commands changing shell state end a merged group."""
+    text = ("FROM alpine\nRUN cd /tmp\nRUN export X=1\nRUN touch f\n"
+            "RUN make && cd build\nRUN ls\nRUN FOO=bar make\nRUN ls\n")
+    report, _ = _coalesce_and_reparse(text, backend)
+    assert report.merged == [(3, 4), (5, 6, 7)]
+
+
+def _reorder(text):
+    """Helper to reorder a source for caching and render the result."""
+    report = reorder_for_cache(Dockerfile.from_string(text,
+                                                      backend='native'))
+    return report, repr(report.dockerfile).splitlines()
+
+
+def test_reorder_for_cache_copies_manifests_from_source_directory():
+    """Check that manifests come from the directory a COPY src/. copies."""
+    _, lines = _reorder("FROM python\nCOPY src/. /app\n"
+                        "RUN pip install -r requirements.txt\n")
+    assert lines[1] == 'COPY "src/requirements.txt" "/app/requirements.txt"'
+    assert lines[3] == 'COPY "src/." "/app"'
+
+
+@pytest.mark.parametrize('install, manifests', [
+    ('npm ci', '"package*.json" ".npmr[c]"'),
+    ('yarn install', '"package.json" "yarn.loc[k]" ".yarnrc*" ".npmr[c]"'),
+    ('pnpm install --frozen-lockfile',
+     '"package.json" "pnpm-lock.yam[l]" "pnpm-workspace.yam[l]" ".npmr[c]"'),
+])
+def test_reorder_for_cache_copies_the_lockfile_of_the_install(install,
+                                                              manifests):
+    """Check that each package manager gets its own lockfile copied."""
+    _, lines = _reorder("FROM node\nCOPY . .\nRUN %s\n" % install)
+    assert lines[1] == 'COPY %s "./"' % manifests
+
+
+def test_reorder_for_cache_tolerates_a_missing_go_sum():
+    """Check that go.sum is copied with a wildcard."""
+    _, lines = _reorder("FROM golang\nCOPY . .\nRUN go mod download\n")
+    assert lines[1] == 'COPY "go.mod" "go.su[m]" "./"'
+
+
+@pytest.mark.parametrize('text', [
+    "FROM python\nCOPY . .\n"
+    "RUN pip install -r requirements.txt -c constraints.txt\n",
+    "FROM python\nCOPY requirements.txt .\nCOPY . .\n"
+    "RUN pip install -r requirements.txt -c constraints.txt\n",
+    "FROM debian\nCOPY . /src\nRUN apt-get install -y /src/pkg.deb\n",
+    "FROM node\nCOPY . .\nRUN npm install ./local-pkg\n",
+])
+def test_reorder_for_cache_never_moves_installs_above_their_files(text):
+    """Check that every file a moved install reads is copied before it."""
+    report, lines = _reorder(text)
+    finding = report.findings[-1]
+    if finding.movable:
+        assert 'constraints.txt' in ' '.join(lines[:lines.index(
+            'RUN pip install -r requirements.txt -c constraints.txt')])
+    else:
+        assert lines == repr(Dockerfile.from_string(
+            text, backend='native')).splitlines()
@@ -0,0 +1,69 @@
+import glob
+import os
+
+import pytest
+
+from dockerphile.dockerfile_tools import Dockerfile
+from dockerphile.errors import DockerphileError
+
+
+BACKENDS = ('go', 'native')
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__),
+                                         'fixtures', '*.Dockerfile')))
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=os.path.basename)
+def test_native_backend_matches_go_backend(path):
+    """Check that both backends parse each fixture to the same sequence."""
+    go = Dockerfile(path, backend='go').sequence
+    assert go
+    assert Dockerfile(path, backend='native').sequence == go
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('text, error, message', [
+    ("FROM alpine\nARG\n", DockerphileError, 'requires a name'),
+    ("# escape=`\n# escape=\\\nFROM alpine\n", DockerphileError,
+     'Only one escape'),
+    ("# escape=x\nFROM alpine\n", DockerphileError, 'Invalid ESCAPE'),
+    ("FROM alpine\nONBUILD ONBUILD RUN x\n", DockerphileError,
+     'not allowed as subcommand'),
+    ("FROM alpine\nONBUILD\n", DockerphileError, 'requires a trigger'),
+    ("FROM alpine\nRUN [1, 2]\n", Exception, 'strings only'),
+    ("FROM alpine\nCMD [\"a\", true]\n", Exception, 'strings only'),
+])
+def test_backends_reject_the_same_sources(text, error, message, backend):
+    """Check that both backends refuse the same invalid sources."""
+    with pytest.raises(error, match=message):
+        Dockerfile.from_string(text, backend=backend)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('text, flag', [
+    ("FROM alpine\nRUN --mount=type=cache,target=/root/.cache make\n",
+     '--mount for RUN'),
+    ("FROM alpine\nCOPY --exclude=*.md . /app\n", '--exclude for COPY'),
+    ("FROM alpine\nCOPY --parents a/b /c/\n", '--parents for COPY'),
+    ("FROM alpine\nADD --checksum=sha256:00 https://x/y /y\n",
+     '--checksum for ADD'),
+    ("FROM alpine\nONBUILD RUN --network=none make\n", '--network for RUN'),
+])
+def test_unmodelled_flags_raise_instead_of_being_dropped(text, flag,
+                                                         backend):
+    """Check that a flag the instruction types cannot hold is an error."""
+    with pytest.raises(DockerphileError, match=flag):
+        Dockerfile.from_string(text, backend=backend)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_modelled_flags_render_back(backend):
+    """Check that the modelled flags survive a parse and render."""
+    text = ("FROM --platform=linux/amd64 alpine AS base\n"
+            "COPY --from=base --chown=1:1 --chmod=644 --link a /a\n"
+            "ADD --link=false b /b\nRUN echo --mount\n")
+    lines = repr(Dockerfile.from_string(text, backend=backend)).splitlines()
+    assert lines == [
+        'FROM --platform=linux/amd64 alpine AS base',
+        'COPY --from=base --chown=1:1 --chmod=644 --link "a" "/a"',
+        'ADD --link=false "b" "/b"', 'RUN echo --mount'
+    ]
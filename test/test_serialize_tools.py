@@ -0,0 +1,31 @@
+import glob
+import os
+
+import pytest
+
+from dockerphile.dockerfile_tools import Dockerfile
+from dockerphile.serialize_tools import deserialize, is_serialized, serialize
+
+
+BACKENDS = ('go', 'native')
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(__file__),
+                                         'fixtures', '*.Dockerfile')))
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('path', FIXTURES, ids=os.path.basename)
+def test_serialize_round_trips_fixtures(path, backend):
+    """Check that deserializing gives back the serialized instructions."""
+    dockerfile = Dockerfile(path, backend=backend)
+    data = serialize(dockerfile.sequence)
+    assert is_serialized(data)
+    assert list(deserialize(data)) == dockerfile.sequence
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=os.path.basename)
+def test_from_bytes_round_trips_to_bytes(path):
+    """Check that `from_bytes` restores a Dockerfile and its rendering."""
+    dockerfile = Dockerfile(path, backend='native')
+    restored = Dockerfile.from_bytes(dockerfile.to_bytes())
+    assert restored.sequence == dockerfile.sequence
+    assert repr(restored) == repr(dockerfile)